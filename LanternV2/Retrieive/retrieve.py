@@ -1,19 +1,55 @@
 import os
 import sqlite3
-import chromadb
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from db_pool import get_pool, PoolTimeout
+from metric_cache import metric_cache
+from materialize import MATERIALIZED_SQL, materialized_queries
+from embedder import agreement, embedder_id, load_embedder, MIN_AGREEMENT
+from embedding_cache import EmbeddingCache, normalize_question
+from embedding_worker import EmbeddingClient, RemoteStore
+from micro_batcher import MicroBatcher
+from vector_store import open_store
+from tracing import in_context, span, spanned
 
-from sentence_transformers import SentenceTransformer 
 # -------------------------------------------------------------
 # CONFIGURATION
 # -------------------------------------------------------------
-CHROMA_STORE_DIR = "/workspace/Lantern_V2/chroma_store"
+# Every path lives under LANTERN_HOME, so a checkout, a test run
+# or a container can point the whole pipeline somewhere else:
+#   LANTERN_HOME=/srv/lantern uvicorn app:app
+# -------------------------------------------------------------
+LANTERN_HOME = os.environ.get("LANTERN_HOME", "/workspace/Lantern_V2")
+CHROMA_STORE_DIR = os.path.join(LANTERN_HOME, "chroma_store")
+NUMPY_STORE_DIR  = os.path.join(LANTERN_HOME, "numpy_store")  # written by ingest.py
+VECTOR_BACKEND   = "chroma"  # "chroma" or "numpy" (in-process exact search)
 COLLECTION_NAME  = "lantern_financial_concepts"
 TOP_K_CONCEPTS   = 3  # how many concept docs to retrieve per question
-SQL_DIR = "/workspace/Lantern_V2/matrix_queries"
+USE_METRIC_CACHE = True  # reuse metric results until the database changes
+USE_MATERIALIZED = True  # read summary tables for metrics that passed materialize.py parity
+PARALLEL_RETRIEVAL = True  # run SQL metrics and concept search concurrently
+RETRIEVAL_WORKERS  = 8     # threads shared by all concurrent retrievals
+EMBEDDING_MODEL      = "all-MiniLM-L6-v2"
+# how the model runs: "torch", "torch-int8", "onnx", "onnx-int8" (embedder.py)
+EMBEDDING_BACKEND    = os.environ.get("LANTERN_EMBEDDING_BACKEND", "torch")
+AGREEMENT_SAMPLE     = 64     # indexed docs re-embedded to check a non-torch backend
+# address of a shared embedding worker (embedding_worker.py); when
+# set, this process never loads the model or the concept store
+EMBEDDING_WORKER     = os.environ.get("LANTERN_EMBEDDING_WORKER") or None
+MICRO_BATCHING       = True   # coalesce concurrent question encodes (micro_batcher.py)
+EMBED_MAX_BATCH      = 32     # texts per batched forward pass
+EMBED_MAX_WAIT_MS    = 5      # longest a question waits for others to join
+EMBEDDING_CACHE_SIZE = 2048   # question vectors kept in memory
+EMBEDDING_CACHE_PATH = os.path.join(LANTERN_HOME, "cache", "question_embeddings.npz")  # None = don't persist
+CACHE_CONCEPT_RESULTS = True  # also reuse top-K concept results (short TTL)
+SQL_DIR = os.path.join(LANTERN_HOME, "matrix_queries")
 DB_PATHS = {
-    "service1": "/workspace/Lantern_V2/databases/service1.db",
-    "service2": "/workspace/Lantern_V2/databases/service2.db",
-    "service3": "/workspace/Lantern_V2/databases/service3.db"
+    "service1": os.path.join(LANTERN_HOME, "databases", "service1.db"),
+    "service2": os.path.join(LANTERN_HOME, "databases", "service2.db"),
+    "service3": os.path.join(LANTERN_HOME, "databases", "service3.db")
 }
 
 
@@ -33,7 +69,7 @@ SQL_FILES = {
 def load_sql_queries():
     """
     Read all .sql files from SQL_DIR and return as a dictionary.
-    Called once at startup.
+    Called once, by get_sql_queries().
  
     Returns:
     dict: {query_name: sql_string}
@@ -56,24 +92,320 @@ def load_sql_queries():
 
 
 
-print("Loading retrieval system ...")
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
-chroma_client = chromadb.PersistentClient(path=CHROMA_STORE_DIR)
-collection = chroma_client.get_collection(name=COLLECTION_NAME)
-print("Embedding model and ChromaDB ready. \n")
-print("Loading SQL queries from matrix_queries/...")
-SQL_QUERIES = load_sql_queries()
-print(f"{len([q for q in SQL_QUERIES.values() if q])} SQL queries loaded.\n")
+embedding_cache = EmbeddingCache(
+    model_id=embedder_id(EMBEDDING_MODEL, EMBEDDING_BACKEND),
+    path=EMBEDDING_CACHE_PATH,
+    max_entries=EMBEDDING_CACHE_SIZE
+)
+
+
+# -------------------------------------------------------------
+# LAZY RESOURCES
+# -------------------------------------------------------------
+# Importing this module does no I/O beyond the embedding cache
+# file: the embedding model, the concept store and the SQL
+# files are loaded the first time something needs them, once,
+# however many threads ask at the same moment. warm_up() loads
+# all three up front (app.py and main.py call it in the
+# background at startup, so /companies and the company menu
+# never wait for the model). Anything that embeds — /ask, and
+# /route in semantic / hybrid mode — runs on app.py's thread
+# pool and waits there, never on the event loop.
+#
+# With EMBEDDING_WORKER set, the model and concept store stay in
+# the shared embedding worker and only its client lives here.
+# -------------------------------------------------------------
+
+_embedding_model = None
+_concept_store = None
+_sql_queries = None
+_worker_client = None
+_batcher = None
+_model_lock = threading.Lock()
+_store_lock = threading.Lock()
+_sql_lock = threading.Lock()
+
+
+def _get_worker_client():
+    global _worker_client
+    if _worker_client is None:
+        with _model_lock:
+            if _worker_client is None:
+                _worker_client = EmbeddingClient(EMBEDDING_WORKER)
+    return _worker_client
+
+
+def get_embedding_model():
+    """
+    The SentenceTransformer used for questions (loaded on first
+    use), or the shared embedding worker's client when
+    EMBEDDING_WORKER is set. Either has encode(list of str).
+    """
+    global _embedding_model
+    if _embedding_model is None:
+        if EMBEDDING_WORKER:
+            _embedding_model = _get_worker_client()
+            return _embedding_model
+        with _model_lock:
+            if _embedding_model is None:
+                print(f"Loading embedding model ({EMBEDDING_MODEL}, {EMBEDDING_BACKEND})...")
+                _embedding_model = load_embedder(EMBEDDING_MODEL, EMBEDDING_BACKEND)
+    return _embedding_model
+
+
+def get_concept_store():
+    """The concept vector store (opened on first use, or in the embedding worker)."""
+    global _concept_store
+    if _concept_store is None:
+        with _store_lock:
+            if _concept_store is None and EMBEDDING_WORKER:
+                _concept_store = RemoteStore(_get_worker_client())
+            elif _concept_store is None:
+                _concept_store = open_store(
+                    VECTOR_BACKEND,
+                    chroma_dir=CHROMA_STORE_DIR,
+                    collection_name=COLLECTION_NAME,
+                    numpy_dir=NUMPY_STORE_DIR,
+                    model=EMBEDDING_MODEL
+                )
+                print(f"Concept store ({VECTOR_BACKEND}) ready.")
+    return _concept_store
+
+
+def get_encoder():
+    """
+    What questions are encoded with: the embedding model behind
+    a MicroBatcher (MICRO_BATCHING), else the model itself.
+    """
+    global _batcher
+    if not MICRO_BATCHING:
+        return get_embedding_model()
+    if _batcher is None:
+        with _model_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher(
+                    lambda texts: get_embedding_model().encode(texts),
+                    max_batch_size=EMBED_MAX_BATCH,
+                    max_wait_ms=EMBED_MAX_WAIT_MS
+                )
+    return _batcher
+
+
+def embedding_batch_stats():
+    """Batch-size distribution and queue wait of the micro-batcher, or None."""
+    return _batcher.stats() if _batcher is not None else None
+
+
+def embedding_worker_stats():
+    """Client-side counters for the embedding worker, or None when the model is local."""
+    if not EMBEDDING_WORKER or _worker_client is None:
+        return None
+    return _worker_client.stats()
+
+
+def get_sql_queries(reload=False):
+    """
+    {query_name: sql} read from SQL_DIR on first use.
+
+    Args:
+        reload: read the files again (e.g. after changing SQL_DIR)
+    """
+    global _sql_queries
+    if _sql_queries is None or reload:
+        with _sql_lock:
+            if _sql_queries is None or reload:
+                print(f"Loading SQL queries from {SQL_DIR}...")
+                queries = load_sql_queries()
+                print(f"{len([q for q in queries.values() if q])} SQL queries loaded.")
+                _sql_queries = queries
+    return _sql_queries
+
+
+def check_index_agreement():
+    """
+    Re-embed a sample of indexed concept documents with the
+    configured backend and compare them to the stored vectors.
+    Warns when they drift below embedder.MIN_AGREEMENT.
+
+    Returns:
+        dict from embedder.agreement(), or None when the store
+        cannot be sampled (e.g. it lives in the embedding worker)
+    """
+    try:
+        documents, vectors = get_concept_store().sample(AGREEMENT_SAMPLE)
+    except NotImplementedError:
+        return None
+    result = agreement(get_embedding_model().encode, documents, vectors)
+    if result["mean_cosine"] < MIN_AGREEMENT:
+        print(f"WARNING: {EMBEDDING_BACKEND} embeddings agree with the concept index at "
+              f"cosine {result['mean_cosine']} (min {result['min_cosine']}). "
+              f"Re-run ingest.py with LANTERN_EMBEDDING_BACKEND={EMBEDDING_BACKEND}.")
+    return result
+
+
+def warm_up():
+    """
+    Load the embedding model, concept store and SQL files now
+    and run one encode, so the first question doesn't pay for
+    them. Safe to call from any thread, any number of times.
+
+    Returns:
+        dict: {"sql_ms", "model_ms", "store_ms", "encode_ms"}
+    """
+    timings = {}
+    for name, load in (("sql_ms", get_sql_queries),
+                       ("model_ms", get_embedding_model),
+                       ("store_ms", get_concept_store),
+                       ("encode_ms", lambda: get_embedding_model().encode(["warm up"]))):
+        start = time.perf_counter()
+        load()
+        timings[name] = round((time.perf_counter() - start) * 1000, 2)
+    if EMBEDDING_BACKEND != "torch" and not EMBEDDING_WORKER:
+        start = time.perf_counter()
+        check_index_agreement()
+        timings["agreement_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return timings
+
+
+
+# -------------------------------------------------------------
+# RETRIEVAL THREAD POOL
+# -------------------------------------------------------------
+# Shared by every request. Only the caller of retrieve() /
+# get_live_data() ever waits on these tasks, never a task
+# itself, so one pool is enough and cannot deadlock.
+# -------------------------------------------------------------
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=RETRIEVAL_WORKERS,
+                    thread_name_prefix="retrieve"
+                )
+    return _executor
+
+
+# db_key -> (version, sql_queries, query names) — which metrics
+# passed materialize.py parity. The stamp lives in the database,
+# so it can only change with the database version (or when the
+# SQL files are reloaded).
+_materialized = {}
+_materialized_lock = threading.Lock()
+
+
+def _materialized_for(pool, version):
+    """
+    Metrics this database answers from its summary tables, looked
+    up once per database version instead of on every checkout.
+
+    Args:
+        pool:    db_pool.ConnectionPool for the company database
+        version: pool.version() stamp, or None to read it here
+
+    Returns:
+        set of query names (empty if the lookup failed)
+    """
+    if not USE_MATERIALIZED:
+        return set()
+    if version is None:
+        version = pool.version()
+    sql_queries = get_sql_queries()
+    cached = _materialized.get(pool.db_key)
+    if cached is not None and cached[0] == version and cached[1] is sql_queries:
+        return cached[2]
+    try:
+        with pool.connection() as conn:
+            names = materialized_queries(conn, sql_queries)
+    except (PoolTimeout, sqlite3.Error) as e:
+        # fall back to the ledger scan; try again next request
+        print(f"  WARNING: Could not read materialized tables of {pool.db_key}: {e}")
+        return set()
+    with _materialized_lock:
+        _materialized[pool.db_key] = (version, sql_queries, names)
+    return names
+
+
+def _run_queries(pool, queries, version=None, materialized=frozenset()):
+    """
+    Run metric queries on one connection checked out of the pool.
+
+    Args:
+        pool:    db_pool.ConnectionPool for the company database
+        queries: {query_name: sql}
+        version: database version stamp to cache results under
+        materialized: query names to read from MATERIALIZED_SQL
+                      (from _materialized_for)
+
+    Returns:
+        dict: {query_name: [rows] or {"error": ...}}
+    """
+    results = {}
+    # connections come from the shared read-only pool; the
+    # pool sets row_factory = sqlite3.Row so results come back
+    # as named dictionaries and the LLM can read
+    # row["net_profit_margin_pct"] instead of row[0]
+    try:
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                for query_name,sql in queries.items():
+                    # databases with materialized summary tables answer
+                    # the ledger-scanning metrics whose replacements
+                    # returned the same rows as the original SQL from
+                    # those tables instead
+                    if query_name in materialized:
+                        sql = MATERIALIZED_SQL[query_name]
+                    
+                    # skip any queries that failed to load
+                    if sql is None:
+                        results[query_name] = {"error": "SQL file not found"}
+                        continue
+                    try:
+                        cursor.execute(sql)
+                        rows = cursor.fetchall()
+                        # convert Row objects to plain dictionaries
+                        results[query_name] = [dict(row) for row in rows]
+                        if version is not None:
+                            metric_cache.put(pool.db_key, query_name, version, results[query_name])
+     
+                    except sqlite3.Error as e:
+                        # if one query fails, record the error and continue
+                        # don't let one bad query crash the whole retrieval
+                        # (errors are never cached)
+                        results[query_name] = {"error": str(e)}
+                        print(f"  WARNING: Query failed — {query_name}: {e}")
+            finally:
+                # the connection goes back to the pool, the cursor does not
+                cursor.close()
+    except PoolTimeout as e:
+        # every connection stayed busy for CHECKOUT_TIMEOUT: fail
+        # these metrics like a bad query (not cached), not the request
+        print(f"  WARNING: {e} — skipped {', '.join(queries)}")
+        return {query_name: {"error": str(e)} for query_name in queries}
 
+    return results
 
 
-def get_live_data(db_key):
+@spanned("sql")
+def get_live_data(db_key, query_names=None, parallel=False):
     """
-    Connect to the selected company database and run all 
-    8 financial queries. Returns a dictionary of results.
+    Connect to the selected company database and run the
+    financial queries. Returns a dictionary of results.
 
     Args: 
         db_key: "service1", "service2", or "service3"
+        query_names: list of query names to run, usually the
+                     output of query_router.route(). None runs
+                     all 8 queries.
+        parallel: run each query on its own pooled connection
+                  in the retrieval thread pool
     
     Returns:
         dict: {query_name: [list of result row dicts]}
@@ -85,65 +417,116 @@ def get_live_data(db_key):
     if not os.path.exists(db_path):
         raise FileNotFoundError(f"Database file not found: {db_path}")
     
+    # only run the queries the router selected — the prompt
+    # builder ignores everything else anyway
+    sql_queries = get_sql_queries()
+    if query_names is None:
+        queries = sql_queries
+    else:
+        queries = {}
+        for query_name in query_names:
+            if query_name not in sql_queries:
+                raise ValueError(f"Unknown query: {query_name}. " f"choose from: {list(sql_queries.keys())}")
+            queries[query_name] = sql_queries[query_name]
+
     results = {}
-    # row_factory makes results come back as named dictionaries
-    # so the LLM can read row["net_profit_margin_pct"]
-    # instead of row[0]
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
+    pool = get_pool(db_key, db_path)
 
-    try:
-        cursor = conn.cursor()
-        for query_name,sql in SQL_QUERIES.items():
-                
-            # skip any queries that failed to load
-            if sql is None:
-                results[query_name] = {"error": "SQL file not found"}
-                continue
-            try:
-                cursor.execute(sql)
-                rows = cursor.fetchall()
-                                # convert Row objects to plain dictionaries
-                results[query_name] = [dict(row) for row in rows]
- 
-            except sqlite3.Error as e:
-                # if one query fails, record the error and continue
-                # don't let one bad query crash the whole retrieval
-                results[query_name] = {"error": str(e)}
-                print(f"  WARNING: Query failed — {query_name}: {e}")
- 
-    finally:
-        # always close the connection even if something fails
-        conn.close()
+    # serve what we can from the metric cache — entries are
+    # only valid for the database version they came from
+    if USE_METRIC_CACHE:
+        version = pool.version()
+        pending = {}
+        for query_name, sql in queries.items():
+            rows = metric_cache.get(db_key, query_name, version)
+            if rows is None:
+                pending[query_name] = sql
+            else:
+                results[query_name] = rows
+    else:
+        version = None
+        pending = queries
+
+    if not pending:
+        return results
+
+    materialized = _materialized_for(pool, version)
+    if parallel and len(pending) > 1:
+        # one query per task, each on its own pooled connection;
+        # sqlite3 releases the GIL while a statement runs
+        futures = [
+            _get_executor().submit(_run_queries, pool, {query_name: sql}, version, materialized)
+            for query_name, sql in pending.items()
+        ]
+        for future in futures:
+            results.update(future.result())
+    else:
+        results.update(_run_queries(pool, pending, version, materialized))
+
+    # keep the caller's query order
+    results = {query_name: results[query_name] for query_name in queries}
  
     return results
  
 
 
+def data_version(db_key):
+    """Current version stamp of a company database (see db_pool.ConnectionPool.version)."""
+    if db_key not in DB_PATHS:
+        raise ValueError(f"Unknown database: {db_key}." f"choose from: {list(DB_PATHS.keys())}")
+    db_path = DB_PATHS[db_key]
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"Database file not found: {db_path}")
+    return get_pool(db_key, db_path).version()
+
+
+@spanned("embed")
+def embed_questions(questions):
+    """
+    Embed a list of questions, encoding only the ones the
+    embedding cache has not seen (in one batch).
+
+    Returns:
+        np.ndarray (len(questions), dim) float32
+    """
+    return embedding_cache.encode(questions, lambda texts: get_encoder().encode(texts))
+
+
+def embed_question(question):
+    """Embedding vector for one question (cached)."""
+    return embed_questions([question])[0]
+
+
 def get_concepts(question):
     """
     Retrieve the most relevant financial concept document for a given user questions.
     Args:
         questions: plain ENglish user question (string)
     Returns:
-        list of dicts: [{metric, text, score}, ....]
-    """
-    query_vector = embedding_model.encode([question]).tolist()
-    results = collection.query(
-        query_embeddings = query_vector,
-        n_results = TOP_K_CONCEPTS,
-        include= ["documents", 'metadatas', "distances"]
-    )
-    concepts = []
-    for i in range(len(results["ids"][0])):
-        concepts.append({
-            "metric": results["metadatas"][0][i]["metric"],
-            "text": results["documents"][0][i],
-            "score": round(1 - results["distances"][0][i], 4)
-        })
+        list of dicts: [{id, metric, text, score}, ....]
+    """
+    if CACHE_CONCEPT_RESULTS:
+        cache_key = normalize_question(question)
+        cached = embedding_cache.get_results(cache_key, TOP_K_CONCEPTS)
+        if cached is not None:
+            return cached
+
+    vector = embed_question(question)
+    with span("vector_search"):
+        concepts = get_concept_store().query(vector, TOP_K_CONCEPTS)
+    if CACHE_CONCEPT_RESULTS:
+        embedding_cache.put_results(cache_key, TOP_K_CONCEPTS, concepts)
     return concepts 
 
-def retrieve(question, db_key):
+def _timed(func, *args):
+    """Run func(*args) and return (result, elapsed ms)."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, round((time.perf_counter() - start) * 1000, 2)
+
+
+@spanned("retrieve")
+def retrieve(question, db_key, selected_queries=None, parallel=None):
     """
     Full retrieval pipeline. Given a user question and a
     selected database, returns both live financial data and
@@ -152,21 +535,108 @@ def retrieve(question, db_key):
     Args:
         question: plain English user question
         db_key:   "service1", "service2", or "service3"
+        selected_queries: query names from query_router.route().
+                          Only these are executed. None runs all.
+        parallel: run the SQL metrics (fanned out across pooled
+                  connections) at the same time as the embedding
+                  + vector search. Defaults to PARALLEL_RETRIEVAL.
  
     Returns:
         dict: {
             "live_data": {query_name: [rows]},
-            "concepts":  [{metric, text, score}]
+            "concepts":  [{metric, text, score}],
+            "data_version": database version stamp, taken
+                            before the SQL ran,
+            "timings":   {"sql_ms", "concepts_ms", "total_ms"}
         }
     """
-    live_data = get_live_data(db_key)
-    concepts = get_concepts(question)
+    if parallel is None:
+        parallel = PARALLEL_RETRIEVAL
+
+    start = time.perf_counter()
+    version = data_version(db_key)
+    if parallel:
+        # concept search runs in the background while this
+        # thread fans the SQL metrics out
+        concepts_future = _get_executor().submit(in_context(_timed), get_concepts, question)
+        live_data, sql_ms = _timed(get_live_data, db_key, selected_queries, True)
+        concepts, concepts_ms = concepts_future.result()
+    else:
+        live_data, sql_ms = _timed(get_live_data, db_key, selected_queries)
+        concepts, concepts_ms = _timed(get_concepts, question)
+
     return {
         "live_data": live_data,
-        "concepts": concepts
+        "concepts": concepts,
+        "data_version": version,
+        "timings": {
+            "sql_ms": sql_ms,
+            "concepts_ms": concepts_ms,
+            "total_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
     }
 
 
+
+def _company_data(db_key, selected_queries):
+    """Version stamp + metrics for one company, timed (runs on the retrieval pool)."""
+    start = time.perf_counter()
+    version = data_version(db_key)
+    live_data = get_live_data(db_key, selected_queries)
+    return version, live_data, round((time.perf_counter() - start) * 1000, 2)
+
+
+def retrieve_many(question, db_keys=None, selected_queries=None):
+    """
+    Retrieval for one question across several companies: the
+    question is embedded and the concept store searched ONCE,
+    while every company's metrics run concurrently (one task per
+    database on the retrieval pool).
+
+    Args:
+        question:         plain English user question
+        db_keys:          companies to compare (default: all DB_PATHS)
+        selected_queries: query names from query_router.route()
+
+    Returns:
+        dict: {
+            "live_data":     {db_key: {query_name: [rows]}},
+            "concepts":      [{id, metric, text, score}],
+            "data_versions": {db_key: version stamp},
+            "timings":       {"concepts_ms", "sql_ms",
+                              "sql_ms_per_company": {db_key: ms},
+                              "total_ms"}
+        }
+    """
+    db_keys = list(db_keys or DB_PATHS)
+    for db_key in db_keys:
+        if db_key not in DB_PATHS:
+            raise ValueError(f"Unknown database: {db_key}." f"choose from: {list(DB_PATHS.keys())}")
+
+    start = time.perf_counter()
+    executor = _get_executor()
+    concepts_future = executor.submit(in_context(_timed), get_concepts, question)
+    company_futures = {db_key: executor.submit(in_context(_company_data), db_key, selected_queries)
+                       for db_key in db_keys}
+
+    live_data, versions, per_company = {}, {}, {}
+    for db_key, future in company_futures.items():
+        versions[db_key], live_data[db_key], per_company[db_key] = future.result()
+    sql_ms = round((time.perf_counter() - start) * 1000, 2)
+    concepts, concepts_ms = concepts_future.result()
+
+    return {
+        "live_data": live_data,
+        "concepts": concepts,
+        "data_versions": versions,
+        "timings": {
+            "concepts_ms": concepts_ms,
+            "sql_ms": sql_ms,
+            "sql_ms_per_company": per_company,
+            "total_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
+    }
+
 if __name__ == "__main__":
     print("=" * 60)
     print("Retreive.py - Quick test")
@@ -176,6 +646,7 @@ if __name__ == "__main__":
     print(f"\nQuestions: {test_question}")
     print(f"Database: {test_db}\n")
     result = retrieve(test_question, test_db)
+    print(f"Timings: {result['timings']}\n")
 
     #show concept retrieval results
     print("CONCEPTS RETRIEVED:")
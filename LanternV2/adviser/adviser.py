@@ -1,14 +1,78 @@
+import hashlib
 import json
-import requests
-from query_router import route
-from retrieve import retrieve 
+import time
+from answer_cache import answer_cache, make_key, replay
+from context_packer import pack_context, CONTEXT_WINDOW
+from table_format import format_rows
+from ollama_client import ollama, OllamaError, OLLAMA_MODEL
+from query_router import route, set_embedder, ALWAYS_INCLUDE
+from retrieve import retrieve, retrieve_many, embed_question, embed_questions, SQL_FILES
+from retrieve import warm_up as warm_retrieval
+from semantic_cache import semantic_cache
+from tracing import record, span, spanned, traced
 
 # -------------------------------------------------------------
 # CONFIGURATION
 # -------------------------------------------------------------
  
-OLLAMA_URL   = "http://localhost:11434/api/generate"
-OLLAMA_MODEL = "llama3.1:8b"
+# Ollama host, model, keep_alive, retries and timeouts live in
+# ollama_client.py — shared with the web app.
+
+# "chat":     stable system prefix + conversation turns through
+#             /api/chat, so Ollama reuses its KV cache across turns
+# "generate": one flat prompt per question through /api/generate
+PROMPT_MODE = "chat"
+
+# shrink concepts / live data / history to the model's context
+# window before building the prompt (see context_packer.py)
+PACK_CONTEXT = True
+
+# how each metric's rows are written into the prompt (see
+# table_format.py): "kv" = one "key: value" line per column,
+# "csv" / "markdown" = header once + one line per row.
+# Multi-row series are far cheaper as tables.
+DEFAULT_ROW_FORMAT = "kv"
+METRIC_FORMATS = {
+    "monthly_revenue_trend": "csv",
+    "expense_breakdown":     "csv",
+    "client_concentration":  "csv",
+    "client_churn_rate":     "csv"
+}
+
+
+def row_format_for(query_name):
+    return METRIC_FORMATS.get(query_name, DEFAULT_ROW_FORMAT)
+
+# reuse finished answers for identical requests (same question,
+# company, metrics, concept docs and database version) — see
+# answer_cache.py. Requests can still opt out one by one.
+USE_ANSWER_CACHE = True
+
+# on an exact miss, also reuse the answer to a reworded question
+# about the same company, data and metrics (semantic_cache.py).
+# First turns only — a follow-up's answer depends on the history.
+USE_SEMANTIC_CACHE = True
+
+# semantic / hybrid routing (query_router.ROUTER_MODE) embeds the
+# question with the same cached model as concept retrieval, so
+# get_concepts reuses the vector instead of encoding it again
+set_embedder(embed_questions)
+
+
+def warm_up():
+    """
+    Load everything the first question would otherwise wait for:
+    embedding model, concept store, SQL files and (semantic /
+    hybrid routing) the metric description vectors.
+
+    Returns:
+        dict: load time per resource in ms
+    """
+    timings = warm_retrieval()
+    start = time.perf_counter()
+    route("warm up")
+    timings["router_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return timings
 
 
 
@@ -20,29 +84,17 @@ COMPANY_NAMES = {
 
 
 
-def build_prompt(question, company_name, live_data, concepts, selected_queries, history=None):
+def build_system(company_name):
     """
-    Build a structured prompts for the LLM combining live
-    fianacial data and retrieved concepts documents.
-    Args:
-        question:   user's plain English question
-        company_name:   human readable company name
-        live_data:  dict of SQL query results
-        concepts:   list of retreived concepts docs
-        selected_queries:   list of query names that were run 
-    Returns:
-        str: complete prompt ready to send to Ollama
+    SECTION 1: SYSTEM INSTRUCTION
+    Tells the LLM who it is and how to behave.
+    Key rules:
+      - Only use the data provided (no hallucination)
+      - Be specific and direct
+      - Always cite the numbers
+      - Flag risks clearly
     """
-    # ---------------------------------------------------------
-    # SECTION 1: SYSTEM INSTRUCTION
-    # Tells the LLM who it is and how to behave.
-    # Key rules:
-    #   - Only use the data provided (no hallucination)
-    #   - Be specific and direct
-    #   - Always cite the numbers
-    #   - Flag risks clearly
-    # ---------------------------------------------------------
-    system = f"""You are Lantern, an AI financial adviser for small business, analyzing {company_name}.
+    return f"""You are Lantern, an AI financial adviser for small business, analyzing {company_name}.
     Your job is to answer financial questions using ONLY the data provided below.
     Follow these rules strictly:
     - Always reference specifi numbers from the data,
@@ -54,23 +106,30 @@ def build_prompt(question, company_name, live_data, concepts, selected_queries,
     - Keep reponse concise, but complete,
     - Read benchmark ranges carefully and match numbers precisely
     """
-    # ---------------------------------------------------------
-    # SECTION 2: FINANCIAL CONCEPT KNOWLEDGE
-    # The relevant concept documents retrieved from ChromaDB.
-    # This gives the LLM the benchmarks and interpretation
-    # framework it needs to judge the numbers.
-    # ---------------------------------------------------------
+
+
+def build_concept_section(concepts):
+    """
+    SECTION 2: FINANCIAL CONCEPT KNOWLEDGE
+    The relevant concept documents retrieved from the concept
+    store. This gives the LLM the benchmarks and interpretation
+    framework it needs to judge the numbers.
+    """
     concept_section = "\n\n=== FINANCIAL CONCEPT KNOWLEDGE ===\n"
     for concept in concepts:
         concept_section += f"\n--- {concept['metric']} ---\n"
         concept_section += concept["text"]
         concept_section += "\n"
-    # ---------------------------------------------------------
-    # SECTION 3: LIVE FINANCIAL DATA
-    # The actual query results from the SQLite database.
-    # Only includes the queries selected by the router —
-    # not all 8 every time.
-    # --
+    return concept_section
+
+
+def build_data_section(company_name, live_data, selected_queries):
+    """
+    SECTION 3: LIVE FINANCIAL DATA
+    The actual query results from the SQLite database.
+    Only includes the queries selected by the router —
+    not all 8 every time.
+    """
     data_section = "\n\n=== LIVE FINANCIAL DATA ===\n"
     data_section += f"Company: {company_name}\n\n"
 
@@ -83,14 +142,13 @@ def build_prompt(question, company_name, live_data, concepts, selected_queries,
         elif isinstance(rows, list) and len(rows) == 0:
             data_section += " No data returned\n"
         elif isinstance(rows, list):
-            for row in rows:
-                # format each row as key: value pairs
-                for key, value in row.items():
-                    data_section += f"  {key}: {value}\n"
-                data_section += "\n"
+            data_section += format_rows(rows, row_format_for(query_name))
         else:
             data_section += f"  {rows}\n"
-    
+    return data_section
+
+
+def build_history_section(history):
     history_section = ""
     if history and len(history) > 0:
         history_section = "\n\n=== CONVERSTATION HISTORY ===\n"
@@ -98,6 +156,32 @@ def build_prompt(question, company_name, live_data, concepts, selected_queries,
         for exchange in history:
             history_section += f"User: {exchange['question']}\n"
             history_section += f"Lantern: {exchange['answer']}\n\n" 
+    return history_section
+
+
+RESPONSE_INSTRUCTIONS = """Analyze the data above and answer the question directly.
+Reference specific numbers and benchmark in your answer.
+If the user refers to something from the converstation history, use that context. 
+"""
+
+
+def build_prompt(question, company_name, live_data, concepts, selected_queries, history=None):
+    """
+    Build a structured prompts for the LLM combining live
+    fianacial data and retrieved concepts documents.
+    Args:
+        question:   user's plain English question
+        company_name:   human readable company name
+        live_data:  dict of SQL query results
+        concepts:   list of retreived concepts docs
+        selected_queries:   list of query names that were run 
+    Returns:
+        str: complete prompt ready to send to Ollama
+    """
+    system = build_system(company_name)
+    concept_section = build_concept_section(concepts)
+    data_section = build_data_section(company_name, live_data, selected_queries)
+    history_section = build_history_section(history)
     # ---------------------------------------------------------
     # ASSEMBLE THE FULL PROMPT
     # --------------------
@@ -110,18 +194,217 @@ def build_prompt(question, company_name, live_data, concepts, selected_queries,
 {question}
 
 === YOUR RESPONSE ===
-Analyze the data above and answer the question directly.
-Reference specific numbers and benchmark in your answer.
-If the user refers to something from the converstation history, use that context. 
-"""
+{RESPONSE_INSTRUCTIONS}"""
     return prompt 
 
+# -------------------------------------------------------------
+# CHAT MESSAGES (PROMPT-PREFIX REUSE)
+# -------------------------------------------------------------
+# build_prompt() interleaves history and the question into one
+# new string every turn, so Ollama re-evaluates the whole
+# prompt each time. build_messages() instead produces:
+#
+#   [system: rules + baseline data + response instructions,
+#    user: q1, assistant: a1, ...,
+#    user: current question + its concepts + its routed data]
+#
+# Only what stays the same for the whole session goes into the
+# system message: the rules, the company and the data of the
+# router's ALWAYS_INCLUDE metrics, which every question gets.
+# It is byte-identical for the same (db_key, data version)
+# whatever the question. The concepts and the other routed
+# metrics depend on the question, so they ride in the last user
+# turn, after the question text. Earlier turns are replayed as
+# the bare question and answer and never change (the packer
+# only drops whole turns from the front). Ollama keeps the KV
+# cache of the previous request, so a follow-up only pays
+# prompt evaluation after the shared prefix: the rest of the
+# previous question's turn, the last answer and the new
+# question with its context.
+# -------------------------------------------------------------
+
+def canonical_queries(selected_queries):
+    """Router picks in a fixed order (SQL_FILES order), not score order."""
+    order = list(SQL_FILES)
+    return sorted(selected_queries, key=lambda q: order.index(q) if q in order else len(order))
+
+
+def build_messages(question, company_name, live_data, concepts, selected_queries, history=None):
+    """
+    Build Ollama chat messages with a stable, cache-friendly prefix.
+    Same arguments as build_prompt().
+
+    Returns:
+        list of {"role", "content"} dicts for /api/chat
+    """
+    session_queries = canonical_queries(ALWAYS_INCLUDE)
+    question_queries = [q for q in canonical_queries(selected_queries) if q not in session_queries]
+    system = (
+        build_system(company_name)
+        + build_data_section(company_name, live_data, session_queries)
+        + "\n=== HOW TO RESPOND ===\n"
+        + RESPONSE_INSTRUCTIONS
+    )
+    messages = [{"role": "system", "content": system}]
+    for exchange in history or []:
+        messages.append({"role": "user", "content": exchange["question"]})
+        messages.append({"role": "assistant", "content": exchange["answer"]})
+
+    # the question comes first so this turn starts with the same
+    # bytes it will have when it is replayed as history
+    concepts = sorted(concepts, key=lambda c: c.get("id", c["metric"]))
+    current = question + "\n" + build_concept_section(concepts)
+    if question_queries:
+        current += "\n" + build_data_section(company_name, live_data, question_queries)
+    messages.append({"role": "user", "content": current})
+    return messages
+
+
+def prefix_key(messages):
+    """
+    Short hash of the system message — equal keys mean Ollama can
+    reuse its KV cache at least up to the first user turn.
+    """
+    return hashlib.sha1(messages[0]["content"].encode("utf-8")).hexdigest()[:12]
+
+@spanned("prompt")
+def build_request_prompt(question, company_name, live_data, concepts, selected_queries, history=None):
+    """
+    Pack the context to the token budget, then build the prompt
+    for PROMPT_MODE. Used by both the CLI (ask) and the web app.
+
+    Returns:
+        (prompt, report) — prompt is a string or chat messages;
+        report says what the packer dropped (None if disabled)
+    """
+    report = None
+    if PACK_CONTEXT:
+        live_data, concepts, history, report = pack_context(
+            system_text=build_system(company_name) + RESPONSE_INSTRUCTIONS,
+            question=question,
+            live_data=live_data,
+            concepts=concepts,
+            selected_queries=selected_queries,
+            history=history,
+            context_window=ollama.options.get("num_ctx", CONTEXT_WINDOW),
+            formats={q: row_format_for(q) for q in selected_queries},
+            # rows that go into the chat system message
+            stable_queries=ALWAYS_INCLUDE
+        )
+
+    build = build_messages if PROMPT_MODE == "chat" else build_prompt
+    prompt = build(
+        question = question,
+        company_name = company_name,
+        live_data = live_data,
+        concepts = concepts,
+        selected_queries=selected_queries,
+        history = history
+    )
+    return prompt, report
+
+def generation_settings():
+    """
+    Everything besides the prompt data that changes an answer:
+    model, prompt layout and sampling options. Part of both the
+    exact and the semantic answer cache keys.
+    """
+    return [OLLAMA_MODEL, PROMPT_MODE, PACK_CONTEXT, ollama.options]
+
+
+def answer_key(question, db_key, selected_queries, context, history=None):
+    """
+    Answer-cache key for a request, from the router's picks and
+    the output of retrieve(). Model, prompt settings and history
+    are part of the key because they change the answer too.
+    """
+    return make_key(
+        question,
+        db_key,
+        canonical_queries(selected_queries),
+        [c.get("id", c["metric"]) for c in context["concepts"]],
+        context["data_version"],
+        *generation_settings(),
+        history or []
+    )
+
+
+def answer_topic(selected_queries):
+    """
+    The metric a question is about, for the semantic cache: the
+    router's highest-ranked pick outside ALWAYS_INCLUDE, or all
+    picks when it chose nothing else.
+
+    Args:
+        selected_queries: route() output, in the router's order
+    """
+    for query_name in selected_queries:
+        if query_name not in ALWAYS_INCLUDE:
+            return query_name
+    return ",".join(canonical_queries(selected_queries))
+
+
+@spanned("answer_cache")
+def lookup_answer(question, db_key, selected_queries, context, history=None):
+    """
+    Check the exact, then the semantic answer cache. Runs after
+    retrieve(), so the data version and concept IDs are known.
+
+    Returns:
+        (answer, hit, entry) — answer is None on a miss; hit is
+        {"source": "exact"} or {"source": "semantic", "id",
+        "question", "similarity"}; pass entry to
+        remember_answer() once a fresh answer is complete
+    """
+    entry = {
+        "key": answer_key(question, db_key, selected_queries, context, history),
+        "question": question,
+        "db_key": db_key,
+        "queries": canonical_queries(selected_queries),
+        "topic": answer_topic(selected_queries),
+        "version": context["data_version"],
+        "settings": json.dumps(generation_settings(), sort_keys=True, default=str),
+        "semantic": USE_SEMANTIC_CACHE and not history,
+        "vector": None
+    }
+    cached = answer_cache.get(entry["key"])
+    if cached is not None:
+        return cached, {"source": "exact"}, entry
+
+    if entry["semantic"]:
+        # embedding is already in the embedding cache from get_concepts;
+        # kept in the entry so remember_answer never encodes again
+        entry["vector"] = embed_question(question)
+        match = semantic_cache.lookup(db_key, entry["version"], entry["vector"], entry["topic"],
+                                      entry["settings"])
+        if match is not None:
+            hit = {"source": "semantic", "id": match["id"],
+                   "question": match["question"], "similarity": match["similarity"]}
+            return match["answer"], hit, entry
+    return None, None, entry
+
+
+def remember_answer(entry, answer):
+    """
+    Store a complete answer from lookup_answer()'s entry in both
+    caches. Only encodes the question if lookup_answer() didn't.
+    """
+    if not answer or answer.startswith("ERROR"):
+        return
+    answer_cache.put(entry["key"], answer)
+    if entry["semantic"]:
+        vector = entry["vector"] if entry.get("vector") is not None else embed_question(entry["question"])
+        semantic_cache.put(entry["db_key"], entry["version"], vector,
+                           entry["question"], entry["topic"], answer, entry["settings"])
+
 # -------------------------------------------------------------
 # CALL OLLAMA
 # -------------------------------------------------------------
 # Sends the prompt to the local Ollama server and returns
 # the response text. Streams the response so we can show
 # output as it generates rather than waiting for completion.
+# Goes through the shared client so connections and the
+# loaded model are reused between questions.
 # -------------------------------------------------------------
 def call_ollama(prompt, stream=True):
     """
@@ -129,59 +412,209 @@ def call_ollama(prompt, stream=True):
     the generated response.
 
     Args:
-        prompt: complete prompt string
+        prompt: complete prompt string, or a list of chat
+                messages from build_messages()
         stream: if True, print tokens as they generate
 
     Returns:
         str: complete response text
     """
-    payload = {
-        "model": OLLAMA_MODEL,
-        "prompt": prompt,
-        "stream": stream,
-        "options": {
-            "temperature": 0.1,
-            # low temperature = more focused, less creative 
-            # financial advice should be precise, not creative
-            "num_predict": 512
-            # max tokens to generate per response 
-        }
-    }
-    try:
-        response = requests.post(
-            OLLAMA_URL,
-            json=payload,
-            stream=stream,
-            timeout=120 # 2 minute timeout 
-        )
-        response.raise_for_status()
-    except requests.exceptions.ConnectionError:
-        return "ERROR: Cannot Connect to OLLAMA, Make sure server is running."
-    except requests.exceptions.Timeout:            # ✅
-        return "ERROR: Ollama timed out..."
-    
-    # Collect the streamed responses 
-    full_response = ""
+    start = time.perf_counter()
+    first_token = []
+
+    def on_token(token):
+        if not first_token:
+            first_token.append(token)
+            record("ttft", (time.perf_counter() - start) * 1000)
+        if stream:
+            print(token, end="", flush=True)
 
     if stream:
         print("\nLantern: ", end="", flush=True)
-        for line in response.iter_lines():
-            if line:
-                try:
-                    chunk = json.loads(line)
-                    token = chunk.get("response", "")
-                    print(token, end="", flush=True)
-                    full_response += token
-                    if chunk.get("done", False):
-                        break
-                except json.JSONDecodeError:
-                    continue
+    try:
+        with span("generate"):
+            if isinstance(prompt, list):
+                full_response = ollama.chat(prompt, on_token=on_token)
+            else:
+                full_response = ollama.generate(prompt, on_token=on_token)
+    except OllamaError as e:
+        if e.kind == "connection":
+            return "ERROR: Cannot Connect to OLLAMA, Make sure server is running."
+        if e.kind == "timeout":
+            return "ERROR: Ollama timed out..."
+        return f"ERROR: {e}"
+
+    if stream:
         print("\n") # newline after streaming completes
-    else:
-        data = response.json()
-        full_response = data.get("response", "")
+        call = ollama.last_call()
+        if call and call.get("tokens_per_sec"):
+            print(f"(first token {call['ttft_ms']} ms, {call['tokens_per_sec']} tokens/sec, "
+                  f"{call['prompt_tokens']} prompt tokens evaluated)")
     return full_response 
 
+# -------------------------------------------------------------
+# CROSS-COMPANY COMPARISON
+# -------------------------------------------------------------
+# "Ask the same question across all three companies" used to
+# mean three ask() calls: three embeddings, three concept
+# searches and three answers to read side by side. compare()
+# routes and retrieves concepts once, runs the metrics for every
+# company concurrently (retrieve_many) and asks for ONE
+# comparative answer.
+# -------------------------------------------------------------
+
+def build_comparison_system(company_names):
+    """SECTION 1 for a comparison: same rules, several companies."""
+    return f"""You are Lantern, an AI financial adviser for small business, comparing {", ".join(company_names)}.
+    Your job is to answer financial questions using ONLY the data provided below.
+    Follow these rules strictly:
+    - Always reference specific numbers from the data for every company,
+    - Compare the companies with each other and against the benchmarks provided in the concepts knowledge,
+    - Say which company is strongest and which is weakest on each metric you discuss,
+    - Flag any metrics that are in Warning or Critical range, naming the company,
+    - Be direct and specific - avoid vague statments,
+    - If data is missing or shows an error for a company, say so clearly,
+    - Keep reponse concise, but complete
+    """
+
+
+COMPARISON_INSTRUCTIONS = """Compare the companies above and answer the question directly.
+Reference specific numbers for each company and the benchmarks in your answer.
+End with the company that most needs attention and its priority action.
+"""
+
+
+def build_comparison_prompt(question, company_data, concepts, selected_queries, history=None):
+    """
+    Build one prompt covering several companies.
+
+    Args:
+        question:         user's plain English question
+        company_data:     {company_name: live_data dict}
+        concepts:         list of retrieved concept docs (shared)
+        selected_queries: list of query names that were run
+        history:          earlier [{question, answer}] comparisons
+
+    Returns:
+        str for PROMPT_MODE "generate", chat messages for "chat"
+    """
+    queries = canonical_queries(selected_queries)
+    concepts = sorted(concepts, key=lambda c: c.get("id", c["metric"]))
+    data_sections = "".join(
+        build_data_section(company_name, live_data, queries)
+        for company_name, live_data in company_data.items()
+    )
+    system = build_comparison_system(list(company_data))
+
+    if PROMPT_MODE == "chat":
+        messages = [{"role": "system", "content": (
+            system + build_concept_section(concepts) + "\n" + data_sections
+            + "\n=== HOW TO RESPOND ===\n" + COMPARISON_INSTRUCTIONS
+        )}]
+        for exchange in history or []:
+            messages.append({"role": "user", "content": exchange["question"]})
+            messages.append({"role": "assistant", "content": exchange["answer"]})
+        messages.append({"role": "user", "content": question})
+        return messages
+
+    return f"""{system}
+{build_concept_section(concepts)}
+
+{data_sections}
+{build_history_section(history)}
+=== CURRENT QUESTION ===
+{question}
+
+=== YOUR RESPONSE ===
+{COMPARISON_INSTRUCTIONS}"""
+
+
+def prepare_comparison(question, db_keys=None, history=None):
+    """
+    Route, retrieve for every company and build the comparative
+    prompt. Used by compare() and the web app's /compare.
+
+    Returns:
+        (prompt, packing report or None, timings) — timings has
+        route_ms, concepts_ms, sql_ms, sql_ms_per_company,
+        retrieve_ms and prompt_ms
+    """
+    timings = {}
+    start = time.perf_counter()
+    selected_queries = route(question)
+    timings["route_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    context = retrieve_many(question, db_keys, selected_queries)
+    timings["concepts_ms"] = context["timings"]["concepts_ms"]
+    timings["sql_ms"] = context["timings"]["sql_ms"]
+    timings["sql_ms_per_company"] = context["timings"]["sql_ms_per_company"]
+    timings["retrieve_ms"] = context["timings"]["total_ms"]
+
+    start = time.perf_counter()
+    live_data, concepts = context["live_data"], context["concepts"]
+    report = None
+    if PACK_CONTEXT:
+        # pack all companies' metrics against one budget, keyed
+        # "db_key/query_name" so each row set is shrunk on its own
+        flat = {f"{db_key}/{q}": rows for db_key, data in live_data.items() for q, rows in data.items()}
+        names = [f"{db_key}/{q}" for db_key in live_data for q in selected_queries]
+        flat, concepts, history, report = pack_context(
+            system_text=build_comparison_system(
+                [COMPANY_NAMES.get(k, k) for k in live_data]) + COMPARISON_INSTRUCTIONS,
+            question=question,
+            live_data=flat,
+            concepts=concepts,
+            selected_queries=names,
+            history=history,
+            context_window=ollama.options.get("num_ctx", CONTEXT_WINDOW),
+            formats={name: row_format_for(name.split("/", 1)[1]) for name in names}
+        )
+        live_data = {db_key: {q: flat[f"{db_key}/{q}"] for q in data}
+                     for db_key, data in live_data.items()}
+
+    prompt = build_comparison_prompt(
+        question=question,
+        company_data={COMPANY_NAMES.get(k, k): data for k, data in live_data.items()},
+        concepts=concepts,
+        selected_queries=selected_queries,
+        history=history
+    )
+    timings["prompt_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return prompt, report, timings
+
+
+def compare(question, db_keys=None, history=None):
+    """
+    Answer one question across several companies with a single
+    comparative response.
+
+    Args:
+        question: plain English user question
+        db_keys:  companies to compare (default: all)
+        history:  earlier [{question, answer}] comparisons
+
+    Returns:
+        (response text, timings per stage)
+    """
+    print(f"\nComparing {', '.join(COMPANY_NAMES.get(k, k) for k in db_keys or COMPANY_NAMES)}...")
+    prompt, report, timings = prepare_comparison(question, db_keys, history)
+    per_company = ", ".join(f"{k} {ms} ms" for k, ms in timings["sql_ms_per_company"].items())
+    print(f"Routed in {timings['route_ms']} ms, retrieved in {timings['retrieve_ms']} ms "
+          f"(concepts {timings['concepts_ms']} ms once; sql {per_company})")
+    if report:
+        print(f"Context: ~{report['used']} of {report['budget']} tokens")
+        for item in report["dropped"]:
+            print(f"  packed {item}")
+
+    print(f"Sending to Ollama ({OLLAMA_MODEL})...")
+    start = time.perf_counter()
+    response = call_ollama(prompt)
+    timings["generate_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    call = ollama.last_call()
+    if call:
+        timings["ttft_ms"] = call.get("ttft_ms")
+    return response, timings
+
 # -------------------------------------------------------------
 # MAIN ADVISER FUNCTION
 # -------------------------------------------------------------
@@ -189,7 +622,7 @@ def call_ollama(prompt, stream=True):
 # Everything else in this file supports this function.
 # -------------------------------------------------------------
  
-def ask(question, db_key):
+def ask(question, db_key, history=None, use_cache=True):
     """
     The main adviser functions. Takes a user question and
     database selection, runs the full pipeline, and returns
@@ -198,30 +631,69 @@ def ask(question, db_key):
     Args: 
         question: plain English user question
         db_key: "service1", "service2", "service3"
+        history: earlier [{question, answer}] exchanges in
+                 this session (oldest first)
+        use_cache: reuse / store the answer in the answer cache
 
     Returns: 
         str: financial adviser reponse
     """
+    with traced("ask") as trace:
+        response = _answer(question, db_key, history, use_cache)
+    print(f"Stages: {trace.summary()}")
+    return response
+
+
+def _answer(question, db_key, history, use_cache):
+    """The pipeline behind ask(), run inside its trace."""
     company_name = COMPANY_NAMES.get(db_key, db_key)
 
     print(f"\nRouting question ...")
     selected_queries = route(question)
     print(f"Selected queries: {selected_queries}")
     print(f"Retrieving data from {company_name}...")
-    context = retrieve(question, db_key)
+    context = retrieve(question, db_key, selected_queries)
     live_data = context["live_data"]
     concepts = context["concepts"]
+    timings = context["timings"]
+    print(f"Retrieved in {timings['total_ms']} ms "
+          f"(sql {timings['sql_ms']} ms, concepts {timings['concepts_ms']} ms)")
+
+    cache_entry = None
+    if USE_ANSWER_CACHE and use_cache:
+        cached, hit, cache_entry = lookup_answer(question, db_key, selected_queries, context, history)
+        if cached is not None:
+            if hit["source"] == "semantic":
+                print(f"Semantic cache hit — {hit['similarity']} similar to \"{hit['question']}\".")
+            else:
+                print(f"Answer cache hit — same question and data as before.")
+            print("\nLantern: ", end="", flush=True)
+            for chunk in replay(cached):
+                print(chunk, end="", flush=True)
+            print("\n")
+            return cached
+    elif USE_ANSWER_CACHE:
+        answer_cache.bypass()
 
     print(f"Building prompts...")
-    prompt = build_prompt(
+    prompt, report = build_request_prompt(
         question = question,
         company_name = company_name,
         live_data = live_data,
         concepts = concepts,
-        selected_queries=selected_queries
+        selected_queries=selected_queries,
+        history = history
     )
+    if report:
+        print(f"Context: ~{report['used']} of {report['budget']} tokens")
+        for item in report["dropped"]:
+            print(f"  packed {item}")
+    if PROMPT_MODE == "chat":
+        print(f"Prompt prefix: {prefix_key(prompt)}")
     print(f"Sending to Ollama ({OLLAMA_MODEL})...")
     response = call_ollama(prompt)
+    if cache_entry is not None:
+        remember_answer(cache_entry, response)
     return response 
 # -------------------------------------------------------------
 # QUICK TEST — runs when you execute this script directly
@@ -0,0 +1,176 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — answer_cache.py
+# Cache of finished answers for repeated questions
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   With temperature 0.1, the same question about the same
+#   company and the same data gets (nearly) the same answer.
+#   Dashboards and demos ask a handful of questions over and
+#   over, and every one used to cost a full LLM generation.
+#
+#   AnswerCache stores complete answers under a key built from
+#   everything that shaped the prompt:
+#     - normalized question (embedding_cache.normalize_question)
+#     - db_key
+#     - selected queries (canonical order)
+#     - IDs of the retrieved concept docs
+#     - database version stamp (db_pool.ConnectionPool.version)
+#     - anything else the caller passes (model, history, ...)
+#   When the database changes, its version changes, so old
+#   answers are simply never looked up again and age out.
+#
+#   replay() turns a cached answer back into a stream of
+#   chunks, so the CLI and web UI handle hits and misses the
+#   same way — a hit just arrives at full speed.
+#
+#   Eviction: least-recently-used once MAX_ENTRIES answers or
+#   MAX_BYTES of answer text are stored, and anything older
+#   than TTL_SECONDS.
+# =============================================================
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from embedding_cache import normalize_question
+
+# -------------------------------------------------------------
+# CONFIGURATION
+# -------------------------------------------------------------
+
+MAX_ENTRIES  = 512               # answers kept in memory
+MAX_BYTES    = 8 * 1024 * 1024   # total answer text (UTF-8)
+TTL_SECONDS  = 3600              # a cached answer is reused for at most this long
+REPLAY_CHUNK_CHARS = 32          # size of the chunks a hit is streamed in
+
+
+def make_key(question, db_key, selected_queries, concept_ids, version, *extra):
+    """
+    Cache key for one request.
+
+    Args:
+        question:         user question (normalized here)
+        db_key:           "service1", "service2", or "service3"
+        selected_queries: query names the prompt was built from
+        concept_ids:      IDs of the concept docs in the prompt
+        version:          database version stamp
+        extra:            anything else that changes the answer
+                          (model name, prompt mode, history ...)
+
+    Returns:
+        (db_key, hex digest)
+    """
+    parts = [
+        normalize_question(question),
+        list(selected_queries),
+        sorted(concept_ids),
+        version,
+        list(extra)
+    ]
+    digest = hashlib.sha1(
+        json.dumps(parts, default=str, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+    return (db_key, digest)
+
+
+def replay(answer, chunk_chars=REPLAY_CHUNK_CHARS):
+    """Yield a cached answer in word-aligned chunks, like a live stream."""
+    chunk = ""
+    for word in re.findall(r"\s*\S+\s*", answer):
+        chunk += word
+        if len(chunk) >= chunk_chars:
+            yield chunk
+            chunk = ""
+    if chunk:
+        yield chunk
+
+
+class AnswerCache:
+    """
+    Thread-safe LRU + TTL cache of complete answers, bounded by
+    entry count and total size.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES, ttl=TTL_SECONDS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (stored_at, size, answer)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evictions = 0
+        self._bypassed = 0
+
+    def get(self, key):
+        """Cached answer for a key from make_key(), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            stored_at, size, answer = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self._bytes -= size
+                self._expired += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return answer
+
+    def put(self, key, answer):
+        """Store a complete answer. Answers bigger than the whole cache are skipped."""
+        size = len(answer.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (time.monotonic(), size, answer)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._evictions += 1
+
+    def bypass(self):
+        """Count a request that opted out of the cache."""
+        with self._lock:
+            self._bypassed += 1
+
+    def invalidate(self, db_key=None):
+        """Drop every answer, or only the answers for one database."""
+        with self._lock:
+            for key in [k for k in self._entries if db_key is None or k[0] == db_key]:
+                self._bytes -= self._entries.pop(key)[1]
+
+    def stats(self):
+        """Hit/miss counters as a plain dict."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "expired": self._expired,
+                "evictions": self._evictions,
+                "bypassed": self._bypassed,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# shared by the CLI (adviser.ask) and the web app
+answer_cache = AnswerCache()
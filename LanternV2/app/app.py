@@ -3,20 +3,33 @@
 # Web server — connects the browser UI to the Lantern pipeline
 # =============================================================
 
-import json 
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware 
 from pydantic import BaseModel 
 from fastapi.staticfiles import StaticFiles
-from adviser import ask, COMPANY_NAMES
+from adviser import (ask, build_request_prompt, lookup_answer, remember_answer,
+                     prepare_comparison, warm_up, COMPANY_NAMES, USE_ANSWER_CACHE)
+from answer_cache import answer_cache, replay
+from semantic_cache import semantic_cache
+from batch import run_batch, BATCH_CONCURRENCY
 from query_router import route 
-from retrieve import retrieve 
-import requests as req 
+from retrieve import (retrieve, embedding_cache, embedding_batch_stats, embedding_worker_stats,
+                      LANTERN_HOME)
+from db_pool import pool_stats, close_all
+from metric_cache import metric_cache
+from ollama_client import ollama
+from tracing import finish_trace, histograms, in_context, metrics_text, record, start_trace
 
 app = FastAPI(title='Lantern Intelligence')
-app.mount("/static", StaticFiles(directory="/workspace/Lantern_V2/static"), name="static")
+app.mount("/static", StaticFiles(directory=os.path.join(LANTERN_HOME, "static")), name="static")
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,8 +37,64 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-OLLAMA_URL   = "http://localhost:11434/api/generate"
-OLLAMA_MODEL = "llama3.1:8b"
+# -------------------------------------------------------------
+# CONCURRENCY
+# -------------------------------------------------------------
+# Routing, retrieval and prompt building are blocking (SQLite,
+# SentenceTransformer, vector search). They run on a bounded
+# thread pool so the event loop keeps serving other users.
+# Ollama is streamed through the shared client in
+# ollama_client.py, whose async connection pool is reused
+# across requests.
+# -------------------------------------------------------------
+ASK_WORKERS = 8    # concurrent route + retrieve + prompt builds
+
+BATCH_JOBS  = 2    # /ask/batch runs at once (each has its own generation pool)
+
+ask_executor = ThreadPoolExecutor(max_workers=ASK_WORKERS, thread_name_prefix="ask")
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_JOBS, thread_name_prefix="batch-job")
+
+TIMING_HEADERS = True   # Server-Timing header on /ask (stages before streaming starts)
+
+# set once warm_up() has loaded the embedding model, concept
+# store and SQL; /ready answers 503 until then
+warm_timings = None
+# {"ollama" | "pipeline": error} for warm-up steps that failed;
+# a pipeline failure keeps /ready at 503 and says why
+warm_errors = {}
+
+def warm_pipeline():
+    global warm_timings
+    warm_timings = warm_up()
+    print(f"Pipeline warm: {warm_timings}")
+
+def warm_done(name):
+    """Done-callback for a background warm-up step: log and record failures."""
+    def done(future):
+        if future.cancelled():
+            error = "cancelled"
+        elif future.exception() is not None:
+            e = future.exception()
+            error = f"{type(e).__name__}: {e}"
+        elif future.result() is False:
+            # ollama.warm() returns False when the model did not load
+            error = "model did not load"
+        else:
+            return
+        warm_errors[name] = error
+        print(f"WARNING: {name} warm-up failed — {error}")
+    return done
+
+@app.on_event("startup")
+async def warm_model():
+    """
+    Load the models in the background so the first question
+    doesn't pay for them. The server accepts requests at once;
+    anything that needs a resource still loading waits for it.
+    """
+    loop = asyncio.get_running_loop()
+    loop.run_in_executor(None, ollama.warm).add_done_callback(warm_done("ollama"))
+    loop.run_in_executor(None, warm_pipeline).add_done_callback(warm_done("pipeline"))
 
 # -------------------------------------------------------------
 # History exchange
@@ -43,6 +112,7 @@ class QuestionRequest(BaseModel):
     question: str
     db_key: str
     history: Optional[List[HistoryExchange]] = []
+    use_cache: bool = True   # False = always generate a fresh answer
 # -------------------------------------------------------------
 # STREAMING ENDPOINT
 # -------------------------------------------------------------
@@ -52,57 +122,77 @@ class QuestionRequest(BaseModel):
 # real time, just like ChatGPT.
 # -------------------------------------------------------------
 
-def stream_ollama(prompt):
-    """Generator that yields tokens from Ollama as they arrive."""
-    payload = {
-        "model": OLLAMA_MODEL,
-        "prompt": prompt,
-        "stream": True,
-        "options": {
-            "temperature": 0.1,
-            "num_predict": 512
-        }
-    }
+async def stream_ollama(prompt, request, cache_entry=None, trace=None):
+    """
+    Async generator that yields tokens from Ollama as they arrive.
+    Stops (and closes the upstream stream, which makes Ollama
+    abandon the generation) as soon as the browser disconnects.
+    A complete answer is stored in the answer caches under
+    cache_entry (from adviser.lookup_answer, if given).
+    Time to first token, generation and the whole request are
+    recorded in trace (from tracing.start_trace, if given).
+    """
+    if isinstance(prompt, list):
+        tokens = ollama.astream_chat(prompt, is_disconnected=request.is_disconnected)
+    else:
+        tokens = ollama.astream_generate(prompt, is_disconnected=request.is_disconnected)
+    answer = []
+    start = time.perf_counter()
     try:
-        response = req.post(OLLAMA_URL, json=payload, stream=True, timeout=120)
-        response.raise_for_status()
-        for line in response.iter_lines():
-            if line:
-                try:
-                    chunk = json.loads(line)
-                    token = chunk.get("response", "")
-                    if token:
-                        yield token
-                    if chunk.get("done", False):
-                        break
-                except json.JSONDecodeError: 
-                    continue
+        async for token in tokens:
+            if not answer:
+                record("ttft", (time.perf_counter() - start) * 1000, trace)
+            answer.append(token)
+            yield token
     except Exception as e:
         yield f"ERROR: {str(e)}"
+        return
+    finally:
+        record("generate", (time.perf_counter() - start) * 1000, trace)
+        if trace is not None:
+            finish_trace(trace)
+    # a cut-off stream is not an answer worth replaying; storing
+    # may encode the question, so it stays off the event loop
+    if cache_entry is not None and answer and not await request.is_disconnected():
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(ask_executor, remember_answer, cache_entry, "".join(answer))
 
-@app.post("/ask")
-async def ask_question(req_body: QuestionRequest):
-    """
-    Main endpoint. Takes a question and db_key, runs the 
-    full pipeline, and streams the LLM response back.
+
+async def stream_cached(answer, trace=None):
+    """Replay a cached answer as a stream."""
+    try:
+        for chunk in replay(answer):
+            yield chunk
+    finally:
+        if trace is not None:
+            finish_trace(trace)
+
+def prepare_prompt(question, db_key, history, use_cache=True):
     """
-    question = req_body.question
-    db_key = req_body.db_key
-    
-    from adviser import build_prompt, COMPANY_NAMES
-    from retrieve import retrieve 
-    from query_router import route
+    Blocking half of /ask: route the question, retrieve data
+    and concepts, check the answer cache and build the packed
+    prompt. Runs on ask_executor.
 
+    Returns:
+        (prompt, packing report, cache entry, cached answer, hit)
+        — on a cache hit prompt and report are None; cache
+        entry is None when the cache is off for this request
+    """
     company_name = COMPANY_NAMES.get(db_key, db_key)
     selected_queries = route(question)
-    context = retrieve(question, db_key)
+    context = retrieve(question, db_key, selected_queries)
     live_data = context["live_data"]
     concepts = context["concepts"]
 
-    history = [{"question": h.question, "answer": h.answer}
-                for h in req_body.history]
+    cache_entry = None
+    if USE_ANSWER_CACHE and use_cache:
+        cached, hit, cache_entry = lookup_answer(question, db_key, selected_queries, context, history)
+        if cached is not None:
+            return None, None, cache_entry, cached, hit
+    elif USE_ANSWER_CACHE:
+        answer_cache.bypass()
 
-    prompt = build_prompt(
+    prompt, report = build_request_prompt(
         question=question,
         company_name=company_name,
         live_data=live_data,
@@ -110,15 +200,165 @@ async def ask_question(req_body: QuestionRequest):
         selected_queries=selected_queries,
         history = history
     )
+    return prompt, report, cache_entry, None, None
+
+@app.post("/ask")
+async def ask_question(req_body: QuestionRequest, request: Request):
+    """
+    Main endpoint. Takes a question and db_key, runs the 
+    full pipeline, and streams the LLM response back.
+    """
+    history = [{"question": h.question, "answer": h.answer}
+                for h in req_body.history]
+
+    trace = start_trace("request")
+    loop = asyncio.get_running_loop()
+    prompt, report, cache_entry, cached, hit = await loop.run_in_executor(
+        ask_executor, in_context(prepare_prompt), req_body.question, req_body.db_key, history,
+        req_body.use_cache
+    )
+
+    if cached is not None:
+        headers = {"X-Lantern-Cache": hit["source"]}
+        if TIMING_HEADERS:
+            headers["Server-Timing"] = trace.server_timing()
+        if hit["source"] == "semantic":
+            # lets the UI report a wrong answer to /cache/false-hit
+            headers["X-Lantern-Cache-Match"] = str(hit["id"])
+            headers["X-Lantern-Cache-Similarity"] = str(hit["similarity"])
+        return StreamingResponse(
+            stream_cached(cached, trace),
+            media_type='text/plain',
+            headers=headers
+        )
+
+    # nobody left to stream to — don't start a generation
+    if await request.is_disconnected():
+        finish_trace(trace)
+        return StreamingResponse(iter(()), media_type='text/plain')
+
+    headers = {"X-Lantern-Cache": "miss" if cache_entry is not None else "bypass"}
+    if TIMING_HEADERS:
+        headers["Server-Timing"] = trace.server_timing()
+    if report:
+        headers["X-Lantern-Context-Tokens"] = f"{report['used']}/{report['budget']}"
+        headers["X-Lantern-Context-Dropped"] = str(len(report["dropped"]))
+    return StreamingResponse(
+        stream_ollama(prompt, request, cache_entry, trace),
+        media_type='text/plain',
+        headers=headers
+    )
+
+class CompareRequest(BaseModel):
+    question: str
+    db_keys: Optional[List[str]] = None    # None = all companies
+    history: Optional[List[HistoryExchange]] = []
+
+@app.post("/compare")
+async def compare_companies(req_body: CompareRequest, request: Request):
+    """
+    One question, every company, one comparative answer.
+    Concepts are retrieved once and the companies' metrics run
+    concurrently; per-stage timings go in X-Lantern-Timings.
+    """
+    history = [{"question": h.question, "answer": h.answer}
+                for h in req_body.history]
+    loop = asyncio.get_running_loop()
+    prompt, report, timings = await loop.run_in_executor(
+        ask_executor, prepare_comparison, req_body.question, req_body.db_keys, history
+    )
+    if await request.is_disconnected():
+        return StreamingResponse(iter(()), media_type='text/plain')
+
+    stages = ("route_ms", "concepts_ms", "sql_ms", "retrieve_ms", "prompt_ms")
+    headers = {"X-Lantern-Timings": ";".join(f"{k}={timings[k]}" for k in stages)}
+    if report:
+        headers["X-Lantern-Context-Tokens"] = f"{report['used']}/{report['budget']}"
+        headers["X-Lantern-Context-Dropped"] = str(len(report["dropped"]))
     return StreamingResponse(
-        stream_ollama(prompt),
-        media_type='text/plain'
+        stream_ollama(prompt, request),
+        media_type='text/plain',
+        headers=headers
     )
 
+class BatchItem(BaseModel):
+    question: str
+    db_key: str
+    id: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+    concurrency: int = BATCH_CONCURRENCY
+    use_cache: bool = True
+
+@app.post("/ask/batch")
+async def ask_batch(req_body: BatchRequest):
+    """
+    Answer many questions across companies with shared
+    retrieval (see batch.py). Streams one JSON result per line
+    as each answer is ready — not in input order; use "index".
+    """
+    items = [item.dict() for item in req_body.items]
+    loop = asyncio.get_running_loop()
+    ready = asyncio.Queue()
+    # set when the stream ends early (client gone): run_batch
+    # skips the generations it hasn't started
+    cancel = threading.Event()
+
+    def on_result(result):
+        loop.call_soon_threadsafe(ready.put_nowait, result)
+
+    job = loop.run_in_executor(
+        batch_executor, run_batch, items, req_body.concurrency, req_body.use_cache, on_result, cancel
+    )
+
+    async def stream_results():
+        remaining = len(items)
+        try:
+            while remaining:
+                next_result = asyncio.ensure_future(ready.get())
+                await asyncio.wait({next_result, job}, return_when=asyncio.FIRST_COMPLETED)
+                if next_result.done():
+                    remaining -= 1
+                    yield json.dumps(next_result.result()) + "\n"
+                    continue
+                next_result.cancel()
+                # results reported before the job ended are still queued
+                while not ready.empty():
+                    remaining -= 1
+                    yield json.dumps(ready.get_nowait()) + "\n"
+                if job.exception() is not None:
+                    yield json.dumps({"error": f"batch failed: {job.exception()}"}) + "\n"
+                    return
+                break
+            _, timings = await job
+            yield json.dumps({"timings": timings}) + "\n"
+        finally:
+            cancel.set()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+class FalseHitReport(BaseModel):
+    match_id: int    # X-Lantern-Cache-Match of the wrong answer
+
+@app.post("/cache/false-hit")
+async def report_false_hit(req_body: FalseHitReport):
+    """A semantic cache answer didn't fit the question — count it and stop serving it."""
+    removed = semantic_cache.report_false_hit(req_body.match_id)
+    if removed is None:
+        return JSONResponse({"error": f"No semantic cache hit with id {req_body.match_id}"}, status_code=404)
+    return {"removed": removed, "semantic_cache": semantic_cache.stats()}
+
 @app.post("/route")
 async def get_routes(req_body: QuestionRequest):
-    """Returns which queries the router selects for a question."""
-    queries = route(req_body.question)
+    """
+    Returns which queries the router selects for a question.
+    Semantic / hybrid routing embeds the question (and loads the
+    model on first use), so it runs on ask_executor, not the
+    event loop.
+    """
+    loop = asyncio.get_running_loop()
+    queries = await loop.run_in_executor(ask_executor, in_context(route), req_body.question)
     return {"queries": queries}
 
 @app.get("/companies")
@@ -130,6 +370,42 @@ async def get_companies():
             for k, v in COMPANY_NAMES.items()
         ]
     }
+@app.get("/stats")
+async def get_stats():
+    """Returns pipeline metrics (connection pools, caches, Ollama timings)."""
+    return {
+        "pools": pool_stats(),
+        "metric_cache": metric_cache.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "embedding_batcher": embedding_batch_stats(),
+        "embedding_worker": embedding_worker_stats(),
+        "answer_cache": answer_cache.stats(),
+        "semantic_cache": semantic_cache.stats(),
+        "ollama": ollama.stats(),
+        "stages": histograms()
+    }
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once the pipeline is warm, 503 before or if warm-up failed."""
+    if warm_timings is None:
+        return JSONResponse({"ready": False, "errors": warm_errors}, status_code=503)
+    return {"ready": True, "warm_up_ms": warm_timings, "errors": warm_errors}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Per-stage latency histograms in Prometheus text format."""
+    return PlainTextResponse(metrics_text(), media_type="text/plain; version=0.0.4")
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    """Close connections, worker threads and persist caches when the server stops."""
+    await ollama.aclose()
+    ask_executor.shutdown(wait=False)
+    batch_executor.shutdown(wait=False)
+    close_all()
+    embedding_cache.save()
+
 @app.get("/", response_class=HTMLResponse)
 async def serve_ui():
     with open("templates/index.html", "r") as f:
@@ -0,0 +1,277 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — batch.py
+# Answer many questions across companies in one run
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   Monthly advisory reports ask dozens of questions about every
+#   company. Calling ask() once per question repeats the same
+#   work over and over. run_batch() shares it:
+#     1. every distinct question is embedded in ONE encode call
+#        (the vectors land in the embedding cache, so routing
+#        and concept search reuse them)
+#     2. concept search runs once per distinct question
+#     3. requests are grouped by company; each company's
+#        database is queried once for the union of the metrics
+#        its questions need
+#     4. answers come from the answer caches where possible;
+#        the rest are generated with at most `concurrency`
+#        Ollama calls in flight
+#   Results are reported one by one (on_result) as they finish,
+#   so a long run can be written to JSONL as it goes. A failure
+#   (pool timeout, database error, embedding failure, ...) marks
+#   only the items it touched with {"error": ...}; the rest of
+#   the batch carries on.
+#
+# INPUT / OUTPUT (JSONL, one object per line):
+#   in:  {"question": "...", "db_key": "service1", "id": optional}
+#   out: {"index", "id", "question", "db_key", "company",
+#         "queries", "answer", "cache", "error", "generate_ms"}
+#
+# HOW TO RUN:
+#   python main.py --batch questions.jsonl --out answers.jsonl
+#   or POST /ask/batch (app.py)
+# =============================================================
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from adviser import (build_request_prompt, lookup_answer, remember_answer,
+                     COMPANY_NAMES, USE_ANSWER_CACHE)
+from embedding_cache import normalize_question
+from ollama_client import ollama
+from query_router import route
+from retrieve import embed_questions, get_concepts, get_live_data, data_version, DB_PATHS
+
+# -------------------------------------------------------------
+# CONFIGURATION
+# -------------------------------------------------------------
+
+BATCH_CONCURRENCY = 4     # Ollama generations in flight (match OLLAMA_NUM_PARALLEL)
+MAX_CONCURRENCY   = 16    # upper bound a caller may ask for
+
+
+def read_jsonl(path):
+    """Read batch requests, one JSON object per line (blank lines skipped)."""
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_no}: invalid JSON: {e}") from e
+    return items
+
+
+def _error_text(e):
+    """Message for an item's "error" field."""
+    return str(e) or type(e).__name__
+
+
+def _prepare(items, use_cache):
+    """
+    Shared retrieval for the whole batch.
+
+    Returns:
+        (results, jobs, timings) — results has a dict per item
+        (errors and cache hits already filled in); jobs are
+        (index, prompt, cache entry) still to be generated
+    """
+    timings = {}
+    results = []
+    valid = []
+    for index, item in enumerate(items):
+        malformed = not isinstance(item, dict)
+        if malformed:
+            item = {}
+        question = str(item.get("question", "")).strip()
+        db_key = item.get("db_key")
+        if not isinstance(db_key, str):
+            db_key = None if db_key is None else str(db_key)
+        result = {
+            "index": index,
+            "id": item.get("id"),
+            "question": question,
+            "db_key": db_key,
+            "company": COMPANY_NAMES.get(db_key, db_key),
+            "queries": [],
+            "answer": None,
+            "cache": None,
+            "error": None,
+            "generate_ms": None
+        }
+        if malformed:
+            result["error"] = "request must be a JSON object"
+        elif not question:
+            result["error"] = "missing question"
+        elif db_key not in DB_PATHS:
+            result["error"] = f"Unknown database: {db_key}. choose from: {list(DB_PATHS.keys())}"
+        else:
+            valid.append(index)
+        results.append(result)
+
+    # 1. one encode call for every distinct question
+    start = time.perf_counter()
+    distinct = list(dict.fromkeys(normalize_question(results[i]["question"]) for i in valid))
+    if distinct:
+        try:
+            embed_questions(distinct)
+        except Exception as e:
+            # not fatal: each question is embedded again on its own
+            # in step 2, where a failure is recorded per item
+            print(f"  WARNING: batch embedding failed — {_error_text(e)}")
+    timings["embed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    # 2. routing + concept search, once per distinct question
+    start = time.perf_counter()
+    concepts = {}
+    for i in valid:
+        question = results[i]["question"]
+        try:
+            results[i]["queries"] = route(question)
+            key = normalize_question(question)
+            if key not in concepts:
+                concepts[key] = get_concepts(question)
+        except Exception as e:
+            results[i]["error"] = _error_text(e)
+    valid = [i for i in valid if not results[i]["error"]]
+    timings["concepts_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    # 3. one database round per company, for the union of metrics
+    start = time.perf_counter()
+    by_company = {}
+    for i in valid:
+        by_company.setdefault(results[i]["db_key"], []).append(i)
+    company_data = {}
+    for db_key, indexes in by_company.items():
+        metrics = list(dict.fromkeys(q for i in indexes for q in results[i]["queries"]))
+        try:
+            version = data_version(db_key)
+            company_data[db_key] = (get_live_data(db_key, metrics, parallel=True), version)
+        except Exception as e:
+            # PoolTimeout, sqlite3.Error, a missing file, ...:
+            # fails this company's items only
+            for i in indexes:
+                results[i]["error"] = _error_text(e)
+    timings["sql_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    # 4. answer caches, then prompts for everything else
+    jobs = []
+    for i in valid:
+        result = results[i]
+        if result["error"] or result["db_key"] not in company_data:
+            continue
+        live_data, version = company_data[result["db_key"]]
+        context = {
+            "live_data": {q: live_data[q] for q in result["queries"]},
+            "concepts": concepts[normalize_question(result["question"])],
+            "data_version": version
+        }
+        try:
+            entry = None
+            if USE_ANSWER_CACHE and use_cache:
+                cached, hit, entry = lookup_answer(result["question"], result["db_key"], result["queries"], context)
+                if cached is not None:
+                    result["answer"] = cached
+                    result["cache"] = hit["source"]
+                    continue
+            prompt, _ = build_request_prompt(
+                question=result["question"],
+                company_name=result["company"],
+                live_data=context["live_data"],
+                concepts=context["concepts"],
+                selected_queries=result["queries"]
+            )
+        except Exception as e:
+            result["error"] = _error_text(e)
+            continue
+        jobs.append((i, prompt, entry))
+    return results, jobs, timings
+
+
+def _generate(prompt):
+    """Full answer for a prompt string or chat messages (no streaming)."""
+    if isinstance(prompt, list):
+        return ollama.chat(prompt)
+    return ollama.generate(prompt)
+
+
+def run_batch(items, concurrency=BATCH_CONCURRENCY, use_cache=True, on_result=None, cancel=None):
+    """
+    Answer a list of {question, db_key} requests.
+
+    Args:
+        items:       list of dicts ({"question", "db_key", "id"?})
+        concurrency: Ollama generations in flight (1..MAX_CONCURRENCY)
+        use_cache:   serve / store answers in the answer caches
+        on_result:   optional callback(result dict), called as
+                     each answer is ready (from worker threads,
+                     one at a time)
+        cancel:      optional threading.Event; once set, generations
+                     not started yet are skipped with an error
+                     (e.g. the /ask/batch client went away)
+
+    Returns:
+        (results in input order, batch timings)
+    """
+    concurrency = max(1, min(int(concurrency), MAX_CONCURRENCY))
+    start = time.perf_counter()
+    results, jobs, timings = _prepare(items, use_cache)
+    report_lock = threading.Lock()
+
+    def report(result):
+        if on_result is not None:
+            with report_lock:
+                on_result(result)
+
+    # errors and cache hits are ready now
+    pending = {index for index, _, _ in jobs}
+    for result in results:
+        if result["index"] not in pending:
+            report(result)
+
+    def generate(job):
+        index, prompt, entry = job
+        result = results[index]
+        if cancel is not None and cancel.is_set():
+            result["error"] = "cancelled"
+            report(result)
+            return
+        job_start = time.perf_counter()
+        try:
+            result["answer"] = _generate(prompt)
+        except Exception as e:
+            # OllamaError, or anything else — never lose the rest of the batch
+            result["error"] = _error_text(e)
+        if result["answer"] is not None and entry is not None:
+            try:
+                remember_answer(entry, result["answer"])
+            except Exception as e:
+                print(f"  WARNING: could not cache answer {index} — {_error_text(e)}")
+        result["generate_ms"] = round((time.perf_counter() - job_start) * 1000, 2)
+        report(result)
+
+    gen_start = time.perf_counter()
+    if jobs:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as executor:
+            list(executor.map(generate, jobs))
+    timings["generate_ms"] = round((time.perf_counter() - gen_start) * 1000, 2)
+    timings["total_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    timings["questions"] = len(items)
+    timings["generated"] = len(jobs)
+    return results, timings
+
+
+def write_jsonl(path, items, concurrency=BATCH_CONCURRENCY, use_cache=True):
+    """Run a batch and write each result to path as soon as it is ready."""
+    with open(path, "w", encoding="utf-8") as out:
+        def write(result):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+            status = "ERROR" if result["error"] else (result["cache"] or "generated")
+            print(f"  [{result['index'] + 1}/{len(items)}] {result['company']}: "
+                  f"{result['question'][:50]} — {status}")
+        return run_batch(items, concurrency, use_cache, on_result=write)
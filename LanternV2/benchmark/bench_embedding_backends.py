@@ -0,0 +1,171 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — bench_embedding_backends.py
+# Benchmark: embedding backends — speed, memory, retrieval agreement
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   Loads all-MiniLM-L6-v2 with each embedder.py backend (torch,
+#   torch-int8, onnx, onnx-int8), each in a fresh process so RSS
+#   is its own, and reports:
+#     - load time and RSS after loading + encoding
+#     - single-question latency p50 / p95 (the /ask path)
+#     - batch throughput, texts/sec (ingest, batch.py)
+#     - agreement with torch fp32 on the concept corpus:
+#         doc cos    mean cosine between the two backends'
+#                    vectors for the same document
+#         top-K      share of torch's top-K concepts the backend
+#                    finds, for the labeled routing questions
+#         top-1      same first concept as torch
+#         vs index   top-1 agreement when the backend's question
+#                    vectors search the torch-built index — the
+#                    "keep the existing collection" case
+#   Backends whose dependencies are missing are skipped.
+#
+# HOW TO RUN:
+#   python bench_embedding_backends.py
+#   python bench_embedding_backends.py --backends torch onnx-int8 --corpus /path/to/knowledge_base
+# =============================================================
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from bench_router import LABELED_QUESTIONS
+from embedder import EMBEDDING_BACKENDS
+from query_router import METRIC_DESCRIPTIONS
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"   # same model as retrieve.py
+DEFAULT_CORPUS = os.path.join(os.environ.get("LANTERN_HOME", "/workspace/Lantern_V2"), "knowledge_base")
+
+CHILD_SCRIPT = """
+import json, resource, statistics, sys, time
+import numpy as np
+from embedder import load_embedder
+
+backend, model_name, data_path, out_path, repeat = sys.argv[1:6]
+with open(data_path, encoding="utf-8") as f:
+    data = json.load(f)
+
+start = time.perf_counter()
+model = load_embedder(model_name, backend)
+load_ms = (time.perf_counter() - start) * 1000
+model.encode(["warm up"])
+
+latencies = []
+for _ in range(int(repeat)):
+    for question in data["questions"]:
+        start = time.perf_counter()
+        model.encode([question])
+        latencies.append((time.perf_counter() - start) * 1000)
+
+texts = data["documents"] * max(1, 256 // max(1, len(data["documents"])))
+start = time.perf_counter()
+model.encode(texts, batch_size=32)
+throughput = len(texts) / (time.perf_counter() - start)
+
+np.savez(out_path,
+         documents=np.asarray(model.encode(data["documents"]), dtype=np.float32),
+         questions=np.asarray(model.encode(data["questions"]), dtype=np.float32))
+latencies.sort()
+print(json.dumps({
+    "load_ms": load_ms,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "p50_ms": statistics.median(latencies),
+    "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+    "texts_per_sec": throughput
+}))
+"""
+
+
+def read_corpus(corpus_dir):
+    """Concept documents from knowledge_base/, or the router's metric descriptions."""
+    if corpus_dir and os.path.isdir(corpus_dir):
+        files = sorted(f for f in os.listdir(corpus_dir) if f.endswith(".txt"))
+        documents = []
+        for filename in files:
+            with open(os.path.join(corpus_dir, filename), "r", encoding="utf-8") as f:
+                documents.append(f.read())
+        if documents:
+            return documents, corpus_dir
+    return list(METRIC_DESCRIPTIONS.values()), "query_router.METRIC_DESCRIPTIONS"
+
+
+def normalize(matrix):
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def top_k(questions, documents, k):
+    scores = normalize(questions) @ normalize(documents).T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def compare(reference, candidate, k):
+    """Agreement of a backend's vectors with the torch reference."""
+    ref_top = top_k(reference["questions"], reference["documents"], k)
+    cand_top = top_k(candidate["questions"], candidate["documents"], k)
+    cross_top = top_k(candidate["questions"], reference["documents"], 1)
+    doc_cos = np.sum(normalize(reference["documents"]) * normalize(candidate["documents"]), axis=1)
+    return {
+        "doc_cosine": float(doc_cos.mean()),
+        "top_k": statistics.mean(len(set(r) & set(c)) / k for r, c in zip(ref_top, cand_top)),
+        "top_1": float(np.mean(ref_top[:, 0] == cand_top[:, 0])),
+        "vs_index": float(np.mean(ref_top[:, 0] == cross_top[:, 0]))
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends")
+    parser.add_argument("--backends", nargs="+", default=list(EMBEDDING_BACKENDS), choices=EMBEDDING_BACKENDS)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="directory of concept .txt documents")
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5, help="passes over the questions for latency")
+    args = parser.parse_args()
+
+    documents, source = read_corpus(args.corpus)
+    questions = [question for question, _ in LABELED_QUESTIONS]
+
+    print("=" * 60)
+    print(f"BENCHMARK — embedding backends ({len(documents)} docs from {source}, "
+          f"{len(questions)} questions)")
+    print("=" * 60)
+    header = (f"{'backend':<11} {'load ms':>8} {'RSS MB':>7} {'p50 ms':>7} {'p95 ms':>7} "
+              f"{'texts/s':>8} {'doc cos':>8} {f'top-{args.top_k}':>6} {'top-1':>6} {'vs index':>9}")
+    print(header)
+    print("-" * len(header))
+
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    vectors = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        data_path = os.path.join(tmp, "data.json")
+        with open(data_path, "w", encoding="utf-8") as f:
+            json.dump({"documents": documents, "questions": questions}, f)
+
+        for backend in backends:
+            out_path = os.path.join(tmp, f"{backend}.npz")
+            result = subprocess.run(
+                [sys.executable, "-c", CHILD_SCRIPT, backend, EMBEDDING_MODEL, data_path, out_path,
+                 str(args.repeat)],
+                capture_output=True, text=True
+            )
+            if result.returncode != 0:
+                reason = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"
+                print(f"{backend:<11} skipped — {reason}")
+                continue
+            r = json.loads(result.stdout.strip().splitlines()[-1])
+            with np.load(out_path) as saved:
+                vectors[backend] = {"documents": saved["documents"], "questions": saved["questions"]}
+
+            line = (f"{backend:<11} {r['load_ms']:>8.0f} {r['rss_mb']:>7.0f} {r['p50_ms']:>7.2f} "
+                    f"{r['p95_ms']:>7.2f} {r['texts_per_sec']:>8.0f}")
+            if "torch" in vectors and backend != "torch":
+                a = compare(vectors["torch"], vectors[backend], args.top_k)
+                line += (f" {a['doc_cosine']:>8.4f} {a['top_k']:>6.2f} {a['top_1']:>6.2f} "
+                         f"{a['vs_index']:>9.2f}")
+            elif backend == "torch":
+                line += f" {'(reference)':>32}"
+            print(line)
@@ -0,0 +1,116 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — bench_keyword_router.py
+# Benchmark: keyword routing cost as the vocabulary grows
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   Grows QUERY_KEYWORDS to 1x, 10x and 100x today's size (more
+#   metrics, each with as many keywords as today's average),
+#   then times per question:
+#     - the original scan: `keyword in question` for every
+#       keyword of every metric
+#     - query_router.keyword_scores(): one pass over the
+#       question against the compiled phrase table
+#   plus the one-off compile_keywords() time.
+#
+# HOW TO RUN:
+#   python bench_keyword_router.py
+#   python bench_keyword_router.py --scales 1 10 100 1000 --repeat 2000
+# =============================================================
+
+import argparse
+import random
+import re
+import statistics
+import string
+import time
+
+import query_router
+from query_router import compile_keywords, keyword_scores
+
+QUESTIONS = [
+    "Is our cash runway safe?",
+    "Are we losing clients?",
+    "How productive is our team?",
+    "What are our biggest expenses?",
+    "Are clients paying their invoices on time?",
+    "How is company performing overall?",
+    "We hired two people last quarter and revenue per employee dropped, "
+    "are payroll costs eating our margin and how long can we keep going?"
+]
+
+
+def substring_scores(question, keyword_map):
+    """The original route() scoring loop, kept as the baseline."""
+    cleaned = re.sub(r"[^\w\s]", "", question.lower())
+    scores = {}
+    for query_name, keywords in keyword_map.items():
+        score = 0
+        for keyword in keywords:
+            if keyword in cleaned:
+                score += 1
+        scores[query_name] = score
+    return scores
+
+
+def grow_vocabulary(base, scale, rng):
+    """base plus (scale - 1) times as many synthetic metrics of the same shape."""
+    grown = {name: list(keywords) for name, keywords in base.items()}
+    per_metric = round(statistics.mean(len(k) for k in base.values()))
+    for i in range((scale - 1) * len(base)):
+        grown[f"synthetic_metric_{i:05d}"] = [
+            " ".join("".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))
+                     for _ in range(rng.choice((1, 1, 1, 2, 3))))
+            for _ in range(per_metric)
+        ]
+    return grown
+
+
+def time_per_question(fn, repeat):
+    """Mean microseconds per question, over every question in QUESTIONS."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for question in QUESTIONS:
+            fn(question)
+    return (time.perf_counter() - start) / (repeat * len(QUESTIONS)) * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark keyword routing vs vocabulary size")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    base = dict(query_router.QUERY_KEYWORDS)
+
+    print("=" * 60)
+    print("BENCHMARK — keyword routing vs vocabulary size")
+    print("=" * 60)
+    header = (f"{'scale':>6} {'metrics':>8} {'keywords':>9} {'compile ms':>11} "
+              f"{'substring us':>13} {'compiled us':>12} {'speedup':>8}")
+    print(header)
+    print("-" * len(header))
+    try:
+        for scale in args.scales:
+            keyword_map = grow_vocabulary(base, scale, rng)
+            query_router.QUERY_KEYWORDS = keyword_map
+
+            start = time.perf_counter()
+            compile_keywords()
+            compile_ms = (time.perf_counter() - start) * 1000
+
+            # whole-word matching may only drop partial-word hits
+            # the substring scan made, never add new ones
+            for question in QUESTIONS:
+                old, new = substring_scores(question, base), keyword_scores(question)
+                assert all(new.get(q, 0) <= old[q] for q in base), question
+
+            substring_us = time_per_question(lambda q: substring_scores(q, keyword_map), args.repeat)
+            compiled_us = time_per_question(keyword_scores, args.repeat)
+            print(f"{scale:>5}x {len(keyword_map):>8} {sum(map(len, keyword_map.values())):>9} "
+                  f"{compile_ms:>11.2f} {substring_us:>13.1f} {compiled_us:>12.1f} "
+                  f"{substring_us / compiled_us:>7.1f}x")
+    finally:
+        query_router.QUERY_KEYWORDS = base
+        compile_keywords()
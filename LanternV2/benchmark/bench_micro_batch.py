@@ -0,0 +1,98 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — bench_micro_batch.py
+# Benchmark: concurrent question embedding, direct vs micro-batched
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   C threads each embed a stream of distinct questions, one
+#   question per call, the way concurrent /ask requests do:
+#     - direct:  model.encode([question]) per call
+#     - batched: micro_batcher.MicroBatcher(model.encode).encode
+#   and reports, per concurrency level:
+#     - questions per second
+#     - per-call latency p50 / p95 (queue wait included)
+#     - mean batch size and queue wait (batched)
+#
+# HOW TO RUN:
+#   python bench_micro_batch.py
+#   python bench_micro_batch.py --concurrency 1 8 32 --max-wait-ms 2 --max-batch 64
+# =============================================================
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sentence_transformers import SentenceTransformer
+
+from micro_batcher import MicroBatcher, MAX_BATCH_SIZE, MAX_WAIT_MS
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"   # same model as retrieve.py
+
+TEMPLATES = [
+    "Is our cash runway safe in month {}?",
+    "How many clients did we lose in quarter {}?",
+    "What was revenue per employee in year {}?",
+    "Which expenses grew fastest over the last {} months?",
+    "Are invoices from client number {} paid on time?",
+    "How concentrated is revenue across our top {} clients?"
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(encode, concurrency, per_thread):
+    """Every thread encodes per_thread distinct questions, one per call."""
+    def worker(thread):
+        latencies = []
+        for i in range(per_thread):
+            question = TEMPLATES[i % len(TEMPLATES)].format(thread * per_thread + i)
+            start = time.perf_counter()
+            encode([question])
+            latencies.append((time.perf_counter() - start) * 1000)
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = [ms for result in executor.map(worker, range(concurrency)) for ms in result]
+    elapsed = time.perf_counter() - start
+    return {
+        "qps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": percentile(latencies, 95)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark micro-batched question embedding")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 10, 20])
+    parser.add_argument("--per-thread", type=int, default=50, help="questions per thread")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    args = parser.parse_args()
+
+    model = SentenceTransformer(EMBEDDING_MODEL)
+    model.encode(["warm up"])
+
+    print("=" * 60)
+    print(f"BENCHMARK — question embedding (max batch {args.max_batch}, "
+          f"max wait {args.max_wait_ms} ms)")
+    print("=" * 60)
+    header = (f"{'threads':>7} {'mode':<8} {'q/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'batch':>6} {'wait p50':>9}")
+    print(header)
+    print("-" * len(header))
+    for concurrency in args.concurrency:
+        direct = run(model.encode, concurrency, args.per_thread)
+        print(f"{concurrency:>7} {'direct':<8} {direct['qps']:>8.1f} {direct['p50_ms']:>8.2f} "
+              f"{direct['p95_ms']:>8.2f} {'1':>6} {'-':>9}")
+
+        batcher = MicroBatcher(model.encode, max_batch_size=args.max_batch, max_wait_ms=args.max_wait_ms)
+        batched = run(batcher.encode, concurrency, args.per_thread)
+        stats = batcher.stats()
+        print(f"{concurrency:>7} {'batched':<8} {batched['qps']:>8.1f} {batched['p50_ms']:>8.2f} "
+              f"{batched['p95_ms']:>8.2f} {stats['mean_batch_size']:>6.1f} "
+              f"{stats['queue_wait_p50_ms']:>7.2f}ms  ({batched['qps'] / direct['qps']:.1f}x)")
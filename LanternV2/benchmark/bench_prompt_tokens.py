@@ -0,0 +1,147 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — bench_prompt_tokens.py
+# Benchmark: prompt size and answer quality per row format
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   For each service company and example question, builds the
+#   LIVE FINANCIAL DATA section with every row format in
+#   table_format.py ("kv", "csv", "markdown") and reports its
+#   token count.
+#
+#   With --answers, it also asks Ollama each question once per
+#   format and scores grounding: the share of numbers quoted in
+#   the answer that actually appear in the data (raw or
+#   rounded). Answers are written to a JSONL file for review.
+#
+# HOW TO RUN:
+#   python bench_prompt_tokens.py
+#   python bench_prompt_tokens.py --tokenizer meta-llama/Llama-3.1-8B-Instruct
+#   python bench_prompt_tokens.py --answers --out answers.jsonl
+# =============================================================
+
+import argparse
+import json
+import re
+import statistics
+
+import adviser
+from adviser import COMPANY_NAMES, build_data_section, build_prompt, canonical_queries
+from context_packer import count_tokens, set_tokenizer
+from ollama_client import ollama, OllamaError
+from query_router import route
+from retrieve import DB_PATHS, get_concepts, get_live_data
+from table_format import FORMATS, round_value
+
+QUESTIONS = [
+    "Is our cash runway safe?",
+    "Are we losing clients?",
+    "How productive is our team?",
+    "What are our biggest expenses?",
+    "Are clients paying their invoices on time?",
+    "How is the company performing overall?",
+    "What is our net profit margin?",
+    "Is our client concentration a risk?"
+]
+
+NUMBER = re.compile(r"-?\d[\d,]*\.?\d*")
+
+
+def use_format(fmt):
+    """Write every metric in one layout."""
+    adviser.DEFAULT_ROW_FORMAT = fmt
+    adviser.METRIC_FORMATS = {}
+
+
+def data_numbers(live_data):
+    """Every number in the data, raw and rounded, as strings."""
+    found = set()
+    for rows in live_data.values():
+        if not isinstance(rows, list):
+            continue
+        for row in rows:
+            for value in row.values():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    for v in (value, round_value(value), round(value), round(value, 1)):
+                        found.add(f"{v}".rstrip("0").rstrip(".") if isinstance(v, float) else str(v))
+    return found
+
+
+def grounding(answer, numbers):
+    """Share of numbers in the answer that exist in the data."""
+    quoted = [n.replace(",", "") for n in NUMBER.findall(answer)]
+    quoted = [n.rstrip("0").rstrip(".") if "." in n else n for n in quoted]
+    # years and list markers aren't claims about the data
+    quoted = [n for n in quoted if len(n) > 1 and not re.fullmatch(r"(19|20)\d\d", n)]
+    if not quoted:
+        return None
+    return sum(1 for n in quoted if n in numbers) / len(quoted)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark prompt row formats")
+    parser.add_argument("--tokenizer", help="Hugging Face tokenizer for exact token counts")
+    parser.add_argument("--answers", action="store_true", help="also generate and score answers")
+    parser.add_argument("--out", default="format_answers.jsonl", help="answers output (with --answers)")
+    args = parser.parse_args()
+
+    if args.tokenizer:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(args.tokenizer)
+        set_tokenizer(lambda text: len(tokenizer.encode(text, add_special_tokens=False)))
+
+    print("=" * 60)
+    print("BENCHMARK — prompt tokens per row format")
+    print("=" * 60)
+
+    tokens = {fmt: [] for fmt in FORMATS}
+    scores = {fmt: [] for fmt in FORMATS}
+    out = open(args.out, "w", encoding="utf-8") if args.answers else None
+
+    try:
+        for db_key in DB_PATHS:
+            company = COMPANY_NAMES.get(db_key, db_key)
+            print(f"\n{company}")
+            print(f"  {'question':<45}" + "".join(f"{fmt:>10}" for fmt in FORMATS))
+            for question in QUESTIONS:
+                selected = canonical_queries(route(question))
+                live_data = get_live_data(db_key, selected)
+                concepts = get_concepts(question) if args.answers else []
+                numbers = data_numbers(live_data)
+
+                counts = []
+                for fmt in FORMATS:
+                    use_format(fmt)
+                    n = count_tokens(build_data_section(company, live_data, selected))
+                    tokens[fmt].append(n)
+                    counts.append(n)
+
+                    if args.answers:
+                        prompt = build_prompt(question, company, live_data, concepts, selected)
+                        try:
+                            answer = ollama.generate(prompt)
+                        except OllamaError as e:
+                            answer = f"ERROR: {e}"
+                        score = grounding(answer, numbers)
+                        if score is not None:
+                            scores[fmt].append(score)
+                        out.write(json.dumps({
+                            "db_key": db_key, "question": question, "format": fmt,
+                            "data_tokens": n, "grounding": score, "answer": answer,
+                            "call": ollama.last_call()
+                        }) + "\n")
+
+                print(f"  {question[:44]:<45}" + "".join(f"{c:>10}" for c in counts))
+    finally:
+        if out:
+            out.close()
+
+    print("\n" + "-" * 60)
+    baseline = statistics.mean(tokens["kv"])
+    for fmt in FORMATS:
+        mean = statistics.mean(tokens[fmt])
+        line = f"{fmt:<10} mean data tokens {mean:>8.1f}  ({100 * (1 - mean / baseline):>5.1f}% fewer than kv)"
+        if args.answers and scores[fmt]:
+            line += f"  grounding {statistics.mean(scores[fmt]):.2f}"
+        print(line)
+    if args.answers:
+        print(f"\nAnswers written to {args.out}")
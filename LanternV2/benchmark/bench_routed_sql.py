@@ -0,0 +1,98 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — bench_routed_sql.py
+# Benchmark: all 8 SQL metrics vs router-selected metrics
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   Seeds a multi-year company database, then for every
+#   example question measures how long get_live_data takes
+#   when it runs all 8 queries (old behaviour) versus only
+#   the queries query_router.route() selects.
+#
+# HOW TO RUN:
+#   python bench_routed_sql.py --years 5 --repeat 20
+#   python bench_routed_sql.py --db /path/to/service1.db
+# =============================================================
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import retrieve
+from query_router import route
+from synthetic_db import create_company_db
+
+BENCH_DB_KEY = "bench"
+
+QUESTIONS = [
+    "Is our cash runway safe?",
+    "Are we losing clients?",
+    "How productive is our team?",
+    "What are our biggest expenses?",
+    "Are clients paying their invoices on time?",
+    "How is the company performing overall?",
+    "What is our net profit margin?",
+    "Is our client concentration a risk?"
+]
+
+
+def time_live_data(db_key, query_names, repeat):
+    """Return per-call timings (ms) for get_live_data."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        retrieve.get_live_data(db_key, query_names)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def run(db_path, repeat):
+    retrieve.DB_PATHS[BENCH_DB_KEY] = db_path
+    # measure the SQL itself, not the metric cache
+    retrieve.USE_METRIC_CACHE = False
+
+    # one warm-up pass so the OS page cache is hot for both modes
+    retrieve.get_live_data(BENCH_DB_KEY)
+
+    print(f"\n{'question':<45} {'queries':>7} {'all (ms)':>10} {'routed (ms)':>12} {'saved':>7}")
+    print("-" * 86)
+
+    total_all, total_routed = 0.0, 0.0
+    for question in QUESTIONS:
+        selected = route(question)
+        all_ms = statistics.median(time_live_data(BENCH_DB_KEY, None, repeat))
+        routed_ms = statistics.median(time_live_data(BENCH_DB_KEY, selected, repeat))
+        total_all += all_ms
+        total_routed += routed_ms
+        saved = 100 * (1 - routed_ms / all_ms) if all_ms else 0.0
+        print(f"{question[:44]:<45} {len(selected):>7} {all_ms:>10.2f} {routed_ms:>12.2f} {saved:>6.1f}%")
+
+    print("-" * 86)
+    n = len(QUESTIONS)
+    print(f"{'mean per question':<45} {'':>7} {total_all / n:>10.2f} {total_routed / n:>12.2f} "
+          f"{100 * (1 - total_routed / total_all):>6.1f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark routed vs full SQL retrieval")
+    parser.add_argument("--db", help="existing company database (skips seeding)")
+    parser.add_argument("--years", type=int, default=5, help="years of history to seed")
+    parser.add_argument("--invoices-per-month", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=10, help="runs per question per mode")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("BENCHMARK — routed vs full SQL retrieval")
+    print("=" * 60)
+
+    if args.db:
+        run(args.db, args.repeat)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench_company.db")
+            counts = create_company_db(db_path, years=args.years,
+                                       invoices_per_month=args.invoices_per_month)
+            print(f"Seeded {args.years} years: {counts['transactions']} transactions, "
+                  f"{counts['invoices']} invoices")
+            run(db_path, args.repeat)
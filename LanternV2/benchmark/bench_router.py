@@ -0,0 +1,127 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — bench_router.py
+# Benchmark: routing accuracy and latency per ROUTER_MODE
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   Runs query_router.route() in "keyword", "semantic" and
+#   "hybrid" mode over a hand-labeled set of questions and
+#   reports, per mode:
+#     - top-1 accuracy: first pick is one of the right metrics
+#     - recall: share of the right metrics that were picked
+#     - extra: picks that are neither right nor ALWAYS_INCLUDE
+#       (each one is a wasted SQL query and prompt section)
+#     - mean number of queries selected
+#     - latency p50 / p95 (semantic modes include encoding the
+#       question — the live pipeline usually finds it in the
+#       embedding cache)
+#
+# HOW TO RUN:
+#   python bench_router.py
+#   python bench_router.py --show-misses
+# =============================================================
+
+import argparse
+import statistics
+import time
+
+from sentence_transformers import SentenceTransformer
+
+import query_router
+from query_router import ALWAYS_INCLUDE, route, set_embedder
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"   # same model as retrieve.py
+MODES = ("keyword", "semantic", "hybrid")
+
+# question -> metrics that actually answer it
+LABELED_QUESTIONS = [
+    ("Is our cash runway safe?", {"burn_rate_runway"}),
+    ("How long until we run out of cash?", {"burn_rate_runway"}),
+    ("How many months can we keep the lights on?", {"burn_rate_runway"}),
+    ("What's our monthly burn?", {"burn_rate_runway"}),
+    ("Do we have enough money in the bank?", {"burn_rate_runway"}),
+    ("Are we losing clients?", {"client_churn_rate"}),
+    ("How many customers walked away this year?", {"client_churn_rate"}),
+    ("Is client retention getting worse?", {"client_churn_rate"}),
+    ("Did anyone stop working with us recently?", {"client_churn_rate"}),
+    ("How productive is our team?", {"revenue_per_employee"}),
+    ("Are we overstaffed?", {"revenue_per_employee"}),
+    ("How much does each consultant bring in?", {"revenue_per_employee"}),
+    ("Should we hire more people?", {"revenue_per_employee"}),
+    ("What are our biggest expenses?", {"expense_breakdown"}),
+    ("Where is all the money going?", {"expense_breakdown"}),
+    ("How much are we paying for rent and salaries?", {"expense_breakdown"}),
+    ("Which costs should we cut first?", {"expense_breakdown"}),
+    ("Are clients paying their invoices on time?", {"days_sales_outstanding"}),
+    ("How long does it take to get paid?", {"days_sales_outstanding"}),
+    ("Do we have a lot of overdue bills from customers?", {"days_sales_outstanding"}),
+    ("Is our receivables collection slow?", {"days_sales_outstanding"}),
+    ("Are we too dependent on one client?", {"client_concentration"}),
+    ("What happens if our largest customer leaves?", {"client_concentration", "client_churn_rate"}),
+    ("Is our revenue spread across enough clients?", {"client_concentration"}),
+    ("How risky is our customer base?", {"client_concentration"}),
+    ("Is revenue growing?", {"monthly_revenue_trend"}),
+    ("How were sales last quarter compared to before?", {"monthly_revenue_trend"}),
+    ("Is the business trending up or down?", {"monthly_revenue_trend"}),
+    ("What is our net profit margin?", {"net_profit_margin"}),
+    ("Are we actually making money?", {"net_profit_margin"}),
+    ("How much do we keep after paying all the bills?", {"net_profit_margin"}),
+    ("Is this company profitable?", {"net_profit_margin"}),
+    ("How is the company performing overall?", {"net_profit_margin", "monthly_revenue_trend"}),
+    ("Can we afford to expand without running out of cash?", {"burn_rate_runway", "expense_breakdown"}),
+    ("Are payroll costs eating our margin?", {"expense_breakdown", "net_profit_margin"}),
+    ("Is the team big enough for our client load?", {"revenue_per_employee"}),
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def evaluate(mode, show_misses=False):
+    top1, recall, extra, picked, timings = [], [], [], [], []
+    for question, relevant in LABELED_QUESTIONS:
+        start = time.perf_counter()
+        selected = route(question, mode=mode)
+        timings.append((time.perf_counter() - start) * 1000)
+
+        top1.append(selected[0] in relevant)
+        recall.append(len(relevant & set(selected)) / len(relevant))
+        extra.append(len(set(selected) - relevant - set(ALWAYS_INCLUDE)))
+        picked.append(len(selected))
+        if show_misses and selected[0] not in relevant:
+            print(f"  [{mode}] {question!r}: picked {selected}, expected {sorted(relevant)}")
+
+    return {
+        "top1": statistics.mean(top1),
+        "recall": statistics.mean(recall),
+        "extra": statistics.mean(extra),
+        "selected": statistics.mean(picked),
+        "p50_ms": statistics.median(timings),
+        "p95_ms": percentile(timings, 95)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark query routing modes")
+    parser.add_argument("--show-misses", action="store_true", help="print questions routed wrong")
+    args = parser.parse_args()
+
+    model = SentenceTransformer(EMBEDDING_MODEL)
+    set_embedder(model.encode)
+    start = time.perf_counter()
+    route("warm up", mode="semantic")   # embeds the descriptions
+    print(f"Embedded {len(query_router.METRIC_DESCRIPTIONS)} metric descriptions in "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
+    print("=" * 60)
+    print(f"BENCHMARK — query routing ({len(LABELED_QUESTIONS)} labeled questions)")
+    print("=" * 60)
+    header = f"{'mode':<10} {'top-1':>6} {'recall':>7} {'extra':>6} {'picked':>7} {'p50 ms':>8} {'p95 ms':>8}"
+    print(header)
+    print("-" * len(header))
+    results = {mode: evaluate(mode, args.show_misses) for mode in MODES}
+    for mode, r in results.items():
+        print(f"{mode:<10} {r['top1']:>6.2f} {r['recall']:>7.2f} {r['extra']:>6.2f} "
+              f"{r['selected']:>7.2f} {r['p50_ms']:>8.3f} {r['p95_ms']:>8.3f}")
@@ -0,0 +1,104 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — bench_semantic_cache.py
+# Benchmark: which rewordings the semantic answer cache serves
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   For each group of rewordings below, the first question is
+#   answered (stored in a fresh SemanticCache) and the others are
+#   looked up against it, per ROUTER_MODE. Reported per pair:
+#     - cosine similarity of the two question embeddings
+#     - topic: adviser.answer_topic() of each question — the
+#       semantic cache only serves answers about the same metric
+#     - same routing: whether the full routed metric lists agree
+#       (the old matching rule, for comparison)
+#     - result: hit, near miss (similar enough, other topic) or
+#       miss (below SIMILARITY_THRESHOLD)
+#   The control pairs are about different metrics and must
+#   never hit. The first group is the example from the
+#   semantic_cache.py header.
+#
+# HOW TO RUN:
+#   python bench_semantic_cache.py
+#   python bench_semantic_cache.py --threshold 0.85
+# =============================================================
+
+import argparse
+
+from sentence_transformers import SentenceTransformer
+
+from adviser import answer_topic
+from query_router import route, set_embedder
+from semantic_cache import SemanticCache, SIMILARITY_THRESHOLD
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"   # same model as retrieve.py
+MODES = ("keyword", "semantic", "hybrid")
+
+# stored question first, then rewordings that should reuse its answer
+REWORDINGS = [
+    ["is our runway safe", "how long until we run out of cash", "Is our cash runway safe?"],
+    ["What are our biggest expenses?", "Where is all the money going?", "what are our largest costs"],
+    ["Are clients paying their invoices on time?", "How long does it take to get paid?"],
+    ["Are we losing clients?", "Is client retention getting worse?"],
+]
+
+# similar wording, different metric — must not hit
+CONTROLS = [
+    ("How long until we run out of cash?", "How long does it take to get paid?"),
+    ("Are we losing clients?", "Are we too dependent on one client?"),
+]
+
+
+def check_pair(stored, asked, mode, encode, threshold):
+    """Store `stored`, look up `asked` in a fresh cache."""
+    cache = SemanticCache(threshold=threshold, ttl=None)
+    stored_routes, asked_routes = route(stored, mode=mode), route(asked, mode=mode)
+    vectors = encode([stored, asked])
+    cache.put("service1", 1, vectors[0], stored, answer_topic(stored_routes), "answer")
+    match = cache.lookup("service1", 1, vectors[1], answer_topic(asked_routes))
+    similarity = float(SemanticCache._unit(vectors[0]) @ SemanticCache._unit(vectors[1]))
+    if match is not None:
+        result = "hit"
+    elif cache.stats()["near_misses"]:
+        result = "near miss"
+    else:
+        result = "miss"
+    return {
+        "similarity": similarity,
+        "topics": (answer_topic(stored_routes), answer_topic(asked_routes)),
+        "same_routing": sorted(stored_routes) == sorted(asked_routes),
+        "result": result
+    }
+
+
+def print_pair(stored, asked, r):
+    topic = r["topics"][0] if r["topics"][0] == r["topics"][1] else f"{r['topics'][0]} / {r['topics'][1]}"
+    print(f"  {stored[:34]:<34} ~ {asked[:34]:<34} {r['similarity']:>6.3f} "
+          f"{'yes' if r['same_routing'] else 'no':>7}  {r['result']:<9} {topic}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark semantic answer cache matching")
+    parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD)
+    args = parser.parse_args()
+
+    model = SentenceTransformer(EMBEDDING_MODEL)
+    set_embedder(model.encode)
+
+    print("=" * 60)
+    print(f"BENCHMARK — semantic cache matching (threshold {args.threshold})")
+    print("=" * 60)
+    for mode in MODES:
+        print(f"\n[{mode}]  {'stored':<34}   {'asked':<34} {'cosine':>6} {'routing':>7}  {'result':<9} topic")
+        hits = pairs = control_hits = 0
+        for group in REWORDINGS:
+            for asked in group[1:]:
+                r = check_pair(group[0], asked, mode, model.encode, args.threshold)
+                print_pair(group[0], asked, r)
+                pairs += 1
+                hits += r["result"] == "hit"
+        print("  controls:")
+        for stored, asked in CONTROLS:
+            r = check_pair(stored, asked, mode, model.encode, args.threshold)
+            print_pair(stored, asked, r)
+            control_hits += r["result"] == "hit"
+        print(f"  rewordings served: {hits}/{pairs}    control hits (false hits): {control_hits}/{len(CONTROLS)}")
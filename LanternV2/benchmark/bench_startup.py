@@ -0,0 +1,84 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — bench_startup.py
+# Benchmark: import time and warm-up cost of a fresh worker
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   Starts a fresh Python interpreter per run (nothing cached
+#   in-process) and measures:
+#     - import time of retrieve, adviser and app — how long
+#       before a worker can serve /companies, /route or /ready
+#     - adviser.warm_up(): embedding model, concept store, SQL
+#       files and router description vectors, per resource
+#     - import + warm_up — what every import used to cost when
+#       retrieve.py loaded everything at module level
+#   Reports the median of --runs runs per measurement.
+#
+# HOW TO RUN (same PYTHONPATH as the app):
+#   python bench_startup.py
+#   python bench_startup.py --runs 5 --modules retrieve app
+# =============================================================
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+MODULES = ("retrieve", "adviser", "app")
+
+IMPORT_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"import_ms": (time.perf_counter() - start) * 1000}}))
+"""
+
+WARM_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import adviser
+import_ms = (time.perf_counter() - start) * 1000
+timings = adviser.warm_up()
+print(json.dumps({"import_ms": import_ms,
+                  "warm_ms": (time.perf_counter() - start) * 1000 - import_ms,
+                  **timings}))
+"""
+
+
+def run_fresh(script):
+    """Run script in a new interpreter and return the JSON it prints last."""
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def median_of(runs, script):
+    """{field: median ms} over `runs` fresh interpreters."""
+    samples = [run_fresh(script) for _ in range(runs)]
+    return {field: round(statistics.median(s[field] for s in samples), 1) for field in samples[0]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark worker startup (import + warm-up)")
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per measurement")
+    parser.add_argument("--modules", nargs="+", default=list(MODULES), choices=MODULES)
+    parser.add_argument("--no-warm", action="store_true", help="skip the warm_up() measurement")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"BENCHMARK — worker startup (median of {args.runs} runs)")
+    print("=" * 60)
+    for module in args.modules:
+        timings = median_of(args.runs, IMPORT_SCRIPT.format(module=module))
+        print(f"import {module:<10} {timings['import_ms']:>9.1f} ms")
+
+    if not args.no_warm:
+        timings = median_of(args.runs, WARM_SCRIPT)
+        print("-" * 60)
+        warm_ms, import_ms = timings.pop("warm_ms"), timings.pop("import_ms")
+        print(f"warm_up()         {warm_ms:>9.1f} ms")
+        for name, ms in timings.items():
+            print(f"  {name:<15} {ms:>9.1f} ms")
+        print(f"import + warm_up  {import_ms + warm_ms:>9.1f} ms "
+              f"(every import before lazy loading)")
@@ -0,0 +1,137 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — bench_vector_store.py
+# Benchmark: ChromaDB vs in-process NumPy concept store
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   Builds both stores from the same random unit vectors
+#   (MiniLM size, 384 dims) at 10, 1k and 100k documents and
+#   reports, for each backend:
+#     - build time
+#     - startup time (open the store from disk)
+#     - query latency p50 / p95 for top-K
+#     - top-K agreement of Chroma's HNSW with exact search
+#
+# HOW TO RUN:
+#   python bench_vector_store.py
+#   python bench_vector_store.py --sizes 10 1000 --queries 200
+# =============================================================
+
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import chromadb
+import numpy as np
+
+from vector_store import ChromaStore, NumpyStore
+
+DIM = 384
+TOP_K = 3
+CHROMA_BATCH = 5000   # chromadb rejects very large add() batches
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def make_corpus(n, rng):
+    vectors = rng.normal(size=(n, DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"doc_{i:06d}" for i in range(n)]
+    documents = [f"Synthetic concept document {i}" for i in range(n)]
+    metadatas = [{"metric": f"metric_{i % 50}"} for i in range(n)]
+    return ids, documents, metadatas, vectors
+
+
+def time_queries(store, queries):
+    timings, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append([hit["id"] for hit in store.query(query, TOP_K)])
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, results
+
+
+def bench_size(n, n_queries, workdir, rng):
+    ids, documents, metadatas, vectors = make_corpus(n, rng)
+    queries = rng.normal(size=(n_queries, DIM)).astype(np.float32)
+    row = {"docs": n}
+
+    # --- NumPy -------------------------------------------------
+    numpy_dir = os.path.join(workdir, f"numpy_{n}")
+    start = time.perf_counter()
+    NumpyStore.build(numpy_dir, ids, documents, metadatas, vectors)
+    row["numpy_build_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    numpy_store = NumpyStore(numpy_dir)
+    row["numpy_open_ms"] = (time.perf_counter() - start) * 1000
+    numpy_store.query(queries[0], TOP_K)   # touch the mmap once
+    numpy_times, exact = time_queries(numpy_store, queries)
+
+    # --- Chroma ------------------------------------------------
+    chroma_dir = os.path.join(workdir, f"chroma_{n}")
+    start = time.perf_counter()
+    client = chromadb.PersistentClient(path=chroma_dir)
+    collection = client.get_or_create_collection(name="bench", metadata={"hnsw:space": "cosine"})
+    for i in range(0, n, CHROMA_BATCH):
+        collection.add(
+            ids=ids[i:i + CHROMA_BATCH],
+            documents=documents[i:i + CHROMA_BATCH],
+            metadatas=metadatas[i:i + CHROMA_BATCH],
+            embeddings=vectors[i:i + CHROMA_BATCH].tolist()
+        )
+    row["chroma_build_s"] = time.perf_counter() - start
+    del collection, client
+
+    start = time.perf_counter()
+    client = chromadb.PersistentClient(path=chroma_dir)
+    chroma_store = ChromaStore(client.get_collection(name="bench"))
+    chroma_store.query(queries[0], TOP_K)  # first query loads the HNSW index
+    row["chroma_open_ms"] = (time.perf_counter() - start) * 1000
+    chroma_times, approx = time_queries(chroma_store, queries)
+
+    row["numpy_p50_ms"] = statistics.median(numpy_times)
+    row["numpy_p95_ms"] = percentile(numpy_times, 95)
+    row["chroma_p50_ms"] = statistics.median(chroma_times)
+    row["chroma_p95_ms"] = percentile(chroma_times, 95)
+    row["recall_at_k"] = statistics.mean(
+        len(set(a) & set(e)) / len(e) for a, e in zip(approx, exact)
+    )
+    return row
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Chroma vs NumPy vector store")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    workdir = tempfile.mkdtemp(prefix="lantern_vs_")
+    try:
+        print("=" * 60)
+        print("BENCHMARK — Chroma vs NumPy concept store")
+        print("=" * 60)
+        header = (f"{'docs':>8} | {'build s':>15} | {'open ms':>17} | "
+                  f"{'p50 ms':>15} | {'p95 ms':>15} | {'recall':>6}")
+        print(f"{'':>8} | {'chroma / numpy':>15} | {'chroma / numpy':>17} | "
+              f"{'chroma / numpy':>15} | {'chroma / numpy':>15} |")
+        print(header)
+        print("-" * len(header))
+        for n in args.sizes:
+            r = bench_size(n, args.queries, workdir, rng)
+            print(f"{r['docs']:>8} | "
+                  f"{r['chroma_build_s']:>6.2f} / {r['numpy_build_s']:<6.2f} | "
+                  f"{r['chroma_open_ms']:>7.1f} / {r['numpy_open_ms']:<7.1f} | "
+                  f"{r['chroma_p50_ms']:>6.3f} / {r['numpy_p50_ms']:<6.3f} | "
+                  f"{r['chroma_p95_ms']:>6.3f} / {r['numpy_p95_ms']:<6.3f} | "
+                  f"{r['recall_at_k']:>6.3f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
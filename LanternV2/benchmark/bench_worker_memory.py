@@ -0,0 +1,146 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — bench_worker_memory.py
+# Benchmark: memory per web worker, local model vs embedding worker
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   Starts N stand-in web workers at once. Each imports app,
+#   warms the pipeline and answers one concept search, then
+#   stays alive while its memory is read. Two modes:
+#     local  — every worker loads its own model + concept store
+#     shared — one embedding_worker.py process holds them; the
+#              web workers get LANTERN_EMBEDDING_WORKER
+#
+#   Reported per mode (Linux, from /proc/<pid>/smaps_rollup):
+#     - RSS per web worker (median)
+#     - PSS per web worker (median) — shared pages split
+#       between the processes that map them
+#     - total PSS of every process, including the embedding
+#       worker: what the host actually pays for N workers
+#
+# HOW TO RUN (same PYTHONPATH / LANTERN_HOME as the app):
+#   python bench_worker_memory.py
+#   python bench_worker_memory.py --workers 1 2 4 8
+# =============================================================
+
+import argparse
+import os
+import secrets
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from embedding_worker import AUTHKEY_ENV, EmbeddingClient, EmbeddingWorkerError
+
+EMBEDDING_WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                       "..", "embedding_worker", "embedding_worker.py")
+
+WEB_WORKER_SCRIPT = """
+import sys
+import app, adviser, retrieve
+adviser.warm_up()
+retrieve.get_concepts("Is our cash runway safe?")
+print("ready", flush=True)
+sys.stdin.readline()
+"""
+
+
+def memory_kb(pid):
+    """{"rss", "pss"} in kB for a live process."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key.lower()] = int(rest.split()[0])
+    return values
+
+
+def start_embedding_worker(address, timeout=300):
+    """Launch embedding_worker.py and wait until it answers."""
+    process = subprocess.Popen([sys.executable, EMBEDDING_WORKER_SCRIPT, "--address", address],
+                               stdout=subprocess.DEVNULL)
+    client = EmbeddingClient(address, pool_size=1)
+    deadline = time.time() + timeout
+    while True:
+        try:
+            client.worker_stats()
+            client.close()
+            return process
+        except EmbeddingWorkerError:
+            if process.poll() is not None or time.time() > deadline:
+                process.kill()
+                raise RuntimeError("embedding worker did not start")
+            time.sleep(0.2)
+
+
+def measure(workers, worker_address=None):
+    """Start `workers` web workers side by side and read their memory."""
+    env = dict(os.environ)
+    env.pop("LANTERN_EMBEDDING_WORKER", None)
+    if worker_address:
+        env["LANTERN_EMBEDDING_WORKER"] = worker_address
+    processes = [
+        subprocess.Popen([sys.executable, "-c", WEB_WORKER_SCRIPT], env=env, text=True,
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        for _ in range(workers)
+    ]
+    try:
+        for process in processes:
+            # skip the pipeline's own progress lines
+            while True:
+                line = process.stdout.readline()
+                if not line:
+                    raise RuntimeError("web worker exited before it was ready")
+                if line.strip() == "ready":
+                    break
+        return [memory_kb(p.pid) for p in processes]
+    finally:
+        for process in processes:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+            process.wait()
+
+
+def summarize(samples, extra_pss=0):
+    return {
+        "rss_mb": statistics.median(s["rss"] for s in samples) / 1024,
+        "pss_mb": statistics.median(s["pss"] for s in samples) / 1024,
+        "total_pss_mb": (sum(s["pss"] for s in samples) + extra_pss) / 1024
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark memory per web worker")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    # worker and web workers inherit the key through the environment
+    os.environ.setdefault(AUTHKEY_ENV, secrets.token_hex(32))
+
+    print("=" * 60)
+    print("BENCHMARK — memory per web worker")
+    print("=" * 60)
+    header = f"{'mode':<8} {'workers':>7} {'RSS/worker':>11} {'PSS/worker':>11} {'total PSS':>10}"
+    print(header)
+    print("-" * len(header))
+
+    for n in args.workers:
+        r = summarize(measure(n))
+        print(f"{'local':<8} {n:>7} {r['rss_mb']:>9.1f}MB {r['pss_mb']:>9.1f}MB {r['total_pss_mb']:>8.1f}MB")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        address = os.path.join(tmp, "embedding.sock")
+        worker = start_embedding_worker(address)
+        try:
+            for n in args.workers:
+                samples = measure(n, address)
+                r = summarize(samples, extra_pss=memory_kb(worker.pid)["pss"])
+                print(f"{'shared':<8} {n:>7} {r['rss_mb']:>9.1f}MB {r['pss_mb']:>9.1f}MB "
+                      f"{r['total_pss_mb']:>8.1f}MB")
+            print(f"(embedding worker alone: {memory_kb(worker.pid)['pss'] / 1024:.1f}MB PSS)")
+        finally:
+            worker.terminate()
+            worker.wait()
@@ -0,0 +1,359 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — benchmark.py
+# Benchmark harness: every pipeline stage, machine-readable
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   1. Generates synthetic service-company databases (see
+#      synthetic_db.py) for each requested size preset
+#   2. Starts a local stub in place of Ollama (configurable
+#      time to first token, token count and token interval), so
+#      results don't depend on a GPU
+#   3. Runs a fixed question corpus through each stage:
+#        route      query_router.route
+#        sql        retrieve.get_live_data (routed metrics)
+#        embed      SentenceTransformer.encode (uncached)
+#        vector     concept store query
+#        prompt     adviser.build_request_prompt (packing included)
+#        llm        Ollama call against the stub (ttft tracked too)
+#        end_to_end all of the above, one question at a time
+#   4. Reports p50 / p95 / p99 / mean latency per stage,
+#      end-to-end throughput with N concurrent workers, and
+#      peak traced memory per stage (tracemalloc, in a separate
+#      pass so it doesn't skew the timings)
+#   5. Writes everything as JSON for regression tracking
+#
+#   Caches (metric, concept results) are off unless --warm, so
+#   the numbers measure the work, not the cache.
+#
+# HOW TO RUN:
+#   python benchmark.py --sizes small medium --out bench.json
+#   python benchmark.py --sizes large --repeat 50 --concurrency 8
+#   python benchmark.py --materialize --sql-dir /workspace/Lantern_V2/matrix_queries
+# =============================================================
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import retrieve
+from adviser import build_request_prompt, canonical_queries, COMPANY_NAMES
+from db_pool import close_all
+from materialize import build as build_materialized
+from ollama_client import OllamaClient
+from query_router import route
+from synthetic_db import create_company_db
+
+# -------------------------------------------------------------
+# CONFIGURATION
+# -------------------------------------------------------------
+
+SIZES = {
+    # name: create_company_db arguments
+    "small":  {"years": 1, "clients": 20,  "employees": 10,  "invoices_per_month": 30},
+    "medium": {"years": 3, "clients": 60,  "employees": 40,  "invoices_per_month": 200},
+    "large":  {"years": 5, "clients": 300, "employees": 150, "invoices_per_month": 1000}
+}
+COMPANIES = 3   # databases per size, like service1/2/3
+
+QUESTIONS = [
+    "Is our cash runway safe?",
+    "Are we losing clients?",
+    "How productive is our team?",
+    "What are our biggest expenses?",
+    "Are clients paying their invoices on time?",
+    "How is the company performing overall?",
+    "What is our net profit margin?",
+    "Is our client concentration a risk?",
+    "How long until we run out of cash?",
+    "Is revenue growing month over month?",
+    "Are we too dependent on one client?",
+    "Where is all the money going?"
+]
+
+STAGES = ("route", "sql", "embed", "vector", "prompt", "llm", "end_to_end")
+
+# -------------------------------------------------------------
+# STUB OLLAMA
+# -------------------------------------------------------------
+# Speaks enough of /api/generate and /api/chat (streamed NDJSON)
+# for ollama_client: a fixed delay before the first token, then
+# one token every TOKEN_INTERVAL seconds.
+# -------------------------------------------------------------
+
+class StubOllama(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    ttft = 0.05
+    tokens = 60
+    token_interval = 0.002
+
+    def log_message(self, *args):
+        pass
+
+    def _chunk(self, data):
+        line = (json.dumps(data) + "\n").encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])) or b"{}")
+        prompt = body.get("prompt") or "".join(m["content"] for m in body.get("messages", []))
+        chat = "messages" in body
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        time.sleep(self.ttft)
+        for i in range(self.tokens):
+            if i:
+                time.sleep(self.token_interval)
+            token = f" token{i}"
+            self._chunk({"message": {"role": "assistant", "content": token}, "done": False}
+                        if chat else {"response": token, "done": False})
+        final = {
+            "done": True,
+            "prompt_eval_count": len(prompt) // 4,
+            "prompt_eval_duration": 0,
+            "eval_count": self.tokens,
+            "eval_duration": int(self.tokens * self.token_interval * 1e9)
+        }
+        final.update({"message": {"role": "assistant", "content": ""}} if chat else {"response": ""})
+        self._chunk(final)
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def start_stub(ttft, tokens, token_interval):
+    """Run StubOllama on a free local port. Returns (server, base URL)."""
+    handler = type("ConfiguredStub", (StubOllama,), {
+        "ttft": ttft, "tokens": tokens, "token_interval": token_interval
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+# -------------------------------------------------------------
+# STAGES
+# -------------------------------------------------------------
+
+def _generate(client, prompt):
+    if isinstance(prompt, list):
+        return client.chat(prompt)
+    return client.generate(prompt)
+
+
+def run_pipeline(client, question, db_key, record=None):
+    """
+    One question through every stage. record(stage, ms) is
+    called per stage when given.
+    """
+    def timed(stage, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        if record:
+            record(stage, (time.perf_counter() - start) * 1000)
+        return result
+
+    selected = timed("route", route, question)
+    live_data = timed("sql", retrieve.get_live_data, db_key, selected)
+    vector = timed("embed", lambda q: retrieve.get_embedding_model().encode([q])[0], question)
+    concepts = timed("vector", retrieve.get_concept_store().query, vector, retrieve.TOP_K_CONCEPTS)
+    prompt, _ = timed("prompt", build_request_prompt, question, COMPANY_NAMES.get(db_key, db_key),
+                      live_data, concepts, canonical_queries(selected))
+    return timed("llm", _generate, client, prompt)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(values):
+    return {
+        "n": len(values),
+        "mean_ms": round(statistics.mean(values), 4),
+        "p50_ms": round(percentile(values, 50), 4),
+        "p95_ms": round(percentile(values, 95), 4),
+        "p99_ms": round(percentile(values, 99), 4),
+        "max_ms": round(max(values), 4)
+    }
+
+
+def bench_latency(client, db_keys, repeat):
+    """Every question x every company, repeat times. Returns {stage: [ms]}."""
+    samples = {stage: [] for stage in STAGES}
+    ttft = []
+
+    def record(stage, ms):
+        samples[stage].append(ms)
+
+    for _ in range(repeat):
+        for db_key in db_keys:
+            for question in QUESTIONS:
+                start = time.perf_counter()
+                run_pipeline(client, question, db_key, record)
+                samples["end_to_end"].append((time.perf_counter() - start) * 1000)
+                call = client.last_call()
+                if call and call.get("ttft_ms") is not None:
+                    ttft.append(call["ttft_ms"])
+    return samples, ttft
+
+
+def bench_memory(client, db_keys):
+    """Peak traced memory (KiB) of each stage, worst case over the corpus."""
+    peaks = {stage: 0.0 for stage in STAGES}
+    stage_start = {"traced": 0}   # traced bytes when the current stage began
+
+    def record(stage, _ms):
+        _, peak = tracemalloc.get_traced_memory()
+        peaks[stage] = max(peaks[stage], (peak - stage_start["traced"]) / 1024)
+        tracemalloc.reset_peak()
+        stage_start["traced"] = tracemalloc.get_traced_memory()[0]
+
+    tracemalloc.start()
+    try:
+        for db_key in db_keys:
+            for question in QUESTIONS:
+                tracemalloc.reset_peak()
+                question_start = stage_start["traced"] = tracemalloc.get_traced_memory()[0]
+                run_pipeline(client, question, db_key, record)
+                peaks["end_to_end"] = max(
+                    peaks["end_to_end"],
+                    max(peaks[s] for s in STAGES if s != "end_to_end"),
+                    (tracemalloc.get_traced_memory()[0] - question_start) / 1024
+                )
+    finally:
+        tracemalloc.stop()
+    return {stage: round(kib, 1) for stage, kib in peaks.items()}
+
+
+def bench_throughput(client, db_keys, concurrency, repeat):
+    """End-to-end questions per second with `concurrency` workers."""
+    jobs = [(q, db_key) for _ in range(repeat) for db_key in db_keys for q in QUESTIONS]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda job: run_pipeline(client, *job), jobs))
+    elapsed = time.perf_counter() - start
+    return {
+        "concurrency": concurrency,
+        "questions": len(jobs),
+        "seconds": round(elapsed, 3),
+        "questions_per_s": round(len(jobs) / elapsed, 2)
+    }
+
+
+def bench_size(name, workdir, client, args):
+    config = SIZES[name]
+    db_keys = []
+    start = time.perf_counter()
+    counts = None
+    for i in range(COMPANIES):
+        db_key = f"bench_{name}_{i + 1}"
+        db_path = os.path.join(workdir, f"{db_key}.db")
+        counts = create_company_db(db_path, seed=1000 + i, **config)
+        if args.materialize:
+            build_materialized(db_path)
+        retrieve.DB_PATHS[db_key] = db_path
+        db_keys.append(db_key)
+    seed_s = time.perf_counter() - start
+
+    # warm-up: page cache, connection pools, model
+    for db_key in db_keys:
+        run_pipeline(client, QUESTIONS[0], db_key)
+
+    samples, ttft = bench_latency(client, db_keys, args.repeat)
+    result = {
+        "database": dict(config, **counts),
+        "seed_seconds": round(seed_s, 2),
+        "stages": {stage: summarize(values) for stage, values in samples.items()},
+        "ttft": summarize(ttft) if ttft else None,
+        "throughput": bench_throughput(client, db_keys, args.concurrency, args.repeat),
+    }
+    if not args.no_memory:
+        memory = bench_memory(client, db_keys)
+        for stage, kib in memory.items():
+            result["stages"][stage]["peak_kib"] = kib
+    return result
+
+
+def print_table(name, result):
+    print(f"\n[{name}] {result['database'].get('transactions', '?')} transactions / company, "
+          f"throughput {result['throughput']['questions_per_s']} q/s "
+          f"at concurrency {result['throughput']['concurrency']}")
+    header = f"  {'stage':<11} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'mean ms':>9} {'peak KiB':>9}"
+    print(header)
+    print("  " + "-" * (len(header) - 2))
+    for stage in STAGES:
+        s = result["stages"][stage]
+        print(f"  {stage:<11} {s['p50_ms']:>9.3f} {s['p95_ms']:>9.3f} {s['p99_ms']:>9.3f} "
+              f"{s['mean_ms']:>9.3f} {s.get('peak_kib', float('nan')):>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Lantern v2 pipeline per stage")
+    parser.add_argument("--sizes", nargs="+", default=["small", "medium"], choices=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the question corpus")
+    parser.add_argument("--concurrency", type=int, default=4, help="workers for the throughput run")
+    parser.add_argument("--sql-dir", help="directory with the metric .sql files (default retrieve.SQL_DIR)")
+    parser.add_argument("--materialize", action="store_true", help="build materialized summary tables")
+    parser.add_argument("--warm", action="store_true", help="leave metric / concept caches on")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--stub-ttft-ms", type=float, default=50.0)
+    parser.add_argument("--stub-tokens", type=int, default=60)
+    parser.add_argument("--stub-token-ms", type=float, default=2.0)
+    parser.add_argument("--out", default="benchmark_results.json", help="JSON output file")
+    args = parser.parse_args()
+
+    if args.sql_dir:
+        retrieve.SQL_DIR = args.sql_dir
+        retrieve.get_sql_queries(reload=True)
+    if not args.warm:
+        retrieve.USE_METRIC_CACHE = False
+        retrieve.CACHE_CONCEPT_RESULTS = False
+
+    server, url = start_stub(args.stub_ttft_ms / 1000, args.stub_tokens, args.stub_token_ms / 1000)
+    client = OllamaClient(host=url, pool_size=max(4, args.concurrency))
+
+    print("=" * 60)
+    print("BENCHMARK — Lantern v2 pipeline stages")
+    print("=" * 60)
+    report = {
+        "meta": {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "questions": len(QUESTIONS),
+            "companies": COMPANIES,
+            "repeat": args.repeat,
+            "warm_caches": args.warm,
+            "materialized": args.materialize,
+            "vector_backend": retrieve.VECTOR_BACKEND,
+            "stub": {"ttft_ms": args.stub_ttft_ms, "tokens": args.stub_tokens,
+                     "token_ms": args.stub_token_ms}
+        },
+        "sizes": {}
+    }
+    try:
+        with tempfile.TemporaryDirectory(prefix="lantern_bench_") as workdir:
+            for name in args.sizes:
+                print(f"\nSeeding {COMPANIES} '{name}' databases ...")
+                report["sizes"][name] = bench_size(name, workdir, client, args)
+                print_table(name, report["sizes"][name])
+            # pools hold the temporary databases open
+            close_all()
+    finally:
+        server.shutdown()
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.out}")
@@ -0,0 +1,247 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — synthetic_db.py
+# Benchmark helper: generate service-company databases
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   Builds a SQLite database shaped like the service company
+#   databases (clients, employees, invoices, transactions,
+#   cash balance) filled with several years of random but
+#   reproducible ledger rows.
+#
+#   Used by the benchmark scripts so we can measure retrieval
+#   on databases far larger than service1/2/3.
+#
+# HOW TO RUN:
+#   python synthetic_db.py bench_company.db --years 5
+# =============================================================
+
+import argparse
+import os
+import random
+import sqlite3
+from datetime import date, timedelta
+
+# -------------------------------------------------------------
+# SCHEMA
+# -------------------------------------------------------------
+
+SCHEMA = """
+CREATE TABLE clients (
+    client_id      INTEGER PRIMARY KEY,
+    client_name    TEXT NOT NULL,
+    industry       TEXT,
+    start_date     TEXT NOT NULL,
+    end_date       TEXT,
+    status         TEXT NOT NULL
+);
+
+CREATE TABLE employees (
+    employee_id       INTEGER PRIMARY KEY,
+    name              TEXT NOT NULL,
+    role              TEXT,
+    hire_date         TEXT NOT NULL,
+    termination_date  TEXT,
+    annual_salary     REAL NOT NULL
+);
+
+CREATE TABLE invoices (
+    invoice_id     INTEGER PRIMARY KEY,
+    client_id      INTEGER NOT NULL REFERENCES clients(client_id),
+    invoice_date   TEXT NOT NULL,
+    due_date       TEXT NOT NULL,
+    paid_date      TEXT,
+    amount         REAL NOT NULL,
+    status         TEXT NOT NULL
+);
+
+CREATE TABLE transactions (
+    transaction_id    INTEGER PRIMARY KEY,
+    transaction_date  TEXT NOT NULL,
+    type              TEXT NOT NULL,
+    category          TEXT NOT NULL,
+    client_id         INTEGER REFERENCES clients(client_id),
+    amount            REAL NOT NULL,
+    description       TEXT
+);
+
+CREATE TABLE cash_balance (
+    balance_date   TEXT PRIMARY KEY,
+    balance        REAL NOT NULL
+);
+
+CREATE INDEX idx_transactions_date ON transactions(transaction_date);
+CREATE INDEX idx_invoices_client ON invoices(client_id);
+"""
+
+EXPENSE_CATEGORIES = {
+    "Payroll":       0.55,
+    "Rent":          0.10,
+    "Software":      0.06,
+    "Travel":        0.07,
+    "Marketing":     0.06,
+    "Insurance":     0.04,
+    "Professional Services": 0.05,
+    "Utilities":     0.03,
+    "Office Supplies": 0.04
+}
+
+INDUSTRIES = ["Healthcare", "Retail", "Manufacturing", "Technology",
+              "Finance", "Education", "Logistics", "Hospitality"]
+
+ROLES = ["Consultant", "Senior Consultant", "Manager", "Analyst",
+         "Partner", "Operations", "Sales"]
+
+
+def _month_starts(start, months):
+    """Yield the first day of each month for `months` months."""
+    year, month = start.year, start.month
+    for _ in range(months):
+        yield date(year, month, 1)
+        month += 1
+        if month > 12:
+            year, month = year + 1, 1
+
+
+def create_company_db(path, years=3, clients=40, employees=25,
+                      invoices_per_month=60, seed=42):
+    """
+    Create (or overwrite) a synthetic service-company database.
+
+    Args:
+        path:       output .db file
+        years:      how many years of history to generate
+        clients:    number of clients
+        employees:  number of employees
+        invoices_per_month: invoices issued per month
+        seed:       random seed so runs are reproducible
+
+    Returns:
+        dict: row counts per table
+    """
+    rng = random.Random(seed)
+    if os.path.exists(path):
+        os.remove(path)
+
+    months = years * 12
+    today = date.today()
+    start = date(today.year - years, today.month, 1)
+
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(SCHEMA)
+
+        # clients — a few of them leave along the way so churn
+        # has something to measure
+        client_rows = []
+        for client_id in range(1, clients + 1):
+            client_start = start + timedelta(days=rng.randint(0, months * 15))
+            ended = rng.random() < 0.2
+            client_end = client_start + timedelta(days=rng.randint(90, 720)) if ended else None
+            if client_end and client_end >= today:
+                client_end = None
+            client_rows.append((
+                client_id,
+                f"Client {client_id:04d}",
+                rng.choice(INDUSTRIES),
+                client_start.isoformat(),
+                client_end.isoformat() if client_end else None,
+                "inactive" if client_end else "active"
+            ))
+        conn.executemany("INSERT INTO clients VALUES (?, ?, ?, ?, ?, ?)", client_rows)
+
+        employee_rows = []
+        for employee_id in range(1, employees + 1):
+            hired = start + timedelta(days=rng.randint(0, months * 20))
+            if hired >= today:
+                hired = start
+            left = rng.random() < 0.15
+            terminated = hired + timedelta(days=rng.randint(120, 900)) if left else None
+            if terminated and terminated >= today:
+                terminated = None
+            employee_rows.append((
+                employee_id,
+                f"Employee {employee_id:04d}",
+                rng.choice(ROLES),
+                hired.isoformat(),
+                terminated.isoformat() if terminated else None,
+                round(rng.uniform(55000, 180000), 2)
+            ))
+        conn.executemany("INSERT INTO employees VALUES (?, ?, ?, ?, ?, ?)", employee_rows)
+
+        # invoices + revenue transactions + expense transactions
+        # month by month
+        invoice_rows = []
+        transaction_rows = []
+        balance_rows = []
+        # a handful of big clients make concentration interesting
+        weights = [rng.paretovariate(1.5) for _ in range(clients)]
+        balance = rng.uniform(250000, 900000)
+
+        for month_start in _month_starts(start, months):
+            month_revenue = 0.0
+            for _ in range(invoices_per_month):
+                client_id = rng.choices(range(1, clients + 1), weights=weights)[0]
+                issued = month_start + timedelta(days=rng.randint(0, 27))
+                due = issued + timedelta(days=30)
+                amount = round(rng.uniform(2000, 40000), 2)
+                paid = issued + timedelta(days=rng.randint(10, 90))
+                if paid >= today:
+                    paid_date, status = None, "open"
+                else:
+                    paid_date, status = paid.isoformat(), "paid"
+                invoice_rows.append((None, client_id, issued.isoformat(), due.isoformat(),
+                                     paid_date, amount, status))
+                transaction_rows.append((None, issued.isoformat(), "revenue", "Consulting Fees",
+                                         client_id, amount, "Invoice payment"))
+                month_revenue += amount
+
+            month_expenses = month_revenue * rng.uniform(0.75, 1.05)
+            for category, share in EXPENSE_CATEGORIES.items():
+                # split each category into a few ledger lines
+                lines = rng.randint(2, 6)
+                for _ in range(lines):
+                    spent = month_start + timedelta(days=rng.randint(0, 27))
+                    amount = round(month_expenses * share / lines * rng.uniform(0.8, 1.2), 2)
+                    transaction_rows.append((None, spent.isoformat(), "expense", category,
+                                             None, amount, f"{category} expense"))
+
+            balance += month_revenue - month_expenses
+            balance_rows.append((month_start.isoformat(), round(balance, 2)))
+
+        conn.executemany("INSERT INTO invoices VALUES (?, ?, ?, ?, ?, ?, ?)", invoice_rows)
+        conn.executemany("INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?)", transaction_rows)
+        conn.executemany("INSERT INTO cash_balance VALUES (?, ?)", balance_rows)
+        conn.commit()
+    finally:
+        conn.close()
+
+    return {
+        "clients": len(client_rows),
+        "employees": len(employee_rows),
+        "invoices": len(invoice_rows),
+        "transactions": len(transaction_rows),
+        "cash_balance": len(balance_rows)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic service-company database")
+    parser.add_argument("path", help="output .db file")
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--clients", type=int, default=40)
+    parser.add_argument("--employees", type=int, default=25)
+    parser.add_argument("--invoices-per-month", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    counts = create_company_db(
+        args.path,
+        years=args.years,
+        clients=args.clients,
+        employees=args.employees,
+        invoices_per_month=args.invoices_per_month,
+        seed=args.seed
+    )
+    print(f"Created {args.path}")
+    for table, count in counts.items():
+        print(f"  {table}: {count} rows")
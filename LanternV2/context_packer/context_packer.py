@@ -0,0 +1,301 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — context_packer.py
+# Fit concepts, live data and history into a token budget
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   The prompt builder used to paste every concept document,
+#   every row of every metric (the whole monthly revenue
+#   series) and the entire conversation history. Ollama then
+#   spent time evaluating all of it — or silently cut it off
+#   at num_ctx.
+#
+#   pack_context() runs before the prompt is built:
+#     1. counts tokens per section (system, concepts, data,
+#        history, question)
+#     2. gives concepts and data fixed shares of the window —
+#        never more or less because of the history — and the
+#        data of the stable metrics (the ones in the cached chat
+#        prefix) a share of its own, so their rows come out the
+#        same for every question on the same data
+#     3. shrinks sections that don't fit:
+#          concepts — lowest-scoring docs are cut down first
+#          data     — long row sets keep the first and latest
+#                     rows plus a summary of the rows in between
+#          history  — gets what is left; whole turns are dropped
+#                     from the front, HISTORY_DROP_BLOCK at a
+#                     time, and kept turns are never edited
+#     4. reports what was dropped
+#
+#   Everything above exists to keep the chat prompt's prefix
+#   (adviser.build_messages) byte-identical between turns, so
+#   Ollama's KV cache stays valid even once a long session no
+#   longer fits.
+#
+#   Token counts are an estimate (about 4 characters per token
+#   for Llama 3 English text) unless set_tokenizer() is given a
+#   real tokenizer.
+# =============================================================
+
+from table_format import format_rows
+
+# -------------------------------------------------------------
+# CONFIGURATION
+# -------------------------------------------------------------
+
+CONTEXT_WINDOW   = 8192   # must match num_ctx sent to Ollama
+RESPONSE_RESERVE = 512    # room left for the answer (num_predict)
+SAFETY_MARGIN    = 256    # covers chat-template tokens and estimate error
+CHARS_PER_TOKEN  = 4.0
+
+# share of the token budget concepts and data may use; history
+# gets whatever they and the fixed text leave over
+SECTION_SHARES = {
+    "concepts": 0.35,
+    "data":     0.40
+}
+STABLE_DATA_SHARE = 0.5  # part of the data share reserved for stable_queries
+
+MIN_ROWS_KEPT    = 3     # rows kept at each end of a long row set
+MIN_CONCEPT_CHARS = 400  # below this a concept doc is dropped, not cut
+# history is cut by this many turns at a time, counted from the
+# first turn, so the kept turns start at the same place for
+# several consecutive questions
+HISTORY_DROP_BLOCK = 4
+
+_tokenizer = None
+
+
+def set_tokenizer(count_fn):
+    """Use a real tokenizer: count_fn(text) -> number of tokens."""
+    global _tokenizer
+    _tokenizer = count_fn
+
+
+def count_tokens(text):
+    if not text:
+        return 0
+    if _tokenizer is not None:
+        return _tokenizer(text)
+    return max(1, int(len(text) / CHARS_PER_TOKEN + 0.5))
+
+
+# -------------------------------------------------------------
+# SECTION COSTS
+# -------------------------------------------------------------
+
+def _rows_tokens(rows, fmt="kv"):
+    """Tokens of a row set written in the given table_format layout."""
+    return count_tokens(format_rows(rows, fmt)) if rows else 0
+
+
+def _concept_tokens(concept):
+    return count_tokens(f"\n--- {concept['metric']} ---\n{concept['text']}\n")
+
+
+def _exchange_tokens(exchange):
+    return count_tokens(f"User: {exchange['question']}\nLantern: {exchange['answer']}\n\n")
+
+
+def _data_tokens(live_data, selected_queries, formats):
+    total = 0
+    for query_name in selected_queries:
+        rows = live_data.get(query_name, [])
+        total += count_tokens(f"[ {query_name.upper()} ]\n")
+        if isinstance(rows, list):
+            total += _rows_tokens(rows, formats.get(query_name, "kv"))
+        else:
+            total += count_tokens(str(rows))
+    return total
+
+
+# -------------------------------------------------------------
+# SHRINKING
+# -------------------------------------------------------------
+
+def summarize_rows(rows):
+    """
+    One summary row describing rows that were left out:
+    how many, and min / max / mean of each numeric column.
+    """
+    summary = {"omitted_rows": len(rows)}
+    if not rows:
+        return summary
+    first, last = rows[0], rows[-1]
+    for key in first:
+        values = [r.get(key) for r in rows if isinstance(r.get(key), (int, float))
+                  and not isinstance(r.get(key), bool)]
+        if values and len(values) == len(rows):
+            summary[f"{key}_min"] = round(min(values), 2)
+            summary[f"{key}_max"] = round(max(values), 2)
+            summary[f"{key}_mean"] = round(sum(values) / len(values), 2)
+        elif first.get(key) != last.get(key):
+            # non-numeric columns (e.g. month) — show the span
+            summary[f"{key}_range"] = f"{first.get(key)} .. {last.get(key)}"
+    return summary
+
+
+def _shrink_rows(rows, budget, fmt="kv"):
+    """
+    Keep the first and latest rows of a long row set, replacing
+    the middle with a summary row. Returns (rows, omitted count).
+    """
+    if _rows_tokens(rows, fmt) <= budget or len(rows) <= 2 * MIN_ROWS_KEPT + 1:
+        return rows, 0
+
+    # grow the kept ends while they still fit; the tail matters
+    # more for trends (latest months), so it gets the extra row
+    head, tail = MIN_ROWS_KEPT, MIN_ROWS_KEPT
+    while head + tail < len(rows) - 1:
+        candidate_head, candidate_tail = (head, tail + 1) if tail <= head else (head + 1, tail)
+        middle = rows[candidate_head:len(rows) - candidate_tail]
+        candidate = rows[:candidate_head] + [summarize_rows(middle)] + rows[len(rows) - candidate_tail:]
+        cost = _rows_tokens(candidate, fmt)
+        if cost > budget:
+            break
+        head, tail = candidate_head, candidate_tail
+
+    middle = rows[head:len(rows) - tail]
+    packed = rows[:head] + [summarize_rows(middle)] + rows[len(rows) - tail:]
+    return packed, len(middle)
+
+
+def _pack_data(live_data, selected_queries, budget, dropped, formats):
+    """Shrink the longest row sets first until the data fits."""
+    packed = dict(live_data)
+    total = _data_tokens(packed, selected_queries, formats)
+    if total <= budget:
+        return packed, total
+
+    def size(query_name):
+        return _rows_tokens(packed[query_name], formats.get(query_name, "kv"))
+
+    # biggest row sets first
+    by_size = sorted(
+        (q for q in selected_queries if isinstance(packed.get(q), list)),
+        key=size,
+        reverse=True
+    )
+    for query_name in by_size:
+        if total <= budget:
+            break
+        rows = packed[query_name]
+        allowed = max(0, size(query_name) - (total - budget))
+        new_rows, omitted = _shrink_rows(rows, allowed, formats.get(query_name, "kv"))
+        if omitted:
+            packed[query_name] = new_rows
+            dropped.append(f"data: {query_name} — {omitted} of {len(rows)} rows summarized")
+            total = _data_tokens(packed, selected_queries, formats)
+    return packed, total
+
+
+def _pack_concepts(concepts, budget, dropped):
+    """Cut the lowest-scoring concept docs first; drop them if too short to help."""
+    packed = [dict(c) for c in concepts]
+    total = sum(_concept_tokens(c) for c in packed)
+    if total <= budget:
+        return packed, total
+
+    for concept in sorted(packed, key=lambda c: c.get("score", 0)):
+        if total <= budget:
+            break
+        over = total - budget
+        current = _concept_tokens(concept)
+        keep_chars = int((current - over) * CHARS_PER_TOKEN)
+        if keep_chars < MIN_CONCEPT_CHARS:
+            packed.remove(concept)
+            dropped.append(f"concepts: {concept['metric']} dropped")
+        else:
+            concept["text"] = concept["text"][:keep_chars].rsplit("\n", 1)[0] + "\n[...]"
+            dropped.append(f"concepts: {concept['metric']} truncated")
+        total = sum(_concept_tokens(c) for c in packed)
+    return packed, total
+
+
+def _pack_history(history, budget, dropped):
+    """
+    Drop whole turns from the front until the rest fits. Kept
+    turns are never edited, and the cut is rounded up to a
+    multiple of HISTORY_DROP_BLOCK turns so it only moves every
+    few questions.
+    """
+    history = list(history or [])
+    costs = [_exchange_tokens(e) for e in history]
+    total = sum(costs)
+    if total <= budget:
+        return history, total
+
+    cut = 0
+    while cut < len(history) and total > budget:
+        total -= costs[cut]
+        cut += 1
+    aligned = min(len(history), -(-cut // HISTORY_DROP_BLOCK) * HISTORY_DROP_BLOCK)
+    total -= sum(costs[cut:aligned])
+    dropped.append(f"history: {aligned} oldest of {len(history)} turns dropped")
+    return history[aligned:], total
+
+
+# -------------------------------------------------------------
+# PACK
+# -------------------------------------------------------------
+
+def pack_context(system_text, question, live_data, concepts, selected_queries,
+                 history=None, context_window=CONTEXT_WINDOW, formats=None, stable_queries=None):
+    """
+    Shrink concepts, live data and history to fit the model's
+    context window.
+
+    Args:
+        system_text:      fixed system instructions (never cut)
+        question:         current question (never cut)
+        live_data, concepts, selected_queries, history:
+                          same as build_prompt()
+        context_window:   model context size in tokens
+        formats:          {query_name: table_format layout}
+                          used for the rows (default "kv")
+        stable_queries:   metrics whose rows must pack the same
+                          way whatever else the request holds
+                          (the chat prefix's baseline metrics)
+
+    Returns:
+        (live_data, concepts, history, report) — packed copies
+        plus {"budget", "used", "sections", "dropped"}
+    """
+    formats = formats or {}
+    dropped = []
+    budget = context_window - RESPONSE_RESERVE - SAFETY_MARGIN
+    fixed = count_tokens(system_text) + count_tokens(question)
+
+    stable = [q for q in selected_queries if q in (stable_queries or [])]
+    others = [q for q in selected_queries if q not in stable]
+    needs = {
+        "concepts": sum(_concept_tokens(c) for c in concepts),
+        "data":     _data_tokens(live_data, selected_queries, formats),
+        "history":  sum(_exchange_tokens(e) for e in history or [])
+    }
+
+    # concepts and data budgets depend only on the window, so
+    # neither the history nor the other sections move them
+    budgets = {name: int(budget * share) for name, share in SECTION_SHARES.items()}
+    # fixed even when nothing else is routed, or the stable rows
+    # would pack differently for questions that route nothing else
+    stable_budget = int(budgets["data"] * STABLE_DATA_SHARE)
+    packed_data, stable_used = _pack_data(live_data, stable, stable_budget, dropped, formats)
+    packed_data, others_used = _pack_data(packed_data, others, budgets["data"] - stable_used, dropped, formats)
+    data_used = stable_used + others_used
+    packed_concepts, concepts_used = _pack_concepts(concepts, budgets["concepts"], dropped)
+
+    budgets["history"] = max(0, budget - fixed - data_used - concepts_used)
+    packed_history, history_used = _pack_history(history, budgets["history"], dropped)
+
+    report = {
+        "budget": budget,
+        "used": fixed + data_used + concepts_used + history_used,
+        "sections": {
+            "fixed":    {"used": fixed},
+            "concepts": {"budget": budgets["concepts"], "needed": needs["concepts"], "used": concepts_used},
+            "data":     {"budget": budgets["data"], "needed": needs["data"], "used": data_used},
+            "history":  {"budget": budgets["history"], "needed": needs["history"], "used": history_used}
+        },
+        "dropped": dropped
+    }
+    return packed_data, packed_concepts, packed_history, report
@@ -0,0 +1,338 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — db_pool.py
+# Pooled, read-only SQLite connections per company database
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   Keeps a small pool of open read-only connections for each
+#   company database so a question does not pay the file open
+#   + schema parse cost every time.
+#
+#   - connections open with a mode=ro URI and query_only
+#   - mmap_size / cache_size pragmas keep hot pages in memory
+#   - sqlite3's per-connection statement cache means the 8
+#     metric queries are prepared once and reused
+#   - thread-safe: the FastAPI app and the CLI share the same
+#     pools through get_pool()
+#
+# Retrieval is read-only. Anything that writes to the company
+# databases must open its own connection.
+# =============================================================
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import quote
+
+# -------------------------------------------------------------
+# CONFIGURATION
+# -------------------------------------------------------------
+
+POOL_SIZE          = 4            # max open connections per database
+CHECKOUT_TIMEOUT   = 10           # seconds to wait for a free connection
+MMAP_SIZE          = 256 * 1024 * 1024   # bytes of the db file to memory-map
+CACHE_SIZE_KB      = 64 * 1024    # page cache per connection (KiB)
+STATEMENT_CACHE    = 64           # prepared statements kept per connection
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection frees up within CHECKOUT_TIMEOUT."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of read-only connections to one database.
+
+    Usage:
+        with pool.connection() as conn:
+            rows = conn.execute(sql).fetchall()
+    """
+
+    def __init__(self, db_key, db_path, size=POOL_SIZE, timeout=CHECKOUT_TIMEOUT):
+        self.db_key = db_key
+        self.db_path = os.path.abspath(db_path)
+        self.size = size
+        self.timeout = timeout
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._open = 0
+        self._file_id = None
+        # file id each open connection was opened under; a
+        # connection from an older file is closed at check-in
+        self._generation = {}
+        self._waiting = 0
+
+        # dedicated connection used only for PRAGMA data_version;
+        # its value changes whenever another connection commits
+        self._version_conn = None
+        self._version_lock = threading.Lock()
+
+        # pool metrics
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_seconds = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+
+    # ---------------------------------------------------------
+    # connection lifecycle
+    # ---------------------------------------------------------
+
+    def _connect(self):
+        """Open one read-only connection with the tuning pragmas."""
+        uri = f"file:{quote(self.db_path)}?mode=ro"
+        conn = sqlite3.connect(
+            uri,
+            uri=True,
+            # connections move between threads but are only ever
+            # used by one thread at a time (checked out)
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+        return conn
+
+    def _current_file_id(self):
+        """(device, inode) of the db file — changes if the file is replaced."""
+        st = os.stat(self.db_path)
+        return (st.st_dev, st.st_ino)
+
+    def _recycle_if_replaced(self):
+        """
+        If the database file was swapped out (e.g. a fresh copy
+        dropped in place) the pooled connections still point at
+        the old inode. Close the idle ones so new ones get opened;
+        checked-out ones are closed by _checkin when they return.
+        """
+        file_id = self._current_file_id()
+        with self._lock:
+            if self._file_id is None:
+                self._file_id = file_id
+                return
+            if file_id == self._file_id:
+                return
+            self._file_id = file_id
+            with self._version_lock:
+                if self._version_conn is not None:
+                    self._version_conn.close()
+                    self._version_conn = None
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                self._discard(conn)
+                self._recycled += 1
+
+    def _discard(self, conn):
+        """Close a pooled connection and free its slot (hold self._lock)."""
+        self._generation.pop(conn, None)
+        conn.close()
+        self._open -= 1
+
+    def _open_connection(self):
+        """
+        _connect() for a slot already counted in self._open,
+        tagged with the file id it is opened under.
+        """
+        with self._lock:
+            # read before connecting: if the file is replaced
+            # while we open, the tag is stale and _checkin closes it
+            file_id = self._file_id
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._lock:
+                self._open -= 1
+            raise
+        with self._lock:
+            self._generation[conn] = file_id
+            self._created += 1
+        return conn
+
+    def _checkout(self):
+        self._recycle_if_replaced()
+
+        # fast path: an idle connection is ready
+        try:
+            conn = self._idle.get_nowait()
+            with self._lock:
+                self._checkouts += 1
+            return conn
+        except queue.Empty:
+            pass
+
+        # room to open a new one?
+        with self._lock:
+            can_open = self._open < self.size
+            if can_open:
+                self._open += 1
+        if can_open:
+            conn = self._open_connection()
+            with self._lock:
+                self._checkouts += 1
+            return conn
+
+        # pool exhausted — wait for someone to check in
+        start = time.perf_counter()
+        with self._lock:
+            self._waiting += 1
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            with self._lock:
+                self._timeouts += 1
+            raise PoolTimeout(
+                f"No connection to {self.db_key} available after {self.timeout}s"
+            )
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._waits += 1
+            self._wait_seconds += waited
+            self._checkouts += 1
+        return conn
+
+    def _checkin(self, conn):
+        with self._lock:
+            if self._generation.get(conn) == self._file_id:
+                self._idle.put(conn)
+                return
+            # opened against a file that has since been replaced
+            self._discard(conn)
+            self._recycled += 1
+            # someone blocked on the full pool is waiting for this
+            # slot: open them a connection to the current file
+            replace = self._waiting > 0
+            if replace:
+                self._open += 1
+        if replace:
+            try:
+                self._idle.put(self._open_connection())
+            except Exception as e:
+                print(f"  WARNING: could not reopen {self.db_key}: {e}")
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection, hand it back when done."""
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._checkin(conn)
+
+    def data_version(self):
+        """
+        SQLite's PRAGMA data_version for this database. Only
+        comparable between calls on the same connection, which
+        is why the pool keeps one connection just for this.
+        """
+        with self._version_lock:
+            if self._version_conn is None:
+                self._version_conn = self._connect()
+            return self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def version(self):
+        """
+        Cheap stamp that changes whenever the database content
+        changes: file identity, mtime and size of the db file and
+        its WAL, plus data_version for commits the file stat
+        can miss.
+
+        Returns:
+            tuple — compare with == only
+        """
+        self._recycle_if_replaced()
+        st = os.stat(self.db_path)
+        wal_path = self.db_path + "-wal"
+        wal_mtime = os.stat(wal_path).st_mtime_ns if os.path.exists(wal_path) else 0
+        return (st.st_ino, st.st_mtime_ns, st.st_size, wal_mtime, self.data_version())
+
+    def close(self):
+        """Close every idle connection in the pool."""
+        with self._version_lock:
+            if self._version_conn is not None:
+                self._version_conn.close()
+                self._version_conn = None
+        with self._lock:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                self._discard(conn)
+
+    def stats(self):
+        """Pool metrics as a plain dict."""
+        with self._lock:
+            return {
+                "db_key": self.db_key,
+                "size": self.size,
+                "open": self._open,
+                "idle": self._idle.qsize(),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_ms_total": round(self._wait_seconds * 1000, 2),
+                "timeouts": self._timeouts,
+                "created": self._created,
+                "recycled": self._recycled
+            }
+
+
+# -------------------------------------------------------------
+# SHARED POOLS
+# -------------------------------------------------------------
+# One pool per db_key for the whole process. retrieve.py asks
+# for pools through get_pool(), so the web app and the CLI
+# both reuse the same connections.
+# -------------------------------------------------------------
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_key, db_path):
+    """
+    Return the shared pool for a database, creating it on
+    first use.
+
+    Args:
+        db_key:  "service1", "service2", or "service3"
+        db_path: path to the .db file
+
+    Returns:
+        ConnectionPool
+    """
+    pool = _pools.get(db_key)
+    if pool is not None and pool.db_path == os.path.abspath(db_path):
+        return pool
+    with _pools_lock:
+        pool = _pools.get(db_key)
+        if pool is None or pool.db_path != os.path.abspath(db_path):
+            if pool is not None:
+                pool.close()
+            pool = ConnectionPool(db_key, db_path)
+            _pools[db_key] = pool
+        return pool
+
+
+def pool_stats():
+    """Metrics for every pool: {db_key: stats dict}."""
+    return {db_key: pool.stats() for db_key, pool in list(_pools.items())}
+
+
+def close_all():
+    """Close all idle pooled connections (e.g. on shutdown)."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
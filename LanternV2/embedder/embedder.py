@@ -0,0 +1,112 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — embedder.py
+# Embedding model backends: PyTorch, int8, ONNX Runtime
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   retrieve.py and ingest.py both run all-MiniLM-L6-v2 and both
+#   get it from load_embedder(), so one setting picks how it
+#   runs on the CPU:
+#
+#     torch       PyTorch fp32 (the original)
+#     torch-int8  PyTorch with dynamic int8 quantization of
+#                 every Linear layer — smaller, faster matmuls
+#     onnx        ONNX Runtime, fp32 export of the same weights
+#     onnx-int8   ONNX Runtime, the int8-quantized export
+#                 shipped with the model (ONNX_INT8_FILE)
+#
+#   Every backend returns an object with encode(list of str),
+#   so the embedding cache, micro-batcher and embedding worker
+#   work unchanged.
+#
+#   COMPATIBILITY: all four are the same weights, so questions
+#   embedded by any of them can be searched against concept
+#   vectors indexed with another. int8 moves vectors slightly;
+#   agreement() measures by how much (cosine between each stored
+#   document vector and the same document re-embedded), and
+#   retrieve.warm_up() warns below MIN_AGREEMENT — re-run
+#   ingest.py with the same LANTERN_EMBEDDING_BACKEND to
+#   re-index.
+#
+# REQUIREMENTS:
+#   onnx / onnx-int8: sentence-transformers >= 3.2 and
+#   `pip install optimum[onnxruntime]`
+# =============================================================
+
+import numpy as np
+
+# -------------------------------------------------------------
+# CONFIGURATION
+# -------------------------------------------------------------
+
+EMBEDDING_BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+# int8 ONNX export inside the model repo; pick the one matching
+# the CPU (…_avx512_vnni.onnx, …_arm64.onnx, …)
+ONNX_INT8_FILE = "onnx/model_quint8_avx2.onnx"
+
+# mean cosine between indexed and re-embedded document vectors
+# below which the index should be rebuilt with this backend
+MIN_AGREEMENT = 0.99
+
+
+def load_embedder(model_name, backend="torch"):
+    """
+    Load model_name for CPU inference with the given backend.
+
+    Args:
+        model_name: sentence-transformers model id
+        backend:    one of EMBEDDING_BACKENDS
+
+    Returns:
+        SentenceTransformer (encode(list of str) -> 2D array)
+    """
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend: {backend}. choose from: {list(EMBEDDING_BACKENDS)}")
+    # sentence_transformers pulls in torch — only import it when
+    # a model is actually loaded
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+    if backend == "torch-int8":
+        import torch
+        model = SentenceTransformer(model_name, device="cpu")
+        # weights become int8; activations are quantized on the fly
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    if backend == "onnx":
+        return SentenceTransformer(model_name, backend="onnx")
+    return SentenceTransformer(model_name, backend="onnx", model_kwargs={"file_name": ONNX_INT8_FILE})
+
+
+def embedder_id(model_name, backend="torch"):
+    """
+    Cache key for vectors from this model + backend. fp32 torch
+    keeps the plain model name so existing caches stay valid.
+    """
+    return model_name if backend == "torch" else f"{model_name}+{backend}"
+
+
+def agreement(encode_fn, documents, vectors):
+    """
+    How closely encode_fn reproduces an existing index.
+
+    Args:
+        encode_fn: callable(list of str) -> 2D array
+        documents: indexed document texts
+        vectors:   their stored embeddings, same order
+
+    Returns:
+        dict: {"documents", "mean_cosine", "min_cosine"}
+    """
+    if not documents:
+        return {"documents": 0, "mean_cosine": 1.0, "min_cosine": 1.0}
+    fresh = np.asarray(encode_fn(list(documents)), dtype=np.float32)
+    stored = np.asarray(vectors, dtype=np.float32)
+    fresh /= np.linalg.norm(fresh, axis=1, keepdims=True)
+    stored = stored / np.linalg.norm(stored, axis=1, keepdims=True)
+    cosines = np.sum(fresh * stored, axis=1)
+    return {
+        "documents": len(documents),
+        "mean_cosine": round(float(cosines.mean()), 5),
+        "min_cosine": round(float(cosines.min()), 5)
+    }
@@ -0,0 +1,251 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — embedding_cache.py
+# Bounded cache of question embeddings (and concept results)
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   Encoding a question with the SentenceTransformer is the most
+#   expensive non-LLM step of a request. The example questions
+#   and common rephrasings come up again and again, so we keep
+#   normalized question -> embedding vector in an LRU cache.
+#
+#   - normalization: lowercase, collapse whitespace, drop
+#     trailing punctuation ("Is our runway safe?" and
+#     "is our runway safe" share one entry)
+#   - optional second cache: normalized question -> top-K
+#     concept results, with a TTL so re-ingested docs show up
+#     within RESULT_TTL (the concept store itself reopens a new
+#     build on its next query)
+#   - persisted to a .npz file so a restart starts warm; the
+#     file records the model name and is ignored if it changes.
+#     Periodic saves run on a background thread, never on the
+#     request that crossed SAVE_EVERY; the app saves once more
+#     on shutdown
+#   - hit / miss counters for /stats
+# =============================================================
+
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# -------------------------------------------------------------
+# CONFIGURATION
+# -------------------------------------------------------------
+
+MAX_ENTRIES  = 2048    # question vectors kept in memory
+RESULT_TTL   = 300     # seconds a cached concept result stays valid
+SAVE_EVERY   = 50      # write to disk after this many new vectors
+
+
+def normalize_question(question):
+    """Canonical form used as the cache key (and encoded on a miss)."""
+    cleaned = re.sub(r"\s+", " ", question.strip().lower())
+    return cleaned.rstrip("?!. ")
+
+
+class EmbeddingCache:
+    """
+    Thread-safe LRU cache of question embeddings.
+
+    Args:
+        model_id:    name of the embedding model; vectors from a
+                     different model are never mixed in
+        path:        .npz file to persist to (None = memory only)
+        max_entries: LRU bound for vectors and results
+        result_ttl:  seconds a cached concept result is valid
+    """
+
+    def __init__(self, model_id, path=None, max_entries=MAX_ENTRIES,
+                 result_ttl=RESULT_TTL, save_every=SAVE_EVERY):
+        self.model_id = model_id
+        self.path = path
+        self.max_entries = max_entries
+        self.result_ttl = result_ttl
+        self.save_every = save_every
+
+        self._vectors = OrderedDict()   # normalized question -> float32 vector
+        self._results = OrderedDict()   # (normalized question, top_k) -> (stored_at, results)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()   # one writer of self.path at a time
+        self._unsaved = 0
+        self._save_pending = False
+
+        self._hits = 0
+        self._misses = 0
+        self._result_hits = 0
+        self._result_misses = 0
+        self._evictions = 0
+        self._loaded = 0
+        self._saves = 0
+
+        if path:
+            self.load()
+
+    # ---------------------------------------------------------
+    # question vectors
+    # ---------------------------------------------------------
+
+    def get_vector(self, key):
+        """Cached vector for a normalized question, or None."""
+        with self._lock:
+            vector = self._vectors.get(key)
+            if vector is None:
+                self._misses += 1
+                return None
+            self._vectors.move_to_end(key)
+            self._hits += 1
+            return vector
+
+    def put_vector(self, key, vector):
+        """Store the vector for a normalized question."""
+        with self._lock:
+            self._vectors[key] = np.asarray(vector, dtype=np.float32)
+            self._vectors.move_to_end(key)
+            while len(self._vectors) > self.max_entries:
+                self._vectors.popitem(last=False)
+                self._evictions += 1
+            self._unsaved += 1
+            should_save = self.path and self._unsaved >= self.save_every and not self._save_pending
+            if should_save:
+                self._save_pending = True
+        if should_save:
+            # off the request path: writing the .npz takes longer
+            # than the encode it was saving
+            threading.Thread(target=self._background_save, name="embedding-cache-save",
+                             daemon=True).start()
+
+    def _background_save(self):
+        try:
+            self.save()
+        except Exception as e:
+            print(f"  WARNING: Could not save embedding cache {self.path}: {e}")
+        finally:
+            with self._lock:
+                self._save_pending = False
+
+    def encode(self, questions, encode_fn):
+        """
+        Embeddings for a list of questions, encoding only the
+        ones not cached yet (in a single encode_fn call).
+
+        Args:
+            questions: list of question strings
+            encode_fn: callable(list of str) -> 2D array
+
+        Returns:
+            np.ndarray of shape (len(questions), dim)
+        """
+        keys = [normalize_question(q) for q in questions]
+        vectors = [self.get_vector(key) for key in keys]
+
+        missing = sorted({key for key, vector in zip(keys, vectors) if vector is None})
+        if missing:
+            encoded = encode_fn(missing)
+            fresh = dict(zip(missing, encoded))
+            for key, vector in fresh.items():
+                self.put_vector(key, vector)
+            vectors = [fresh[key] if vector is None else vector
+                       for key, vector in zip(keys, vectors)]
+
+        return np.vstack(vectors).astype(np.float32, copy=False)
+
+    # ---------------------------------------------------------
+    # concept results
+    # ---------------------------------------------------------
+
+    def get_results(self, key, top_k):
+        """Cached concept results for a normalized question, or None."""
+        with self._lock:
+            entry = self._results.get((key, top_k))
+            if entry is None or time.monotonic() - entry[0] > self.result_ttl:
+                if entry is not None:
+                    del self._results[(key, top_k)]
+                self._result_misses += 1
+                return None
+            self._results.move_to_end((key, top_k))
+            self._result_hits += 1
+            return entry[1]
+
+    def put_results(self, key, top_k, results):
+        with self._lock:
+            self._results[(key, top_k)] = (time.monotonic(), results)
+            self._results.move_to_end((key, top_k))
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def clear_results(self):
+        """Forget cached concept results (e.g. after re-ingesting)."""
+        with self._lock:
+            self._results.clear()
+
+    # ---------------------------------------------------------
+    # persistence
+    # ---------------------------------------------------------
+
+    def load(self):
+        """Load vectors saved by a previous run, if compatible."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            data = np.load(self.path, allow_pickle=False)
+            if str(data["model_id"]) != self.model_id:
+                print(f"  Embedding cache built with {data['model_id']} — ignoring it.")
+                return
+            keys, vectors = data["keys"], data["vectors"]
+        except (OSError, KeyError, ValueError) as e:
+            print(f"  WARNING: Could not load embedding cache {self.path}: {e}")
+            return
+        with self._lock:
+            for key, vector in zip(keys[-self.max_entries:], vectors[-self.max_entries:]):
+                self._vectors[str(key)] = vector
+            self._loaded = len(self._vectors)
+
+    def save(self):
+        """
+        Write the vectors to disk (atomically). Saves are
+        serialized, and each writes its own temp file next to
+        the target, so concurrent callers — or processes sharing
+        the path — never interleave or clobber each other's file.
+        """
+        if not self.path:
+            return
+        with self._save_lock:
+            with self._lock:
+                if not self._vectors:
+                    return
+                keys = np.array(list(self._vectors.keys()))
+                vectors = np.vstack(list(self._vectors.values()))
+                self._unsaved = 0
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".embeddings-", suffix=".npz")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.savez(f, model_id=np.array(self.model_id), keys=keys, vectors=vectors)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            with self._lock:
+                self._saves += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._vectors),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+                "loaded_from_disk": self._loaded,
+                "saves": self._saves,
+                "result_entries": len(self._results),
+                "result_hits": self._result_hits,
+                "result_misses": self._result_misses
+            }
@@ -0,0 +1,396 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — embedding_worker.py
+# One process holds the embedding model for every web worker
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   Under `uvicorn app:app --workers N` every worker loads its
+#   own SentenceTransformer (torch and all) and its own Chroma
+#   client — N copies of the same weights. Our hosts run out of
+#   memory long before they run out of CPU.
+#
+#   This module moves both into ONE embedding worker process,
+#   reached over local IPC (multiprocessing.connection, a Unix
+#   socket by default):
+#
+#     export LANTERN_EMBEDDING_AUTHKEY=$(openssl rand -hex 32)
+#     python embedding_worker.py                   # start it once
+#     LANTERN_EMBEDDING_WORKER=/workspace/Lantern_V2/run/embedding.sock \
+#         uvicorn app:app --workers 4
+#
+#   With LANTERN_EMBEDDING_WORKER set, retrieve.py hands out an
+#   EmbeddingClient instead of the model and a RemoteStore
+#   instead of the concept store; the web workers never import
+#   sentence_transformers or chromadb. Each worker keeps its own
+#   embedding / metric caches, which are small.
+#
+#   The NumPy concept store (vector_store.py) is memory-mapped,
+#   so its vectors are shared through the page cache either way.
+#
+# SECURITY:
+#   - there is no default key: worker and clients refuse to run
+#     unless LANTERN_EMBEDDING_AUTHKEY is set (HMAC handshake of
+#     multiprocessing.connection)
+#   - TCP addresses must be loopback; the Unix socket is 0600
+#   - nothing is unpickled: messages are raw bytes (below)
+#
+# PROTOCOL (each message one send_bytes / recv_bytes frame):
+#   4-byte big-endian header length | JSON header | payload
+#   request   {"op": "encode", "texts": [...]}
+#             {"op": "query", "top_k": k}     payload: float32 vector
+#             {"op": "stats"}
+#   response  {"status": "ok", "shape": [n, dim]}  payload: float32 rows
+#             {"status": "ok", "result": ...}      (query, stats)
+#             {"status": "error", "message": "..."}
+# =============================================================
+
+import argparse
+import ipaddress
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+from vector_store import VectorStore
+
+# -------------------------------------------------------------
+# CONFIGURATION
+# -------------------------------------------------------------
+
+DEFAULT_ADDRESS = os.path.join(os.environ.get("LANTERN_HOME", "/workspace/Lantern_V2"),
+                               "run", "embedding.sock")
+AUTHKEY_ENV       = "LANTERN_EMBEDDING_AUTHKEY"
+POOL_SIZE         = 8                  # IPC connections kept open per web worker
+MAX_RETRIES       = 1                  # reconnect once if the worker restarted
+READ_TIMEOUT      = 30                 # seconds to wait for a reply before giving up
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024   # larger frames are refused
+MAX_TOP_K         = 100
+
+
+class EmbeddingWorkerError(Exception):
+    """Raised when the embedding worker cannot be reached or fails."""
+
+
+def authkey_from_env():
+    """The shared secret from LANTERN_EMBEDDING_AUTHKEY (required)."""
+    key = os.environ.get(AUTHKEY_ENV)
+    if not key:
+        raise EmbeddingWorkerError(
+            f"{AUTHKEY_ENV} is not set. The embedding worker and its clients need a "
+            f"shared secret, e.g. export {AUTHKEY_ENV}=$(openssl rand -hex 32)"
+        )
+    return key.encode("utf-8")
+
+
+def parse_address(address):
+    """
+    "host:port" -> (host, port) for TCP; anything else is a Unix
+    socket path. TCP is only allowed on loopback.
+    """
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        host = host.strip("[]")
+        try:
+            loopback = host == "localhost" or ipaddress.ip_address(host).is_loopback
+        except ValueError:
+            loopback = False
+        if not loopback:
+            raise ValueError(f"Embedding worker address {address} is not loopback. "
+                             f"Use a Unix socket or 127.0.0.1:<port>.")
+        return (host, int(port))
+    return address
+
+
+def _pack(header, payload=b""):
+    data = json.dumps(header).encode("utf-8")
+    return struct.pack(">I", len(data)) + data + payload
+
+
+def _unpack(message):
+    if len(message) < 4:
+        raise ValueError("truncated message")
+    (size,) = struct.unpack_from(">I", message)
+    if size > len(message) - 4:
+        raise ValueError("truncated message header")
+    header = json.loads(message[4:4 + size].decode("utf-8"))
+    if not isinstance(header, dict):
+        raise ValueError("message header must be a JSON object")
+    return header, message[4 + size:]
+
+
+def _vectors(header, payload):
+    """float32 rows from a response payload."""
+    shape = tuple(header["shape"])
+    return np.frombuffer(payload, dtype="<f4").reshape(shape).copy()
+
+
+# -------------------------------------------------------------
+# CLIENT (web workers)
+# -------------------------------------------------------------
+
+class EmbeddingClient:
+    """
+    Thread-safe client for the embedding worker. encode() has
+    the same shape as SentenceTransformer.encode, so it drops
+    into retrieve.embed_questions unchanged.
+
+    Args:
+        address:   Unix socket path or loopback "host:port"
+        authkey:   shared secret (bytes); None reads
+                   LANTERN_EMBEDDING_AUTHKEY
+        pool_size: connections kept open; a connection carries
+                   one request at a time
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, authkey=None, pool_size=POOL_SIZE):
+        self.address = parse_address(address)
+        self.authkey = authkey or authkey_from_env()
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._errors = 0
+        self._connects = 0
+
+    def _connect(self):
+        try:
+            conn = Client(self.address, authkey=self.authkey)
+        except (OSError, EOFError) as e:
+            raise EmbeddingWorkerError(f"Cannot reach embedding worker at {self.address}: {e}") from e
+        with self._lock:
+            self._connects += 1
+        return conn
+
+    def _call(self, header, payload=b""):
+        message = _pack(header, payload)
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                conn.send_bytes(message)
+                # a hung worker must not block the ask threads forever
+                replied = conn.poll(READ_TIMEOUT)
+                raw = conn.recv_bytes(MAX_MESSAGE_BYTES) if replied else None
+            except (OSError, EOFError) as e:
+                # the worker restarted or dropped us — retry on a
+                # fresh connection
+                conn.close()
+                if attempt == MAX_RETRIES:
+                    with self._lock:
+                        self._errors += 1
+                    raise EmbeddingWorkerError(f"Embedding worker connection lost: {e}") from e
+                continue
+            try:
+                if raw is None:
+                    raise EmbeddingWorkerError(f"Embedding worker did not reply within {READ_TIMEOUT}s")
+                reply, data = _unpack(raw)
+            except (EmbeddingWorkerError, ValueError) as e:
+                # a late or garbled reply would desynchronize the
+                # connection, so it is never reused
+                conn.close()
+                with self._lock:
+                    self._errors += 1
+                if isinstance(e, EmbeddingWorkerError):
+                    raise
+                raise EmbeddingWorkerError(f"Malformed reply from embedding worker: {e}") from e
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+            ok = reply.get("status") == "ok"
+            with self._lock:
+                self._calls += 1
+                if not ok:
+                    self._errors += 1
+            if not ok:
+                raise EmbeddingWorkerError(reply.get("message", "embedding worker error"))
+            return reply, data
+
+    def encode(self, texts):
+        """Embeddings for a list of texts, (len(texts), dim) float32."""
+        reply, data = self._call({"op": "encode", "texts": [str(t) for t in texts]})
+        try:
+            return _vectors(reply, data)
+        except (KeyError, TypeError, ValueError) as e:
+            raise EmbeddingWorkerError(f"Malformed encode reply from embedding worker: {e}") from e
+
+    def query(self, vector, top_k):
+        """Top-K concept documents, as VectorStore.query."""
+        payload = np.asarray(vector, dtype="<f4").reshape(-1).tobytes()
+        reply, _ = self._call({"op": "query", "top_k": int(top_k)}, payload)
+        return reply["result"]
+
+    def worker_stats(self):
+        """The embedding worker's own counters."""
+        reply, _ = self._call({"op": "stats"})
+        return reply["result"]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "address": str(self.address),
+                "calls": self._calls,
+                "errors": self._errors,
+                "connects": self._connects,
+                "idle_connections": self._idle.qsize()
+            }
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class RemoteStore(VectorStore):
+    """Concept store living in the embedding worker."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def query(self, vector, top_k):
+        return self.client.query(vector, top_k)
+
+    def count(self):
+        return self.client.worker_stats()["documents"]
+
+
+# -------------------------------------------------------------
+# SERVER (the embedding worker process)
+# -------------------------------------------------------------
+
+class EmbeddingServer:
+    """
+    Serves encode / query for every web worker from one copy of
+    the model and concept store. One thread per connection.
+
+    Args:
+        model: object with encode(list of str) -> 2D array
+        store: VectorStore
+    """
+
+    def __init__(self, model, store):
+        self.model = model
+        self.store = store
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._counts = {"encode": 0, "texts": 0, "query": 0, "errors": 0, "connections": 0}
+        self._encode_ms = 0.0
+
+    def handle(self, header, payload):
+        """One request -> (response header, response payload)."""
+        op = header.get("op")
+        if op == "encode":
+            texts = header.get("texts")
+            if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                raise ValueError("encode needs a list of strings")
+            start = time.perf_counter()
+            vectors = np.ascontiguousarray(self.model.encode(texts), dtype="<f4")
+            with self._lock:
+                self._counts["encode"] += 1
+                self._counts["texts"] += len(texts)
+                self._encode_ms += (time.perf_counter() - start) * 1000
+            return {"status": "ok", "shape": list(vectors.shape)}, vectors.tobytes()
+        if op == "query":
+            top_k = header.get("top_k")
+            if not isinstance(top_k, int) or not 1 <= top_k <= MAX_TOP_K:
+                raise ValueError(f"top_k must be an integer in 1..{MAX_TOP_K}")
+            if not payload or len(payload) % 4:
+                raise ValueError("query needs a float32 vector payload")
+            with self._lock:
+                self._counts["query"] += 1
+            vector = np.frombuffer(payload, dtype="<f4")
+            return {"status": "ok", "result": self.store.query(vector, top_k)}, b""
+        if op == "stats":
+            return {"status": "ok", "result": self.stats()}, b""
+        raise ValueError(f"Unknown operation: {op}")
+
+    def serve_connection(self, conn):
+        with self._lock:
+            self._counts["connections"] += 1
+        try:
+            while True:
+                try:
+                    message = conn.recv_bytes(MAX_MESSAGE_BYTES)
+                except (EOFError, OSError):
+                    return
+                try:
+                    reply = _pack(*self.handle(*_unpack(message)))
+                except Exception as e:
+                    with self._lock:
+                        self._counts["errors"] += 1
+                    reply = _pack({"status": "error", "message": f"{type(e).__name__}: {e}"})
+                conn.send_bytes(reply)
+        finally:
+            conn.close()
+
+    def serve_forever(self, address=DEFAULT_ADDRESS, authkey=None):
+        authkey = authkey or authkey_from_env()
+        address = parse_address(address)
+        old_umask = None
+        if isinstance(address, str):
+            os.makedirs(os.path.dirname(address) or ".", exist_ok=True)
+            if os.path.exists(address):
+                os.remove(address)   # stale socket from a previous run
+            # the socket is created 0600 — only this user may connect
+            old_umask = os.umask(0o177)
+        try:
+            listener = Listener(address, authkey=authkey)
+        finally:
+            if old_umask is not None:
+                os.umask(old_umask)
+        if isinstance(address, str):
+            os.chmod(address, 0o600)
+        with listener:
+            print(f"Embedding worker listening on {address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    # a client with the wrong authkey, or one that
+                    # hung up mid-handshake
+                    print(f"  WARNING: rejected connection — {e}")
+                    continue
+                threading.Thread(target=self.serve_connection, args=(conn,), daemon=True).start()
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._counts)
+            encode_ms = self._encode_ms
+        counts["mean_encode_ms"] = round(encode_ms / counts["encode"], 3) if counts["encode"] else 0.0
+        counts["documents"] = self.store.count()
+        counts["uptime_s"] = round(time.time() - self._started, 1)
+        counts["pid"] = os.getpid()
+        return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lantern embedding worker")
+    parser.add_argument("--address", default=os.environ.get("LANTERN_EMBEDDING_WORKER", DEFAULT_ADDRESS),
+                        help='Unix socket path or loopback "host:port"')
+    args = parser.parse_args()
+
+    # refuse to start without a key or on a public address, before
+    # spending time on the model
+    try:
+        authkey = authkey_from_env()
+        parse_address(args.address)
+    except (EmbeddingWorkerError, ValueError) as e:
+        raise SystemExit(f"Error: {e}")
+
+    import retrieve
+    # this process IS the worker — load the model here
+    retrieve.EMBEDDING_WORKER = None
+    print(f"Warm-up: {retrieve.warm_up()}")
+    # requests from every web worker share micro-batches here
+    server = EmbeddingServer(retrieve.get_encoder(), retrieve.get_concept_store())
+    try:
+        server.serve_forever(args.address, authkey)
+    except KeyboardInterrupt:
+        print("\nEmbedding worker stopped.")
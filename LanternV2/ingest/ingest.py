@@ -1,169 +1,342 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — ingest.py
+# Incremental ingest of the concept knowledge base
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   Keeps the ChromaDB collection (and the NumPy store exported
+#   from it) in step with the .txt files in KNOWLEDGE_BASE_DIR,
+#   embedding only what changed:
+#
+#   1. every file is fingerprinted by the SHA-256 of its bytes
+#      (files whose size and mtime match the manifest keep their
+#      recorded hash without being read)
+#   2. the fingerprints are compared with the manifest of the
+#      last run and the ids actually in the collection:
+#        new       not in the collection yet     -> embed + upsert
+#        changed   content hash differs          -> embed + upsert
+#        removed   in the collection, file gone  -> delete
+#        unchanged                               -> nothing
+#      A different embedding model / backend (embedder.py)
+#      re-embeds everything — vectors must come from one model.
+#   3. new and changed documents are embedded in batches of
+#      EMBED_BATCH_SIZE and upserted batch by batch, with a
+#      progress and docs/sec report; the manifest is saved after
+#      every batch, so an interrupted run resumes where it
+#      stopped
+#   4. the NumPy store is re-exported and a few test queries
+#      check that the right concepts come back
+#
+#   Manifest (MANIFEST_PATH):
+#     {"embedder": "all-MiniLM-L6-v2",
+#      "documents": {doc_id: {"filename", "sha256", "size", "mtime"}}}
+#
+# HOW TO RUN:
+#   python ingest.py                 # incremental
+#   python ingest.py --full          # re-embed every document
+#   python ingest.py --batch-size 128 --no-verify
+# =============================================================
+
+import argparse
+import hashlib
+import json
 import os
-import chromadb
-
-from sentence_transformers import SentenceTransformer
-
-KNOWLEDGE_BASE_DIR = "/workspace/Lantern_V2/knowledge_base"
-CHROMA_STORE_DIR = "/workspace/Lantern_V2/chroma_store"
-COLLECTION_NAME = 'lantern_financial_concepts'
-
-
-
-print("Loading embedding models....")
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
-print("Model Loaded.\n")
-
-
-
-print(f"Connecting to ChromaDB at : {CHROMA_STORE_DIR}")
-chroma_client = chromadb.PersistentClient(path=CHROMA_STORE_DIR)
-
-
-
-collection = chroma_client.get_or_create_collection(
-    name = COLLECTION_NAME,
-    # This tells ChromaDB how to measure similarity between vectors.
-    # "cosine" means: find documents whose meaning is closest to
-    # the query, regardless of document length. Best for text.
-    metadata = {"hnsw:space": "cosine"}
-)
-print(f"Collection '{COLLECTION_NAME}' ready. \n")
-
+import time
 
+import chromadb
 
-print(f"Readinf documents from: {KNOWLEDGE_BASE_DIR}\n")
+from embedder import embedder_id, load_embedder
+from vector_store import NumpyStore
 
-documents = [] # for raw text of each document
-doc_ids = [] # unique id for each document in ChromaDB
-metadatas = [] # extra info stored alongside each document
+# -------------------------------------------------------------
+# CONFIGURATION
+# -------------------------------------------------------------
 
-txt_files = sorted([
-    f for f in os.listdir(KNOWLEDGE_BASE_DIR)
-    if f.endswith('.txt')
-])
+LANTERN_HOME = os.environ.get("LANTERN_HOME", "/workspace/Lantern_V2")
+KNOWLEDGE_BASE_DIR = os.path.join(LANTERN_HOME, "knowledge_base")
+CHROMA_STORE_DIR = os.path.join(LANTERN_HOME, "chroma_store")
+COLLECTION_NAME = 'lantern_financial_concepts'
+NUMPY_STORE_DIR = os.path.join(LANTERN_HOME, "numpy_store")
+MANIFEST_PATH = os.path.join(CHROMA_STORE_DIR, "ingest_manifest.json")
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# must match retrieve.py; see embedder.py for the choices
+EMBEDDING_BACKEND = os.environ.get("LANTERN_EMBEDDING_BACKEND", "torch")
+EMBED_BATCH_SIZE = 64   # documents per encode + upsert
+
+TEST_QUERIES = [
+    ("How long can this company survive before running out of cash?",
+     "concept_05_burn_rate_runway"),
+    ("Is out biggest client too large a portion of our revenue?",
+     "concept_04_client_concentration"),
+    ("What is our days sales outstanding and accounts receivable collection time?",
+     "concept_03_days_sales_outstanding")
+]
 
-if not txt_files:
-    print("Error: no .txt file found in knowlege_base/")
-    print("Make sure necessary concepts are uploaded/")
-    exit(1)
 
-for filename in txt_files:
-    filepath = os.path.join(KNOWLEDGE_BASE_DIR, filename)
-    with open(filepath, 'r', encoding='utf-8') as f:
+# -------------------------------------------------------------
+# MANIFEST
+# -------------------------------------------------------------
+
+def load_manifest(path=MANIFEST_PATH):
+    """The previous run's manifest, or an empty one."""
+    if not os.path.exists(path):
+        return {"embedder": None, "documents": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    """Write the manifest atomically (temp file, then swap in)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+# -------------------------------------------------------------
+# SCAN + PLAN
+# -------------------------------------------------------------
+
+def scan_documents(kb_dir, manifest):
+    """
+    Fingerprint every .txt file in kb_dir.
+
+    Args:
+        kb_dir:   knowledge base directory
+        manifest: previous manifest (reused hashes for files
+                  whose size and mtime did not change)
+
+    Returns:
+        dict: {doc_id: {"filename", "path", "sha256", "size", "mtime"}}
+    """
+    known = manifest.get("documents", {})
+    scanned = {}
+    for filename in sorted(f for f in os.listdir(kb_dir) if f.endswith(".txt")):
+        path = os.path.join(kb_dir, filename)
+        stat = os.stat(path)
+        # use the filename (without .txt) as the document ID
+        doc_id = filename[:-len(".txt")]
+        entry = known.get(doc_id)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime_ns:
+            sha256 = entry["sha256"]
+        else:
+            with open(path, "rb") as f:
+                sha256 = hashlib.sha256(f.read()).hexdigest()
+        scanned[doc_id] = {
+            "filename": filename,
+            "path": path,
+            "sha256": sha256,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns
+        }
+    return scanned
+
+
+def plan_changes(scanned, manifest, indexed_ids, embedder, full=False):
+    """
+    Decide what to embed and what to delete.
+
+    Args:
+        scanned:     scan_documents() output
+        manifest:    previous manifest
+        indexed_ids: ids currently in the collection
+        embedder:    embedder_id() of the model in use
+        full:        re-embed every document
+
+    Returns:
+        dict: {"new", "changed", "unchanged", "removed"} lists of ids
+    """
+    known = manifest.get("documents", {})
+    if manifest.get("embedder") != embedder:
+        # vectors from another model / backend can't be mixed in
+        full = True
+    plan = {"new": [], "changed": [], "unchanged": [], "removed": []}
+    for doc_id, entry in scanned.items():
+        if doc_id not in indexed_ids:
+            plan["new"].append(doc_id)
+        elif full or doc_id not in known or known[doc_id]["sha256"] != entry["sha256"]:
+            plan["changed"].append(doc_id)
+        else:
+            plan["unchanged"].append(doc_id)
+    plan["removed"] = sorted(set(indexed_ids) - set(scanned))
+    return plan
+
+
+def read_document(entry):
+    """Text and ChromaDB metadata of one scanned file."""
+    with open(entry["path"], "r", encoding="utf-8") as f:
         text = f.read()
-
-    #use the filename (without, txt) as the document ID
-    doc_id = filename.replace(".txt", "")
     # Extract the metric name from the first line of the file
     # e.g. "METRIC: Net Profit Margin" → "Net Profit Margin"
-    first_line = text.split("\n")[0]
-    metric_name = first_line.replace("METRIC:", "").strip()
-    documents.append(text)
-    doc_ids.append(doc_id)
-    metadatas.append({
-        "filename": filename,
+    metric_name = text.split("\n")[0].replace("METRIC:", "").strip()
+    return text, {
+        "filename": entry["filename"],
         "metric": metric_name,
-        "source": "lanter_concept_doc"
-    })
-    print(f"Loaded: {filename} ({len(text)} characters)")
-print(f"\n{len(documents)} documents loaded.\n")
-
-
-
-print("Embedding documents and storing in ChromaDB ....")
-embeddings = embedding_model.encode(documents).tolist()
-# .tolist() converts numpy arrays to plain Python lists
-# which is what ChromaDB expects
-
-#check if documents alreadu exist to avoid duplicates
-existing = collection.get(ids=doc_ids)  
-existing_ids = existing["ids"]
-
-new_docs = []
-new_embeddings = []
-new_ids = []
-new_metadatas = []
-
-for i , doc_id in enumerate(doc_ids):
-    if doc_id in existing_ids:
-        print(f" Skipping (already exists): {doc_id}")
+        "source": "lanter_concept_doc",
+        "sha256": entry["sha256"]
+    }
+
+
+# -------------------------------------------------------------
+# EMBED + UPSERT
+# -------------------------------------------------------------
+
+def embed_and_upsert(collection, model, doc_ids, scanned, manifest, batch_size=EMBED_BATCH_SIZE):
+    """
+    Embed doc_ids in batches and upsert each batch, recording
+    it in the manifest (saved after every batch).
+
+    Returns:
+        float: documents per second
+    """
+    start = time.perf_counter()
+    done = 0
+    for offset in range(0, len(doc_ids), batch_size):
+        batch = doc_ids[offset:offset + batch_size]
+        texts, metadatas = zip(*(read_document(scanned[doc_id]) for doc_id in batch))
+        # .tolist() converts numpy arrays to plain Python lists
+        # which is what ChromaDB expects
+        embeddings = model.encode(list(texts)).tolist()
+        collection.upsert(
+            ids=list(batch),
+            documents=list(texts),
+            embeddings=embeddings,
+            metadatas=list(metadatas)
+        )
+        for doc_id in batch:
+            entry = scanned[doc_id]
+            manifest["documents"][doc_id] = {
+                key: entry[key] for key in ("filename", "sha256", "size", "mtime")
+            }
+        save_manifest(manifest)
+
+        done += len(batch)
+        elapsed = time.perf_counter() - start
+        print(f"  embedded {done}/{len(doc_ids)} ({done / elapsed:.1f} docs/sec)")
+    elapsed = time.perf_counter() - start
+    return done / elapsed if elapsed > 0 else 0.0
+
+
+def delete_removed(collection, doc_ids, manifest):
+    """Delete documents whose file is gone."""
+    if not doc_ids:
+        return
+    collection.delete(ids=doc_ids)
+    for doc_id in doc_ids:
+        manifest["documents"].pop(doc_id, None)
+        print(f"  removed: {doc_id}")
+    save_manifest(manifest)
+
+
+# -------------------------------------------------------------
+# VERIFICATION
+# -------------------------------------------------------------
+
+def verify(collection, model):
+    """Run TEST_QUERIES and check each returns its expected concept."""
+    print("=" * 60)
+    print("VERIFICATION — running test queries")
+    print("=" * 60)
+    all_passed = True
+    for query, expected in TEST_QUERIES:
+        # embed the question using the same model
+        results = collection.query(
+            query_embeddings=model.encode([query]).tolist(),
+            n_results=1   # return only the top match
+        )
+        top_match = results["ids"][0][0]
+        # distance is 0 = identical, 1 = completely different;
+        # subtract from 1 to get a similarity score instead
+        top_score = round(1 - results["distances"][0][0], 4)
+        status = "PASS" if top_match == expected else "FAIL"
+        all_passed = all_passed and status == "PASS"
+        print(f"\nQuery:    {query}")
+        print(f"Expected: {expected}")
+        print(f"Got:      {top_match}")
+        print(f"Score:    {top_score} [{status}]")
+    print("\n" + "=" * 60)
+    if all_passed:
+        print("ALL TESTS PASSED — the concept store is ready")
     else:
-        new_docs.append(documents[i])
-        new_embeddings.append(embeddings[i])
-        new_ids.append(doc_ids[i])
-        new_metadatas.append(metadatas[i])
-        print(f" Embeddings: {doc_id}")
-
-if new_docs:
-    collection.add(
-        documents= new_docs,
-        embeddings = new_embeddings,
-        ids= new_ids,
-        metadatas=new_metadatas
+        print("SOME TESTS FAILED — check document content and re-run.")
+    print("=" * 60)
+    return all_passed
+
+
+# -------------------------------------------------------------
+# MAIN
+# -------------------------------------------------------------
+
+def ingest(full=False, batch_size=EMBED_BATCH_SIZE, run_verify=True):
+    """
+    Bring the collection and NumPy store up to date with
+    KNOWLEDGE_BASE_DIR.
+
+    Returns:
+        dict: counts per change type, plus "docs_per_sec"
+    """
+    manifest = load_manifest()
+    embedder = embedder_id(EMBEDDING_MODEL, EMBEDDING_BACKEND)
+
+    print(f"Connecting to ChromaDB at: {CHROMA_STORE_DIR}")
+    chroma_client = chromadb.PersistentClient(path=CHROMA_STORE_DIR)
+    collection = chroma_client.get_or_create_collection(
+        name=COLLECTION_NAME,
+        # This tells ChromaDB how to measure similarity between vectors.
+        # "cosine" means: find documents whose meaning is closest to
+        # the query, regardless of document length. Best for text.
+        metadata={"hnsw:space": "cosine"}
     )
-    print(f"\n{len(new_docs)} documents added to chromaDB")
-else:
-    print("\nAll documents already exist in ChromDB, Nothing added.")
-
-print(f"Total documents in collection: {collection.count()}\n")
+    indexed_ids = set(collection.get(include=[])["ids"])
+    print(f"Collection '{COLLECTION_NAME}': {len(indexed_ids)} documents.\n")
+
+    print(f"Scanning documents in: {KNOWLEDGE_BASE_DIR}")
+    scanned = scan_documents(KNOWLEDGE_BASE_DIR, manifest)
+    if not scanned:
+        # never empty the collection because a mount is missing
+        raise SystemExit("Error: no .txt files found in knowledge_base/. "
+                         "Make sure the concept documents are uploaded.")
+
+    plan = plan_changes(scanned, manifest, indexed_ids, embedder, full)
+    print(f"{len(scanned)} documents: {len(plan['new'])} new, {len(plan['changed'])} changed, "
+          f"{len(plan['unchanged'])} unchanged, {len(plan['removed'])} removed\n")
+
+    if manifest.get("embedder") != embedder or full:
+        # forget the old vectors' entries so an interrupted re-embed
+        # still re-embeds the rest on the next run
+        manifest["documents"] = {}
+    manifest["embedder"] = embedder
+    to_embed = plan["new"] + plan["changed"]
+    docs_per_sec = 0.0
+    model = None
+    if to_embed or run_verify:
+        print(f"Loading embedding model ({EMBEDDING_BACKEND})....")
+        model = load_embedder(EMBEDDING_MODEL, EMBEDDING_BACKEND)
+    if to_embed:
+        print(f"Embedding {len(to_embed)} documents in batches of {batch_size}...")
+        docs_per_sec = embed_and_upsert(collection, model, to_embed, scanned, manifest, batch_size)
+    delete_removed(collection, plan["removed"], manifest)
+    save_manifest(manifest)
+    print(f"Total documents in collection: {collection.count()}\n")
+
+    # keep the in-process NumPy store (VECTOR_BACKEND = "numpy" in
+    # retrieve.py) in sync with the collection
+    if to_embed or plan["removed"] or not NumpyStore.exists(NUMPY_STORE_DIR):
+        exported = NumpyStore.build_from_chroma(NUMPY_STORE_DIR, collection, model=EMBEDDING_MODEL)
+        print(f"Exported {exported} documents to NumPy store: {NUMPY_STORE_DIR}\n")
+
+    if run_verify:
+        verify(collection, model)
+
+    result = {change: len(ids) for change, ids in plan.items()}
+    result["docs_per_sec"] = round(docs_per_sec, 1)
+    return result
 
 
- 
-print("=" * 60)
-print("VERTIFICATOION = Running test quries")
-print("=" * 60)
-
-test_queries = [
-    "How long can this company survive before running out of cash?",
-    "Is out biggest client too large a portion of our revenue?",
-    "What is our days sales outstanding and accounts receivable collection time?"
-]
-
-expected = [
-    "concept_05_burn_rate_runway",
-    "concept_04_client_concentration",
-    "concept_03_days_sales_outstanding"
-]
- 
-all_passed = True 
-
-for i, query in enumerate(test_queries):
-    #Embed the question using the same model
-    query_vector = embedding_model.encode([query]).tolist()
-
-    #Ask ChromaDB: Which stored documents is most similar?
-    results = collection.query(
-        query_embeddings = query_vector,
-        n_results = 1 # return only the top match
-    )
-    top_match = results["ids"][0][0]
-    top_score = round(1 - results["distances"][0][0], 4)
-
-# distance is 0 = identical, 1 = completely different
-# we subtract from 1 to get a similarity score instead
-
-    status = "PASS" if top_match == expected[i] else "FAIL"
-    if status == "FAIL":
-        all_passed = False
-    print(f'\nQuery:  {query}')
-    print(f"Expected: {expected[i]}")
-    print(f"Got:  {top_match}")
-    print(f"Score: {top_score} [{status}]")
-print("\n" + "=" * 60)
-if all_passed:
-    print("ALL TESTS PASSED - ChromaDB is ready for phase 3")
-else:
-    print("SOME TESTS FAILED - Check document content and re-run.")
-print("=" * 60)
-
 if __name__ == "__main__":
-    notes = PDFNotes("my_notes_ingest.pdf", title="My Notes")
-
-    notes.heading("Section Title")
-    notes.text("Some explanation here...")
-    notes.code("""
-def my_function(x):
-    return x * 2
-""", language="python", caption="utils.py")
-
-    notes.build()
+    parser = argparse.ArgumentParser(description="Incrementally ingest the concept knowledge base")
+    parser.add_argument("--full", action="store_true", help="re-embed every document")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--no-verify", action="store_true", help="skip the test queries")
+    args = parser.parse_args()
+    ingest(full=args.full, batch_size=args.batch_size, run_verify=not args.no_verify)
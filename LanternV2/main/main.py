@@ -13,9 +13,18 @@
 # HOW TO RUN:
 #   1. Make sure ollama serve is running in another terminal
 #   2. python main.py
+#
+#   Batch mode (many questions, all companies — see batch.py):
+#     python main.py --batch questions.jsonl --out answers.jsonl
 # =============================================================
 
-from adviser import ask, COMPANY_NAMES 
+import argparse
+import threading
+from adviser import ask, compare, warm_up, COMPANY_NAMES 
+from batch import read_jsonl, write_jsonl, BATCH_CONCURRENCY
+from ollama_client import ollama
+from db_pool import close_all
+from retrieve import embedding_cache
 
 # -------------------------------------------------------------
 # DISPLAY HELPERS
@@ -32,6 +41,7 @@ def print_menu():
     print(" 1. Apex Strategy Consulting (service1)")
     print(" 2. Meridian Consulting Group (service2)")
     print(" 3. Vertex Advisory Partners (service3)")
+    print(" 4. Compare all three companies")
     print(" q. Quit")
 
 def print_divider():
@@ -44,7 +54,8 @@ def print_divider():
 def select_company():
     """
     Prompt the user to select a company.
-    Returns the db_key string for the selected company.
+    Returns the db_key string for the selected company,
+    "compare" for comparison mode, or None to quit.
     Loops until a valid choice is made.
     """
     db_map = {
@@ -58,6 +69,11 @@ def select_company():
 
         if choice == "q":
             return None
+
+        if choice == "4":
+            print(f"\nComparing: {', '.join(COMPANY_NAMES.values())}")
+            print_divider()
+            return "compare"
         
         if choice in db_map:
             db_key = db_map[choice]
@@ -66,7 +82,7 @@ def select_company():
             print_divider()
             return db_key
         
-        print("Invalid choice. Please Enter 1, 2, 3, or q .")
+        print("Invalid choice. Please Enter 1, 2, 3, 4, or q .")
 
 # -------------------------------------------------------------
 # QUESTION LOOP
@@ -82,6 +98,9 @@ def run_session(db_key):
         db_key = selected company database key
     """
     company = COMPANY_NAMES[db_key]
+    # earlier exchanges, so follow-up questions have context
+    # (and reuse Ollama's cached prompt prefix)
+    history = []
     print(f"\nAsking about: {company}")
     print(f"Type your question below.")
     print(f"Commands: 'back' = change company | 'quite' = exit\n")
@@ -107,7 +126,40 @@ def run_session(db_key):
         
         # run the full pipeline 
         print_divider()
-        ask(question, db_key)
+        answer = ask(question, db_key, history=history)
+        if not answer.startswith("ERROR:"):
+            history.append({"question": question, "answer": answer})
+        print_divider()
+
+def run_compare_session():
+    """
+    Like run_session, but every question is answered for all
+    companies at once in one comparative answer.
+    """
+    history = []
+    print(f"\nEach question is answered for all three companies.")
+    print(f"Commands: 'back' = change company | 'quit' = exit\n")
+
+    while True:
+        try:
+            question = input("You: ").strip()
+        except (KeyboardInterrupt, EOFError):
+            print("\nExiting ...")
+            return "quit"
+
+        if not question:
+            continue
+        if question.lower() in ["quit", "exit", "q"]:
+            return 'quit'
+        if question.lower() in ["back", "b", "menu"]:
+            return "back"
+
+        print_divider()
+        answer, timings = compare(question, history=history)
+        print(f"(route {timings['route_ms']} ms | retrieve {timings['retrieve_ms']} ms | "
+              f"prompt {timings['prompt_ms']} ms | generate {timings['generate_ms']} ms)")
+        if not answer.startswith("ERROR:"):
+            history.append({"question": question, "answer": answer})
         print_divider()
 
 # -------------------------------------------------------------
@@ -139,6 +191,9 @@ def print_examples():
 
 def main():
     print_header()
+    # load the models while the user picks a company
+    threading.Thread(target=ollama.warm, daemon=True).start()
+    threading.Thread(target=warm_up, daemon=True).start()
     print("""
 Welcome to Lantern Intelligence.
 I analyze real financial data to give you grounded advice.
@@ -152,12 +207,46 @@ the same question across all three to see how answers differ.
             break
         print_examples()
 
-        result = run_session(db_key)
+        if db_key == "compare":
+            result = run_compare_session()
+        else:
+            result = run_session(db_key)
         if result == "quit":
             print("\nGoodbye.\n")
             break
         #if result == 'break', loop continues and shows menu again
 
+def run_batch_file(in_path, out_path, concurrency, use_cache):
+    """Answer every {question, db_key} line of in_path into out_path."""
+    items = read_jsonl(in_path)
+    print(f"\nBatch: {len(items)} questions from {in_path} -> {out_path}")
+    results, timings = write_jsonl(out_path, items, concurrency, use_cache)
+    errors = sum(1 for r in results if r["error"])
+    cached = sum(1 for r in results if r["cache"])
+    # timings["generated"] counts attempts, failed ones included
+    generated = sum(1 for r in results if r["answer"] is not None and not r["cache"])
+    print(f"\nDone in {timings['total_ms'] / 1000:.1f} s — {generated} generated, "
+          f"{cached} from cache, {errors} errors")
+    print(f"(embed {timings['embed_ms']} ms, concepts {timings['concepts_ms']} ms, "
+          f"sql {timings['sql_ms']} ms, generate {timings['generate_ms']} ms)")
+
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Lantern Intelligence v2")
+    parser.add_argument("--batch", metavar="JSONL", help="answer a JSONL file of {question, db_key} and exit")
+    parser.add_argument("--out", default="answers.jsonl", help="batch results file (JSONL)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY,
+                        help="batch: Ollama generations in flight")
+    parser.add_argument("--no-cache", action="store_true", help="batch: always generate fresh answers")
+    args = parser.parse_args()
+    try:
+        if args.batch:
+            run_batch_file(args.batch, args.out, args.concurrency, not args.no_cache)
+        else:
+            main()
+    finally:
+        # release the pooled database connections and keep the
+        # question embeddings for next time
+        close_all()
+        embedding_cache.save()
 
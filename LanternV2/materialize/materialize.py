@@ -0,0 +1,472 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — materialize.py
+# Materialized metric tables inside each company database
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   The revenue trend, expense breakdown and client
+#   concentration metrics aggregate the whole transaction
+#   ledger on every call. This script builds small summary
+#   tables next to the ledger:
+#
+#     mv_monthly_revenue   one row per month
+#     mv_monthly_expenses  one row per (month, category)
+#     mv_client_revenue    one row per client
+#
+#   and installs triggers on the ledger table so every INSERT,
+#   UPDATE or DELETE adjusts the summaries by the delta of that
+#   row. New transactions are folded in as they land — there
+#   is no full rebuild after the initial backfill.
+#
+#   retrieve.get_live_data reads from these tables (see
+#   MATERIALIZED_SQL) only for the metrics that passed a parity
+#   check: build runs the original matrix_queries/*.sql file and
+#   its replacement on the same database, and a replacement is
+#   switched on only when both return the same rows. The check
+#   is stamped with a hash of the original SQL, so editing a
+#   .sql file switches that metric back to the ledger scan until
+#   `parity` is re-run.
+#
+# HOW TO RUN (same PYTHONPATH / LANTERN_HOME as the app):
+#   python materialize.py build  /path/to/service1.db
+#   python materialize.py parity /path/to/service1.db
+#   python materialize.py verify /path/to/service1.db
+#   python materialize.py drop   /path/to/service1.db
+# =============================================================
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import time
+
+# -------------------------------------------------------------
+# LEDGER LAYOUT
+# -------------------------------------------------------------
+# Where the raw rows live. Adjust here if a tenant's ledger
+# uses different names.
+# -------------------------------------------------------------
+
+LEDGER_TABLE    = "transactions"
+DATE_COLUMN     = "transaction_date"   # ISO date text, YYYY-MM-DD...
+TYPE_COLUMN     = "type"
+CATEGORY_COLUMN = "category"
+CLIENT_COLUMN   = "client_id"
+AMOUNT_COLUMN   = "amount"
+REVENUE_TYPE    = "revenue"
+EXPENSE_TYPE    = "expense"
+
+CLIENTS_TABLE       = "clients"
+CLIENT_ID_COLUMN    = "client_id"
+CLIENT_NAME_COLUMN  = "client_name"
+
+MV_VERSION = 1   # bump when the summary table layout changes
+
+# -------------------------------------------------------------
+# SUMMARY TABLES
+# -------------------------------------------------------------
+
+CREATE_TABLES = f"""
+CREATE TABLE IF NOT EXISTS mv_meta (
+    key    TEXT PRIMARY KEY,
+    value  TEXT
+);
+
+CREATE TABLE IF NOT EXISTS mv_monthly_revenue (
+    month              TEXT PRIMARY KEY,
+    revenue            REAL NOT NULL DEFAULT 0,
+    transaction_count  INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS mv_monthly_expenses (
+    month              TEXT NOT NULL,
+    category           TEXT NOT NULL,
+    amount             REAL NOT NULL DEFAULT 0,
+    transaction_count  INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, category)
+);
+
+CREATE TABLE IF NOT EXISTS mv_client_revenue (
+    client_id          INTEGER PRIMARY KEY,
+    revenue            REAL NOT NULL DEFAULT 0,
+    transaction_count  INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+BACKFILL = f"""
+DELETE FROM mv_monthly_revenue;
+DELETE FROM mv_monthly_expenses;
+DELETE FROM mv_client_revenue;
+
+INSERT INTO mv_monthly_revenue (month, revenue, transaction_count)
+SELECT substr({DATE_COLUMN}, 1, 7), SUM({AMOUNT_COLUMN}), COUNT(*)
+FROM {LEDGER_TABLE}
+WHERE {TYPE_COLUMN} = '{REVENUE_TYPE}'
+GROUP BY 1;
+
+INSERT INTO mv_monthly_expenses (month, category, amount, transaction_count)
+SELECT substr({DATE_COLUMN}, 1, 7), {CATEGORY_COLUMN}, SUM({AMOUNT_COLUMN}), COUNT(*)
+FROM {LEDGER_TABLE}
+WHERE {TYPE_COLUMN} = '{EXPENSE_TYPE}'
+GROUP BY 1, 2;
+
+INSERT INTO mv_client_revenue (client_id, revenue, transaction_count)
+SELECT {CLIENT_COLUMN}, SUM({AMOUNT_COLUMN}), COUNT(*)
+FROM {LEDGER_TABLE}
+WHERE {TYPE_COLUMN} = '{REVENUE_TYPE}' AND {CLIENT_COLUMN} IS NOT NULL
+GROUP BY 1;
+"""
+
+
+def _delta_statements(row, sign):
+    """
+    UPSERTs that apply one ledger row to the summaries.
+
+    Args:
+        row:  "NEW" or "OLD" (trigger row alias)
+        sign: "+" to add the row, "-" to remove it
+    """
+    return f"""
+    INSERT INTO mv_monthly_revenue (month, revenue, transaction_count)
+    SELECT substr({row}.{DATE_COLUMN}, 1, 7), {sign}{row}.{AMOUNT_COLUMN}, {sign}1
+    WHERE {row}.{TYPE_COLUMN} = '{REVENUE_TYPE}'
+    ON CONFLICT(month) DO UPDATE SET
+        revenue = revenue + excluded.revenue,
+        transaction_count = transaction_count + excluded.transaction_count;
+
+    INSERT INTO mv_monthly_expenses (month, category, amount, transaction_count)
+    SELECT substr({row}.{DATE_COLUMN}, 1, 7), {row}.{CATEGORY_COLUMN}, {sign}{row}.{AMOUNT_COLUMN}, {sign}1
+    WHERE {row}.{TYPE_COLUMN} = '{EXPENSE_TYPE}'
+    ON CONFLICT(month, category) DO UPDATE SET
+        amount = amount + excluded.amount,
+        transaction_count = transaction_count + excluded.transaction_count;
+
+    INSERT INTO mv_client_revenue (client_id, revenue, transaction_count)
+    SELECT {row}.{CLIENT_COLUMN}, {sign}{row}.{AMOUNT_COLUMN}, {sign}1
+    WHERE {row}.{TYPE_COLUMN} = '{REVENUE_TYPE}' AND {row}.{CLIENT_COLUMN} IS NOT NULL
+    ON CONFLICT(client_id) DO UPDATE SET
+        revenue = revenue + excluded.revenue,
+        transaction_count = transaction_count + excluded.transaction_count;
+"""
+
+
+CREATE_TRIGGERS = f"""
+CREATE TRIGGER IF NOT EXISTS mv_ledger_insert
+AFTER INSERT ON {LEDGER_TABLE}
+BEGIN
+{_delta_statements("NEW", "+")}
+END;
+
+CREATE TRIGGER IF NOT EXISTS mv_ledger_delete
+AFTER DELETE ON {LEDGER_TABLE}
+BEGIN
+{_delta_statements("OLD", "-")}
+END;
+
+CREATE TRIGGER IF NOT EXISTS mv_ledger_update
+AFTER UPDATE ON {LEDGER_TABLE}
+BEGIN
+{_delta_statements("OLD", "-")}
+{_delta_statements("NEW", "+")}
+END;
+"""
+
+DROP_ALL = """
+DROP TRIGGER IF EXISTS mv_ledger_insert;
+DROP TRIGGER IF EXISTS mv_ledger_delete;
+DROP TRIGGER IF EXISTS mv_ledger_update;
+DROP TABLE IF EXISTS mv_monthly_revenue;
+DROP TABLE IF EXISTS mv_monthly_expenses;
+DROP TABLE IF EXISTS mv_client_revenue;
+DROP TABLE IF EXISTS mv_meta;
+"""
+
+# -------------------------------------------------------------
+# READ QUERIES
+# -------------------------------------------------------------
+# Candidate replacements for the matrix_queries/*.sql files
+# that scan the ledger. They read the summary tables instead —
+# a few hundred rows at most, however long the history is.
+# Each one is used only after parity() has seen it return the
+# same rows as the original on that database.
+# -------------------------------------------------------------
+
+MATERIALIZED_SQL = {
+    "monthly_revenue_trend": """
+        SELECT
+            month,
+            ROUND(revenue, 2) AS revenue,
+            ROUND(100.0 * (revenue - LAG(revenue) OVER (ORDER BY month))
+                  / NULLIF(LAG(revenue) OVER (ORDER BY month), 0), 2) AS mom_growth_pct
+        FROM mv_monthly_revenue
+        WHERE transaction_count > 0
+        ORDER BY month
+    """,
+
+    "expense_breakdown": """
+        SELECT
+            category,
+            ROUND(SUM(amount), 2) AS total_expenses,
+            ROUND(100.0 * SUM(amount) / (SELECT SUM(amount) FROM mv_monthly_expenses), 2) AS pct_of_expenses
+        FROM mv_monthly_expenses
+        GROUP BY category
+        HAVING SUM(transaction_count) > 0
+        ORDER BY total_expenses DESC
+    """,
+
+    "client_concentration": f"""
+        SELECT
+            c.{CLIENT_NAME_COLUMN} AS client_name,
+            ROUND(m.revenue, 2) AS client_revenue,
+            ROUND(100.0 * m.revenue / (SELECT SUM(revenue) FROM mv_client_revenue), 2) AS pct_of_revenue
+        FROM mv_client_revenue m
+        LEFT JOIN {CLIENTS_TABLE} c ON c.{CLIENT_ID_COLUMN} = m.client_id
+        WHERE m.transaction_count > 0
+        ORDER BY m.revenue DESC
+        LIMIT 10
+    """
+}
+
+
+def is_materialized(conn):
+    """True if the summary tables have been built in this database."""
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'mv_meta'"
+    ).fetchone()
+    if row is None:
+        return False
+    version = conn.execute("SELECT value FROM mv_meta WHERE key = 'version'").fetchone()
+    return version is not None and int(version[0]) == MV_VERSION
+
+
+def sql_hash(sql):
+    """Stamp for an original .sql query (whitespace-insensitive)."""
+    return hashlib.sha256(" ".join(sql.split()).encode("utf-8")).hexdigest()[:16]
+
+
+def materialized_queries(conn, sql_queries):
+    """
+    The metrics this database may answer from the summary tables:
+    built, and the replacement passed parity against exactly the
+    original SQL it would stand in for.
+
+    Args:
+        conn:        open connection to a company database
+        sql_queries: {query_name: original sql} as loaded from SQL_DIR
+
+    Returns:
+        set: query names to read from MATERIALIZED_SQL
+    """
+    if not is_materialized(conn):
+        return set()
+    row = conn.execute("SELECT value FROM mv_meta WHERE key = 'parity'").fetchone()
+    if row is None:
+        return set()
+    passed = json.loads(row[0])
+    return {
+        name for name, sql in sql_queries.items()
+        if sql and name in MATERIALIZED_SQL and passed.get(name) == sql_hash(sql)
+    }
+
+
+def _same_rows(original, replacement):
+    """Row-by-row comparison; floats may differ by rounding noise only."""
+    if len(original) != len(replacement):
+        return False
+    for want, got in zip(original, replacement):
+        if want.keys() != got.keys():
+            return False
+        for column in want.keys():
+            a, b = want[column], got[column]
+            if isinstance(a, float) or isinstance(b, float):
+                if a is None or b is None or abs(a - b) > 0.005:
+                    return False
+            elif a != b:
+                return False
+    return True
+
+
+def parity(db_path, sql_queries):
+    """
+    Run every original query and its MATERIALIZED_SQL
+    replacement on this database and stamp the ones that return
+    identical rows (same columns, same order, same values) in
+    mv_meta. Only stamped queries are switched over.
+
+    Args:
+        db_path:     path to a company .db file with summary tables built
+        sql_queries: {query_name: original sql}
+
+    Returns:
+        dict: {query_name: None if identical, else a reason}
+    """
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    results = {}
+    passed = {}
+    try:
+        for name, replacement in MATERIALIZED_SQL.items():
+            original = sql_queries.get(name)
+            if not original:
+                results[name] = "original SQL file not found"
+                continue
+            try:
+                want = conn.execute(original).fetchall()
+                got = conn.execute(replacement).fetchall()
+            except sqlite3.Error as e:
+                results[name] = f"query failed: {e}"
+                continue
+            if _same_rows(want, got):
+                results[name] = None
+                passed[name] = sql_hash(original)
+            else:
+                results[name] = (f"rows differ (original: {len(want)} rows, columns {list(want[0].keys()) if want else []}; "
+                                 f"materialized: {len(got)} rows, columns {list(got[0].keys()) if got else []})")
+        conn.execute(
+            "INSERT OR REPLACE INTO mv_meta (key, value) VALUES ('parity', ?)",
+            (json.dumps(passed),)
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return results
+
+
+def build(db_path):
+    """
+    Create the summary tables, backfill them from the ledger
+    and install the incremental triggers. Safe to re-run: it
+    rebuilds the summaries from scratch. No metric reads them
+    until parity() has passed it.
+
+    Args:
+        db_path: path to a company .db file
+
+    Returns:
+        float: seconds taken
+    """
+    start = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    try:
+        # one write transaction so readers never see half-built tables
+        conn.execute("BEGIN IMMEDIATE")
+        for statement in _split(CREATE_TABLES + BACKFILL):
+            conn.execute(statement)
+        for trigger in _split_triggers(CREATE_TRIGGERS):
+            conn.execute(trigger)
+        conn.execute(
+            "INSERT OR REPLACE INTO mv_meta (key, value) VALUES ('version', ?)",
+            (str(MV_VERSION),)
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO mv_meta (key, value) VALUES ('built_at', datetime('now'))"
+        )
+        # nothing is switched over until parity() has compared it
+        conn.execute("DELETE FROM mv_meta WHERE key = 'parity'")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return time.perf_counter() - start
+
+
+def drop(db_path):
+    """Remove the summary tables and triggers."""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript(DROP_ALL)
+    finally:
+        conn.close()
+
+
+def verify(db_path):
+    """
+    Compare the summary tables against a full scan of the
+    ledger. Returns a list of mismatch descriptions (empty
+    when everything agrees).
+    """
+    conn = sqlite3.connect(db_path)
+    mismatches = []
+    try:
+        checks = {
+            "mv_monthly_revenue": (
+                "SELECT month, ROUND(revenue, 2) FROM mv_monthly_revenue WHERE transaction_count > 0",
+                f"SELECT substr({DATE_COLUMN}, 1, 7), ROUND(SUM({AMOUNT_COLUMN}), 2) FROM {LEDGER_TABLE} "
+                f"WHERE {TYPE_COLUMN} = '{REVENUE_TYPE}' GROUP BY 1"
+            ),
+            "mv_monthly_expenses": (
+                "SELECT month || '/' || category, ROUND(amount, 2) FROM mv_monthly_expenses WHERE transaction_count > 0",
+                f"SELECT substr({DATE_COLUMN}, 1, 7) || '/' || {CATEGORY_COLUMN}, ROUND(SUM({AMOUNT_COLUMN}), 2) "
+                f"FROM {LEDGER_TABLE} WHERE {TYPE_COLUMN} = '{EXPENSE_TYPE}' GROUP BY 1"
+            ),
+            "mv_client_revenue": (
+                "SELECT client_id, ROUND(revenue, 2) FROM mv_client_revenue WHERE transaction_count > 0",
+                f"SELECT {CLIENT_COLUMN}, ROUND(SUM({AMOUNT_COLUMN}), 2) FROM {LEDGER_TABLE} "
+                f"WHERE {TYPE_COLUMN} = '{REVENUE_TYPE}' AND {CLIENT_COLUMN} IS NOT NULL GROUP BY 1"
+            )
+        }
+        for table, (materialized_sql, scan_sql) in checks.items():
+            materialized = dict(conn.execute(materialized_sql).fetchall())
+            scanned = dict(conn.execute(scan_sql).fetchall())
+            for key in set(materialized) | set(scanned):
+                got, want = materialized.get(key), scanned.get(key)
+                # float sums drift by fractions of a cent across
+                # many incremental updates
+                if got is None or want is None or abs(got - want) > 0.01:
+                    mismatches.append(f"{table}[{key}]: materialized={got} scan={want}")
+    finally:
+        conn.close()
+    return mismatches
+
+
+def _split(script):
+    """Split a script of plain statements on ';'."""
+    return [s.strip() for s in script.split(";") if s.strip()]
+
+
+def _split_triggers(script):
+    """Split CREATE TRIGGER ... END; blocks (their bodies contain ';')."""
+    blocks = []
+    for block in script.split("END;"):
+        if block.strip():
+            blocks.append(block.strip() + "\nEND;")
+    return blocks
+
+
+def _print_parity(results):
+    for name, problem in results.items():
+        status = "identical — switched over" if problem is None else f"kept on ledger scan: {problem}"
+        print(f"  {name}: {status}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage materialized metric tables")
+    parser.add_argument("action", choices=["build", "parity", "verify", "drop"])
+    parser.add_argument("db_paths", nargs="+", help="company .db files")
+    args = parser.parse_args()
+
+    if args.action in ("build", "parity"):
+        # the originals come from the same SQL_DIR the app reads
+        from retrieve import get_sql_queries
+        sql_queries = get_sql_queries()
+
+    for db_path in args.db_paths:
+        if args.action == "build":
+            seconds = build(db_path)
+            print(f"Built materialized tables in {db_path} ({seconds:.2f}s)")
+            _print_parity(parity(db_path, sql_queries))
+        elif args.action == "parity":
+            print(f"Parity check for {db_path}:")
+            _print_parity(parity(db_path, sql_queries))
+        elif args.action == "verify":
+            problems = verify(db_path)
+            if problems:
+                print(f"{db_path}: {len(problems)} mismatches")
+                for problem in problems[:20]:
+                    print(f"  {problem}")
+            else:
+                print(f"{db_path}: materialized tables match the ledger")
+        else:
+            drop(db_path)
+            print(f"Dropped materialized tables from {db_path}")
@@ -0,0 +1,122 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — metric_cache.py
+# Versioned cache for SQL metric results
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   Stores the rows returned by each financial metric query,
+#   keyed by (db_key, query_name), together with the database
+#   version they were computed from.
+#
+#   The company databases rarely change between questions, so
+#   repeated questions skip SQL entirely. When the database
+#   changes (file mtime / size or PRAGMA data_version — see
+#   db_pool.ConnectionPool.version) the stored version no
+#   longer matches and the entry is treated as a miss.
+#
+#   Eviction: least-recently-used once MAX_ENTRIES is reached,
+#   and anything older than TTL_SECONDS regardless of version.
+# =============================================================
+
+import threading
+import time
+from collections import OrderedDict
+
+# -------------------------------------------------------------
+# CONFIGURATION
+# -------------------------------------------------------------
+
+MAX_ENTRIES = 256     # 3 databases x 8 metrics fits many times over
+TTL_SECONDS = 600     # safety net for changes the version stamp misses
+
+
+class MetricCache:
+    """
+    Thread-safe LRU + TTL cache of metric query results.
+
+    Cached rows are shared between callers — treat them as
+    read-only.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()   # (db_key, query_name) -> (version, stored_at, rows)
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._expired = 0
+        self._evictions = 0
+
+    def get(self, db_key, query_name, version):
+        """
+        Return cached rows, or None on a miss.
+
+        Args:
+            db_key:     "service1", "service2", or "service3"
+            query_name: metric name, e.g. "burn_rate_runway"
+            version:    current database version stamp
+        """
+        key = (db_key, query_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            cached_version, stored_at, rows = entry
+            if cached_version != version:
+                # database changed since this was computed
+                del self._entries[key]
+                self._stale += 1
+                self._misses += 1
+                return None
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self._expired += 1
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return rows
+
+    def put(self, db_key, query_name, version, rows):
+        """Store rows computed from the given database version."""
+        key = (db_key, query_name)
+        with self._lock:
+            self._entries[key] = (version, time.monotonic(), rows)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, db_key=None):
+        """Drop every entry, or only the entries for one database."""
+        with self._lock:
+            if db_key is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == db_key]:
+                del self._entries[key]
+
+    def stats(self):
+        """Hit/miss counters as a plain dict."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self._hits,
+                "misses": self._misses,
+                "stale": self._stale,
+                "expired": self._expired,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0
+            }
+
+
+# shared by everything that imports retrieve.py
+metric_cache = MetricCache()
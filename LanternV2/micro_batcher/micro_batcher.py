@@ -0,0 +1,184 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — micro_batcher.py
+# Coalesce concurrent embedding calls into one forward pass
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   Every /ask embeds its one question on its own, so ten users
+#   at once mean ten separate MiniLM forward passes. On CPU a
+#   batch of ten costs little more than a batch of one.
+#
+#   MicroBatcher sits in front of model.encode:
+#     - callers (any thread) put their texts on a queue and wait
+#     - one batching thread takes the first request, keeps
+#       collecting for up to MAX_WAIT_MS or until MAX_BATCH_SIZE
+#       texts, then runs ONE encode for all of them (duplicate
+#       texts encoded once) and hands each caller its rows
+#     - while a batch is encoding, new requests pile up and
+#       become the next batch, so under load batches grow on
+#       their own and with one user the extra wait is at most
+#       MAX_WAIT_MS
+#   Calls with MAX_BATCH_SIZE texts or more (batch.py) skip the
+#   queue and encode directly.
+#
+#   stats() reports the batch-size distribution, queue wait and
+#   encode time; queue wait is also recorded as the
+#   "embed_queue" tracing stage.
+# =============================================================
+
+import queue
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from tracing import record
+
+# -------------------------------------------------------------
+# CONFIGURATION
+# -------------------------------------------------------------
+
+MAX_BATCH_SIZE = 32     # texts per forward pass
+MAX_WAIT_MS    = 5      # how long the first request waits for company
+STATS_WINDOW   = 1000   # recent requests kept for wait percentiles
+
+# batch-size distribution buckets (upper bounds)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+class _Request:
+    __slots__ = ("texts", "submitted", "started", "result", "error", "done")
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.submitted = time.perf_counter()
+        self.started = None
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """
+    Thread-safe batching front for an encode function. Has the
+    same encode(list of str) -> 2D array shape as the model, so
+    it can stand in for it anywhere.
+
+    Args:
+        encode_fn:      callable(list of str) -> 2D array
+        max_batch_size: texts per encode_fn call
+        max_wait_ms:    longest a request waits for others to
+                        join its batch (0 = only what is queued)
+    """
+
+    def __init__(self, encode_fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self._requests = 0
+        self._batches = 0
+        self._texts = 0
+        self._direct = 0
+        self._encode_ms = 0.0
+        self._sizes = [0] * (len(SIZE_BUCKETS) + 1)
+        self._waits = deque(maxlen=STATS_WINDOW)
+
+    def _start(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                    self._thread.start()
+
+    def encode(self, texts):
+        """Embeddings for texts, (len(texts), dim), encoded in a shared batch."""
+        texts = list(texts)
+        if not texts:
+            return self.encode_fn(texts)
+        if len(texts) >= self.max_batch_size:
+            with self._lock:
+                self._direct += 1
+            return self.encode_fn(texts)
+
+        self._start()
+        request = _Request(texts)
+        self._queue.put(request)
+        request.done.wait()
+        wait_ms = (request.started - request.submitted) * 1000
+        record("embed_queue", wait_ms)
+        with self._lock:
+            self._waits.append(wait_ms)
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _collect(self):
+        """Block for one request, then gather more until full or out of time."""
+        batch = [self._queue.get()]
+        size = len(batch[0].texts)
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            for request in batch:
+                request.started = started
+            # a text asked for twice in one batch is encoded once
+            distinct = list(dict.fromkeys(t for request in batch for t in request.texts))
+            try:
+                vectors = np.asarray(self.encode_fn(distinct))
+                rows = {text: i for i, text in enumerate(distinct)}
+                for request in batch:
+                    request.result = vectors[[rows[t] for t in request.texts]]
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            encode_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self._requests += len(batch)
+                self._batches += 1
+                self._texts += len(distinct)
+                self._encode_ms += encode_ms
+                self._sizes[self._bucket(len(distinct))] += 1
+            for request in batch:
+                request.done.set()
+
+    @staticmethod
+    def _bucket(size):
+        for i, bound in enumerate(SIZE_BUCKETS):
+            if size <= bound:
+                return i
+        return len(SIZE_BUCKETS)
+
+    def stats(self):
+        with self._lock:
+            waits = sorted(self._waits)
+            batches = self._batches
+            labels = [str(b) for b in SIZE_BUCKETS] + [f">{SIZE_BUCKETS[-1]}"]
+            return {
+                "requests": self._requests,
+                "batches": batches,
+                "texts": self._texts,
+                "direct_calls": self._direct,
+                "mean_batch_size": round(self._texts / batches, 2) if batches else 0.0,
+                "batch_sizes": dict(zip(labels, self._sizes)),
+                "mean_encode_ms": round(self._encode_ms / batches, 3) if batches else 0.0,
+                "queue_wait_p50_ms": round(waits[len(waits) // 2], 3) if waits else 0.0,
+                "queue_wait_p95_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000
+            }
@@ -0,0 +1,399 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — ollama_client.py
+# One Ollama client for the CLI and the web app
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   Every question used to open a fresh HTTP connection with
+#   requests.post(), and Ollama unloads the model after a few
+#   idle minutes — the next question then pays a full model
+#   reload. This client:
+#
+#   - keeps keep-alive connection pools (requests.Session for
+#     the CLI, httpx.AsyncClient for the web app)
+#   - sends keep_alive with every call so the model stays
+#     loaded between questions, and can warm it up at startup
+#   - retries connection failures / 5xx with exponential
+#     backoff, but only before the first token arrives
+#   - records time-to-first-token and tokens/sec for every
+#     call (see stats())
+# =============================================================
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+# -------------------------------------------------------------
+# CONFIGURATION
+# -------------------------------------------------------------
+
+OLLAMA_HOST     = "http://localhost:11434"
+OLLAMA_MODEL    = "llama3.1:8b"
+KEEP_ALIVE      = "30m"     # how long Ollama keeps the model loaded after a call
+CONNECT_TIMEOUT = 5         # seconds
+READ_TIMEOUT    = 120       # seconds between streamed chunks
+MAX_RETRIES     = 2         # retries on connection errors / 5xx
+BACKOFF_SECONDS = 0.5       # first retry delay, doubles each attempt
+POOL_SIZE       = 16        # keep-alive connections per client
+STATS_WINDOW    = 200       # recent calls kept for averages
+
+DEFAULT_OPTIONS = {
+    # low temperature = more focused, less creative
+    # financial advice should be precise, not creative
+    "temperature": 0.1,
+    # max tokens to generate per response
+    "num_predict": 512,
+    # context window; prompts are packed to fit it (context_packer.py)
+    # instead of Ollama silently cutting them off
+    "num_ctx": 8192
+}
+
+RETRY_STATUS = {502, 503, 504}
+
+
+class OllamaError(Exception):
+    """
+    Raised when Ollama cannot be reached or fails.
+
+    kind: "connection", "timeout" or "http"
+    """
+
+    def __init__(self, kind, message):
+        super().__init__(message)
+        self.kind = kind
+
+
+class OllamaClient:
+    """Pooled, instrumented client for Ollama's streaming API."""
+
+    def __init__(self, host=OLLAMA_HOST, model=OLLAMA_MODEL, keep_alive=KEEP_ALIVE,
+                 options=None, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 max_retries=MAX_RETRIES, backoff=BACKOFF_SECONDS, pool_size=POOL_SIZE):
+        self.host = host.rstrip("/")
+        self.model = model
+        self.keep_alive = keep_alive
+        self.options = dict(DEFAULT_OPTIONS if options is None else options)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._async_client = None
+
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=STATS_WINDOW)
+        self._calls = 0
+        self._errors = 0
+        self._retries = 0
+
+    # ---------------------------------------------------------
+    # request helpers
+    # ---------------------------------------------------------
+
+    def _payload(self, options=None, **fields):
+        """Request body; fields is prompt=... (generate) or messages=... (chat)."""
+        payload = {
+            "model": self.model,
+            "stream": True,
+            "keep_alive": self.keep_alive,
+            "options": {**self.options, **(options or {})}
+        }
+        payload.update(fields)
+        return payload
+
+    def _delay(self, attempt):
+        return self.backoff * (2 ** attempt)
+
+    def _record(self, start, first_token_at, final, error=None):
+        """Store timings for one call."""
+        now = time.perf_counter()
+        record = {
+            "total_ms": round((now - start) * 1000, 2),
+            "ttft_ms": round((first_token_at - start) * 1000, 2) if first_token_at else None,
+            "error": error
+        }
+        if final:
+            eval_count = final.get("eval_count", 0)
+            eval_ns = final.get("eval_duration", 0)
+            record.update({
+                "tokens": eval_count,
+                "tokens_per_sec": round(eval_count / (eval_ns / 1e9), 2) if eval_ns else None,
+                "prompt_tokens": final.get("prompt_eval_count", 0),
+                "prompt_eval_ms": round(final.get("prompt_eval_duration", 0) / 1e6, 2),
+                "load_ms": round(final.get("load_duration", 0) / 1e6, 2)
+            })
+        with self._lock:
+            self._calls += 1
+            if error:
+                self._errors += 1
+            self._recent.append(record)
+        return record
+
+    # ---------------------------------------------------------
+    # sync API (CLI)
+    # ---------------------------------------------------------
+
+    def _stream_chunks(self, path, payload):
+        """
+        POST a streaming request and yield each parsed JSON chunk.
+        Retries only happen before any chunk has been yielded.
+        """
+        url = self.host + path
+        start = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(
+                    url, json=payload, stream=True,
+                    timeout=(self.connect_timeout, self.read_timeout)
+                )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt < self.max_retries:
+                    with self._lock:
+                        self._retries += 1
+                    time.sleep(self._delay(attempt))
+                    continue
+                kind = "timeout" if isinstance(e, requests.exceptions.Timeout) else "connection"
+                self._record(start, None, None, error=kind)
+                raise OllamaError(kind, str(e)) from e
+
+            if response.status_code in RETRY_STATUS and attempt < self.max_retries:
+                response.close()
+                with self._lock:
+                    self._retries += 1
+                time.sleep(self._delay(attempt))
+                continue
+            if response.status_code >= 400:
+                message = f"Ollama returned HTTP {response.status_code}: {response.text[:200]}"
+                response.close()
+                self._record(start, None, None, error="http")
+                raise OllamaError("http", message)
+            break
+
+        first_token_at, final, error = None, None, None
+        try:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                try:
+                    chunk = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                if chunk.get("done", False):
+                    final = chunk
+                yield chunk
+                if final:
+                    break
+        except requests.exceptions.RequestException as e:
+            error = "timeout"
+            raise OllamaError("timeout", str(e)) from e
+        finally:
+            # also runs when the caller stops iterating early
+            response.close()
+            self._record(start, first_token_at, final, error=error)
+
+    def stream_generate(self, prompt, options=None):
+        """Yield response tokens for a prompt as they arrive."""
+        for chunk in self._stream_chunks("/api/generate", self._payload(options, prompt=prompt)):
+            token = chunk.get("response", "")
+            if token:
+                yield token
+
+    def stream_chat(self, messages, options=None):
+        """
+        Yield response tokens for a list of chat messages. Keeping
+        earlier messages byte-identical between calls lets Ollama
+        reuse its KV cache for that prefix.
+        """
+        for chunk in self._stream_chunks("/api/chat", self._payload(options, messages=messages)):
+            token = chunk.get("message", {}).get("content", "")
+            if token:
+                yield token
+
+    def generate(self, prompt, options=None, on_token=None):
+        """
+        Run a generation and return the full text.
+
+        Args:
+            prompt:   complete prompt string
+            options:  Ollama options overriding DEFAULT_OPTIONS
+            on_token: optional callback(token) for live output
+        """
+        return self._collect(self.stream_generate(prompt, options), on_token)
+
+    def chat(self, messages, options=None, on_token=None):
+        """Run a chat completion and return the full text."""
+        return self._collect(self.stream_chat(messages, options), on_token)
+
+    def _collect(self, tokens, on_token=None):
+        text = ""
+        for token in tokens:
+            if on_token:
+                on_token(token)
+            text += token
+        return text
+
+    def warm(self):
+        """
+        Load the model into memory ahead of the first question
+        (an empty prompt just loads it). Returns True on success.
+        """
+        try:
+            response = self.session.post(
+                self.host + "/api/generate",
+                json={"model": self.model, "keep_alive": self.keep_alive},
+                timeout=(self.connect_timeout, self.read_timeout)
+            )
+            return response.status_code < 400
+        except requests.exceptions.RequestException:
+            return False
+
+    # ---------------------------------------------------------
+    # async API (web app)
+    # ---------------------------------------------------------
+
+    def _get_async_client(self):
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size
+                )
+            )
+        return self._async_client
+
+    async def _astream_chunks(self, path, payload, is_disconnected=None):
+        """Async version of _stream_chunks. Stops when is_disconnected() is true."""
+        client = self._get_async_client()
+        url = self.host + path
+        start = time.perf_counter()
+        first_token_at, final, error = None, None, None
+
+        for attempt in range(self.max_retries + 1):
+            request = client.build_request("POST", url, json=payload)
+            try:
+                response = await client.send(request, stream=True)
+            except (httpx.ConnectError, httpx.TimeoutException) as e:
+                if attempt < self.max_retries:
+                    with self._lock:
+                        self._retries += 1
+                    await asyncio.sleep(self._delay(attempt))
+                    continue
+                kind = "timeout" if isinstance(e, httpx.TimeoutException) else "connection"
+                self._record(start, None, None, error=kind)
+                raise OllamaError(kind, str(e)) from e
+
+            if response.status_code in RETRY_STATUS and attempt < self.max_retries:
+                await response.aclose()
+                with self._lock:
+                    self._retries += 1
+                await asyncio.sleep(self._delay(attempt))
+                continue
+            if response.status_code >= 400:
+                body = (await response.aread())[:200]
+                await response.aclose()
+                self._record(start, None, None, error="http")
+                raise OllamaError("http", f"Ollama returned HTTP {response.status_code}: {body!r}")
+            break
+
+        try:
+            async for line in response.aiter_lines():
+                # closing the response makes Ollama abandon the generation
+                if is_disconnected is not None and await is_disconnected():
+                    break
+                if not line:
+                    continue
+                try:
+                    chunk = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                if chunk.get("done", False):
+                    final = chunk
+                yield chunk
+                if final:
+                    break
+        except httpx.HTTPError as e:
+            error = "timeout"
+            raise OllamaError("timeout", str(e)) from e
+        finally:
+            await response.aclose()
+            self._record(start, first_token_at, final, error=error)
+
+    async def astream_generate(self, prompt, options=None, is_disconnected=None):
+        """
+        Async generator of response tokens.
+
+        Args:
+            is_disconnected: optional async callable; when it
+                             returns True the stream is closed
+        """
+        async for chunk in self._astream_chunks(
+            "/api/generate", self._payload(options, prompt=prompt), is_disconnected
+        ):
+            token = chunk.get("response", "")
+            if token:
+                yield token
+
+    async def astream_chat(self, messages, options=None, is_disconnected=None):
+        """Async generator of response tokens for chat messages."""
+        async for chunk in self._astream_chunks(
+            "/api/chat", self._payload(options, messages=messages), is_disconnected
+        ):
+            token = chunk.get("message", {}).get("content", "")
+            if token:
+                yield token
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    # ---------------------------------------------------------
+    # metrics
+    # ---------------------------------------------------------
+
+    def last_call(self):
+        with self._lock:
+            return self._recent[-1] if self._recent else None
+
+    def stats(self):
+        """Call counters plus averages over the last STATS_WINDOW calls."""
+        with self._lock:
+            recent = list(self._recent)
+            calls, errors, retries = self._calls, self._errors, self._retries
+
+        def mean(key):
+            values = [r[key] for r in recent if r.get(key) is not None]
+            return round(sum(values) / len(values), 2) if values else None
+
+        return {
+            "model": self.model,
+            "keep_alive": self.keep_alive,
+            "calls": calls,
+            "errors": errors,
+            "retries": retries,
+            "avg_ttft_ms": mean("ttft_ms"),
+            "avg_total_ms": mean("total_ms"),
+            "avg_tokens_per_sec": mean("tokens_per_sec"),
+            "avg_prompt_eval_ms": mean("prompt_eval_ms"),
+            "avg_load_ms": mean("load_ms"),
+            "last_call": recent[-1] if recent else None
+        }
+
+
+# shared by adviser.py (CLI) and app.py (web)
+ollama = OllamaClient()
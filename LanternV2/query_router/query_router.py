@@ -8,9 +8,33 @@
 #   This prevents running all 8 queries every time and ensures
 #   the LLM gets focused, relevant context.
 #
-# NO LLM CALLS — pure keyword scoring. Fast and free.
+# NO LLM CALLS — keyword scoring, optionally combined with
+# embedding similarity to a short description of each metric
+# (ROUTER_MODE). Fast and free.
 # =============================================================
 import re 
+import threading
+
+import numpy as np
+
+from tracing import spanned
+
+# -------------------------------------------------------------
+# CONFIGURATION
+# -------------------------------------------------------------
+# "keyword":  count keyword matches (original behaviour)
+# "semantic": cosine similarity between the question embedding
+#             and METRIC_DESCRIPTIONS
+# "hybrid":   both — keywords still win when they match, the
+#             embedding catches wording the keywords don't know
+# semantic / hybrid need set_embedder() (adviser.py passes the
+# same embedding function concept retrieval uses); without it
+# route() falls back to keyword mode.
+ROUTER_MODE = "hybrid"
+
+SEMANTIC_MIN_SIMILARITY = 0.30  # below this a metric isn't picked on similarity alone
+SEMANTIC_WEIGHT = 1.0           # hybrid: weight of the similarity score
+KEYWORD_WEIGHT  = 1.0           # hybrid: weight of the normalized keyword score
 
 # -------------------------------------------------------------
 # KEYWORD MAP
@@ -83,6 +107,172 @@ QUERY_KEYWORDS = {
     ]
 }
 
+# -------------------------------------------------------------
+# METRIC DESCRIPTIONS
+# -------------------------------------------------------------
+# What each query answers, in the words a business owner would
+# use. Embedded once (on the first semantic route) and compared
+# to the question in semantic / hybrid mode.
+# -------------------------------------------------------------
+
+METRIC_DESCRIPTIONS = {
+    "net_profit_margin":
+        "Net profit margin: how profitable the business is, income left after all "
+        "expenses, whether we are making or losing money.",
+    "monthly_revenue_trend":
+        "Monthly revenue trend: sales and income over time, whether revenue is "
+        "growing or declining, overall company performance.",
+    "days_sales_outstanding":
+        "Days sales outstanding: how long clients take to pay their invoices, "
+        "accounts receivable, overdue payments and collections.",
+    "client_concentration":
+        "Client concentration: how dependent revenue is on the biggest clients, "
+        "risk of relying on one or a few customers.",
+    "burn_rate_runway":
+        "Burn rate and runway: cash balance, monthly cash burn, how many months "
+        "until we run out of money, liquidity and survival.",
+    "expense_breakdown":
+        "Expense breakdown: where the money goes, costs by category such as "
+        "payroll, salaries, rent and overhead, biggest expenses.",
+    "revenue_per_employee":
+        "Revenue per employee: staff productivity and efficiency, headcount, "
+        "whether the team is overstaffed or understaffed.",
+    "client_churn_rate":
+        "Client churn rate: how many clients stop working with us, customer "
+        "retention, clients leaving or lost."
+}
+
+_embed = None
+_metric_names = []
+_metric_matrix = None   # (metrics, dim) unit vectors
+_embed_lock = threading.Lock()
+
+
+def set_embedder(embed_fn):
+    """
+    Enable semantic / hybrid routing.
+
+    Args:
+        embed_fn: callable(list of str) -> 2D array, e.g.
+                  retrieve.embed_questions (cached, shared with
+                  concept retrieval)
+
+    METRIC_DESCRIPTIONS are embedded once, on the first
+    semantic_scores() call — so setting an embedder never
+    loads the model by itself.
+    """
+    global _embed, _metric_names, _metric_matrix
+    with _embed_lock:
+        _embed, _metric_names, _metric_matrix = embed_fn, [], None
+
+
+def _description_matrix():
+    """(embed_fn, names, matrix) — embeds METRIC_DESCRIPTIONS on first use."""
+    global _metric_names, _metric_matrix
+    with _embed_lock:
+        embed, names, matrix = _embed, _metric_names, _metric_matrix
+        if embed is None or matrix is not None:
+            return embed, names, matrix
+        names = list(METRIC_DESCRIPTIONS)
+        matrix = np.asarray(embed([METRIC_DESCRIPTIONS[n] for n in names]), dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        _metric_names, _metric_matrix = names, matrix
+        return embed, names, matrix
+
+
+# -------------------------------------------------------------
+# KEYWORD MATCHING
+# -------------------------------------------------------------
+# QUERY_KEYWORDS is compiled once into a phrase table:
+#   "how long" -> ["days_sales_outstanding", "burn_rate_runway"]
+# A question is scanned once, looking up every run of 1..N
+# consecutive words (N = longest keyword). Matching is on whole
+# words — "left" no longer fires on "leftover" — and the cost
+# depends on the question length, not on how many keywords or
+# metrics there are. Call compile_keywords() again after
+# changing QUERY_KEYWORDS.
+# -------------------------------------------------------------
+
+_keyword_table = ({}, 1)   # (phrase -> query names, longest phrase in words)
+_query_order = {}          # query name -> position in QUERY_KEYWORDS (breaks score ties)
+
+
+def compile_keywords():
+    """Rebuild the phrase table from QUERY_KEYWORDS."""
+    global _keyword_table, _query_order
+    table = {}
+    for query_name, keywords in QUERY_KEYWORDS.items():
+        for keyword in keywords:
+            phrase = " ".join(keyword.lower().split())
+            names = table.setdefault(phrase, [])
+            if query_name not in names:
+                names.append(query_name)
+    longest = max((len(p.split()) for p in table), default=1)
+    _keyword_table = (table, longest)
+    _query_order = {name: i for i, name in enumerate(QUERY_KEYWORDS)}
+
+
+def keyword_scores(question):
+    """
+    Number of keywords of each query found in the question
+    (whole words). Queries without a match are left out.
+    """
+    # clean the question — lowercase, remove punctuation
+    # so "Cash?" matches "cash" and "Runway!" matches "runway"
+    words = re.sub(r"[^\w\s]", "", question.lower()).split()
+    table, longest = _keyword_table
+    # score each query by counting keyword matches
+    scores = {}
+    matched = set()
+    for start in range(len(words)):
+        for end in range(start + 1, min(start + longest, len(words)) + 1):
+            phrase = " ".join(words[start:end])
+            if phrase in table and phrase not in matched:
+                # a keyword counts once, however often it appears
+                matched.add(phrase)
+                for query_name in table[phrase]:
+                    scores[query_name] = scores.get(query_name, 0) + 1
+    return scores
+
+
+def semantic_scores(question):
+    """
+    Cosine similarity of the question to every metric
+    description — one matrix-vector product.
+
+    Returns:
+        {query_name: similarity}, or None without an embedder
+    """
+    embed, names, matrix = _description_matrix()
+    if embed is None:
+        return None
+    vector = np.asarray(embed([question])[0], dtype=np.float32)
+    vector = vector / (np.linalg.norm(vector) or 1.0)
+    similarities = matrix @ vector
+    return dict(zip(names, similarities.tolist()))
+
+
+def _ranked(question, mode):
+    """(query_name, score) pairs worth selecting, best first."""
+    keywords = keyword_scores(question)
+    similarities = semantic_scores(question) if mode in ("semantic", "hybrid") else None
+
+    if similarities is None:
+        scores = keywords
+    elif mode == "semantic":
+        scores = {q: s for q, s in similarities.items() if s >= SEMANTIC_MIN_SIMILARITY}
+    else:
+        most = max(keywords.values(), default=0) or 1
+        scores = {
+            q: KEYWORD_WEIGHT * keywords.get(q, 0) / most + SEMANTIC_WEIGHT * similarities.get(q, 0.0)
+            for q in QUERY_KEYWORDS
+            if q in keywords or similarities.get(q, 0.0) >= SEMANTIC_MIN_SIMILARITY
+        }
+    order = _query_order
+    return sorted(scores.items(), key=lambda x: (-x[1], order.get(x[0], len(order))))
+
+compile_keywords()
+
 # -------------------------------------------------------------
 # MINIMUM QUERIES TO ALWAYS INCLUDE
 # -------------------------------------------------------------
@@ -100,36 +290,25 @@ ALWAYS_INCLUDE = [
 # ROUTE FUNCTION
 # -------------------------------------------------------------
 
-def route(question, top_n=4):
+@spanned("route")
+def route(question, top_n=4, mode=None):
     """
     Given a user question, return a list of the most relevant SQL query names to run. 
     Arge:
         question: plain English user question (string)
         top_n : max number of queries to return (default of 4)
+        mode: "keyword", "semantic" or "hybrid" (default ROUTER_MODE)
 
     Returns:
         list of query name strings 
         e.g. ["burn_rate_runaway", "expense_breakdown",
                 "net_profit_margin", "monthly_revenue_trend"]
     """
-    # clean the question — lowercase, remove punctuation
-    # so "Cash?" matches "cash" and "Runway!" matches "runway"
-    cleaned = re.sub(r"[^\w\s]", "", question.lower())
-    # score each query by counting keyword matches
-    scores = {}
-    
-    for query_name, keywords in QUERY_KEYWORDS.items():
-        score = 0
-        for keyword in keywords:
-            if keyword in cleaned:
-                score += 1
-        scores[query_name] = score
-    
-    # sort queries by score, highest first 
-    ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+    # score each query and sort, highest first
+    ranked = _ranked(question, mode or ROUTER_MODE)
 
     #take the top_n scorting queries 
-    selected = [query_name for query_name, score in ranked[:top_n] if score > 0]
+    selected = [query_name for query_name, score in ranked[:top_n]]
 
     # always add the baseline queries if not already included
 
@@ -0,0 +1,213 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — semantic_cache.py
+# Reuse answers to differently-worded versions of a question
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   answer_cache.py only matches a question word for word (after
+#   normalization). Users ask the same thing many ways:
+#     "is our runway safe"  /  "how long until we run out of cash"
+#
+#   SemanticCache keeps the question embedding (the one
+#   get_concepts already computed — see retrieve.embed_question)
+#   next to each answer. A new question is served from the cache
+#   when a stored one:
+#     - is about the same company (db_key)
+#     - was answered from the same database version
+#     - was generated with the same model, prompt mode and
+#       options (the settings answer_cache.py keys on too)
+#     - is about the same metric: the router's top pick outside
+#       its always-included baseline (adviser.answer_topic). The
+#       full routed lists of two rewordings rarely agree — "how
+#       long until we run out of cash" also pulls in
+#       days_sales_outstanding on "how long" — but both are
+#       about burn_rate_runway
+#     - has cosine similarity >= SIMILARITY_THRESHOLD
+#
+#   benchmark/bench_semantic_cache.py checks which rewordings hit.
+#
+#   Instrumentation (/stats):
+#     - lookups, hits, hit rate, similarity of the hits
+#     - near misses: similar enough, but about another metric —
+#       these would have been false hits without the topic check
+#     - false hits: hits a user reported as wrong answers
+#       (report_false_hit); the entry is dropped as well. Only
+#       ids this cache actually served count, once each
+# =============================================================
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# -------------------------------------------------------------
+# CONFIGURATION
+# -------------------------------------------------------------
+
+SIMILARITY_THRESHOLD = 0.90   # cosine, all-MiniLM-L6-v2 question embeddings
+MAX_ENTRIES  = 1024           # answers kept across all companies
+TTL_SECONDS  = 3600           # same lifetime as answer_cache.py
+
+
+class SemanticCache:
+    """
+    Thread-safe nearest-question cache of complete answers.
+
+    Args:
+        threshold:   minimum cosine similarity for a hit
+        max_entries: LRU bound across all companies
+        ttl:         seconds an answer stays reusable
+    """
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # entry id -> {"scope", "settings", "vector", "question", "topic", "answer", "stored_at"}
+        self._entries = OrderedDict()
+        # ids served as hits and not yet reported (bounded like _entries)
+        self._served = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+        self._lookups = 0
+        self._hits = 0
+        self._near_misses = 0
+        self._false_hits = 0
+        self._evictions = 0
+        self._hit_similarities = []
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _drop_stale(self, db_key, version):
+        """Forget answers for db_key computed from an older database version."""
+        for entry_id in [i for i, e in self._entries.items()
+                         if e["scope"][0] == db_key and e["scope"][1] != version]:
+            del self._entries[entry_id]
+
+    def lookup(self, db_key, version, vector, topic, settings=None):
+        """
+        Most similar stored question for this company and data.
+
+        Args:
+            db_key:           "service1", "service2", or "service3"
+            version:          database version stamp
+            vector:           question embedding
+            topic:            the metric the question is about
+                              (adviser.answer_topic)
+            settings:         model / prompt settings the answer must
+                              have been generated with (hashable)
+
+        Returns:
+            {"id", "question", "answer", "similarity"} or None
+        """
+        query = self._unit(vector)
+        now = time.monotonic()
+        with self._lock:
+            self._lookups += 1
+            self._drop_stale(db_key, version)
+
+            best_id, best_score, best_routed = None, -1.0, False
+            for entry_id, entry in list(self._entries.items()):
+                if self.ttl is not None and now - entry["stored_at"] > self.ttl:
+                    del self._entries[entry_id]
+                    continue
+                if entry["scope"] != (db_key, version) or entry["settings"] != settings:
+                    continue
+                score = float(np.dot(query, entry["vector"]))
+                routed = entry["topic"] == topic
+                if score >= self.threshold and (routed, score) > (best_routed, best_score):
+                    best_id, best_score, best_routed = entry_id, score, routed
+
+            if best_id is None:
+                return None
+            if not best_routed:
+                # similar wording, but about a different metric
+                self._near_misses += 1
+                return None
+
+            entry = self._entries[best_id]
+            self._entries.move_to_end(best_id)
+            self._hits += 1
+            self._hit_similarities.append(best_score)
+            del self._hit_similarities[:-1000]
+            self._served[best_id] = True
+            self._served.move_to_end(best_id)
+            while len(self._served) > self.max_entries:
+                self._served.popitem(last=False)
+            return {
+                "id": best_id,
+                "question": entry["question"],
+                "answer": entry["answer"],
+                "similarity": round(best_score, 4)
+            }
+
+    def put(self, db_key, version, vector, question, topic, answer, settings=None):
+        """Store an answer with the embedding of the question it answers. Returns its id."""
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = {
+                "scope": (db_key, version),
+                "settings": settings,
+                "vector": self._unit(vector),
+                "question": question,
+                "topic": topic,
+                "answer": answer,
+                "stored_at": time.monotonic()
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+            return entry_id
+
+    def report_false_hit(self, entry_id):
+        """
+        A served answer did not fit the question. Counts it and
+        drops the entry so it isn't served again. Ids that were
+        never served as a hit (or were already reported) are not
+        counted, so the false-hit rate can't be inflated.
+
+        Returns:
+            None if entry_id was not a served hit, else True if the
+            entry was still cached
+        """
+        with self._lock:
+            if self._served.pop(entry_id, None) is None:
+                return None
+            self._false_hits += 1
+            return self._entries.pop(entry_id, None) is not None
+
+    def invalidate(self, db_key=None):
+        """Drop every answer, or only the answers for one database."""
+        with self._lock:
+            for entry_id in [i for i, e in self._entries.items()
+                             if db_key is None or e["scope"][0] == db_key]:
+                del self._entries[entry_id]
+
+    def stats(self):
+        """Hit / near-miss / false-hit counters as a plain dict."""
+        with self._lock:
+            similarities = self._hit_similarities
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "lookups": self._lookups,
+                "hits": self._hits,
+                "hit_rate": round(self._hits / self._lookups, 4) if self._lookups else 0.0,
+                "near_misses": self._near_misses,
+                "false_hits": self._false_hits,
+                "false_hit_rate": round(self._false_hits / self._hits, 4) if self._hits else 0.0,
+                "evictions": self._evictions,
+                "hit_similarity_min": round(min(similarities), 4) if similarities else None,
+                "hit_similarity_mean": round(sum(similarities) / len(similarities), 4) if similarities else None
+            }
+
+
+# shared by the CLI (adviser.ask) and the web app
+semantic_cache = SemanticCache()
@@ -0,0 +1,106 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — table_format.py
+# Serialize SQL result rows for the prompt
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   The original prompt format writes every column of every
+#   row as its own "key: value" line, so a 36-month revenue
+#   series repeats "month:", "revenue:" ... 36 times.
+#
+#   format_rows() supports three layouts:
+#     "kv"       one "key: value" line per column (original)
+#     "csv"      header once, then one comma-separated line per row
+#     "markdown" header once, then one | table | row per row
+#
+#   csv and markdown also round numbers to meaningful
+#   precision (no 751360.9200000001). Rows whose columns differ
+#   from the row before (e.g. a packer summary row) start a new
+#   header, so mixed row sets stay readable.
+# =============================================================
+
+import csv
+import io
+import math
+
+FORMATS = ("kv", "csv", "markdown")
+
+
+def round_value(value):
+    """
+    Round floats to the precision that matters for advice:
+    whole units for large amounts, one decimal for tens, and
+    three significant figures below 10 — so 0.0042 stays 0.0042
+    instead of collapsing to 0.0.
+    """
+    if isinstance(value, bool) or not isinstance(value, float) or not math.isfinite(value):
+        return value
+    magnitude = abs(value)
+    if magnitude >= 1000:
+        return int(round(value))
+    if magnitude >= 10:
+        return round(value, 1)
+    return float(f"{value:.3g}")
+
+
+def _groups(rows):
+    """Split rows into runs that share the same columns."""
+    groups = []
+    for row in rows:
+        keys = tuple(row.keys())
+        if groups and groups[-1][0] == keys:
+            groups[-1][1].append(row)
+        else:
+            groups.append((keys, [row]))
+    return groups
+
+
+def _format_kv(rows):
+    text = ""
+    for row in rows:
+        # format each row as key: value pairs
+        for key, value in row.items():
+            text += f"  {key}: {value}\n"
+        text += "\n"
+    return text
+
+
+def _format_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for keys, group in _groups(rows):
+        writer.writerow(keys)
+        for row in group:
+            writer.writerow([round_value(row[k]) for k in keys])
+    return buffer.getvalue() + "\n"
+
+
+def _format_markdown(rows):
+    lines = []
+    for keys, group in _groups(rows):
+        lines.append("| " + " | ".join(keys) + " |")
+        lines.append("|" + "---|" * len(keys))
+        for row in group:
+            cells = ["" if row[k] is None else str(round_value(row[k])) for k in keys]
+            lines.append("| " + " | ".join(cells) + " |")
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def format_rows(rows, fmt="kv"):
+    """
+    Render a list of row dicts for the prompt.
+
+    Args:
+        rows: [{column: value}] as returned by get_live_data
+        fmt:  "kv", "csv" or "markdown"
+
+    Returns:
+        str
+    """
+    if fmt == "kv":
+        return _format_kv(rows)
+    if fmt == "csv":
+        return _format_csv(rows)
+    if fmt == "markdown":
+        return _format_markdown(rows)
+    raise ValueError(f"Unknown row format: {fmt}. choose from: {list(FORMATS)}")
@@ -0,0 +1,225 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — tracing.py
+# Per-request stage timings and latency histograms
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   Lightweight tracing with no external service:
+#
+#     with span("sql"):
+#         ...                       # timed, recorded under "sql"
+#
+#     @spanned("route")
+#     def route(...): ...           # every call is a span
+#
+#   Every span is recorded twice:
+#     - in a process-wide histogram per stage name (fixed
+#       millisecond buckets + count + sum), served by the web
+#       app at /metrics in Prometheus text format
+#     - in the current request's Trace, if one is active, so a
+#       single request can report its own breakdown (e.g. the
+#       Server-Timing header on /ask)
+#
+#   The current Trace lives in a contextvar. Work handed to a
+#   thread pool only sees it when submitted through
+#   in_context(fn) — retrieve.py does this for its pool.
+#
+#   Stage names used across v2:
+#     route, retrieve, sql, embed, embed_queue, vector_search,
+#     prompt, answer_cache, ttft, generate, request
+# =============================================================
+
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# -------------------------------------------------------------
+# CONFIGURATION
+# -------------------------------------------------------------
+
+TRACING = True   # False turns every span into a no-op
+
+# histogram bucket upper bounds, milliseconds
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+METRIC_NAME = "lantern_stage_duration_ms"
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (thread-safe)."""
+
+    def __init__(self, buckets=BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)   # last = +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if ms <= bound:
+                index = i
+                break
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += ms
+            self.max = max(self.max, ms)
+
+    def snapshot(self):
+        """Counts per bucket (cumulative), count, sum and max."""
+        with self._lock:
+            counts, count, total, peak = list(self.counts), self.count, self.total, self.max
+        cumulative, running = [], 0
+        for n in counts:
+            running += n
+            cumulative.append(running)
+        return {
+            "buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], cumulative)),
+            "count": count,
+            "sum_ms": round(total, 3),
+            "mean_ms": round(total / count, 3) if count else 0.0,
+            "max_ms": round(peak, 3)
+        }
+
+
+class Trace:
+    """Spans recorded while handling one request."""
+
+    def __init__(self, name):
+        self.name = name
+        self.spans = []            # (stage, ms) in completion order
+        self._start = time.perf_counter()
+
+    def add(self, stage, ms):
+        self.spans.append((stage, ms))   # list.append is atomic
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self._start) * 1000
+
+    def timings(self):
+        """{stage: total ms} — a stage that ran twice is summed."""
+        totals = {}
+        for stage, ms in list(self.spans):
+            totals[stage] = totals.get(stage, 0.0) + ms
+        return {stage: round(ms, 2) for stage, ms in totals.items()}
+
+    def server_timing(self):
+        """Value for an HTTP Server-Timing header."""
+        return ", ".join(f"{stage};dur={ms}" for stage, ms in self.timings().items())
+
+    def summary(self):
+        """One line for the CLI."""
+        return " | ".join(f"{stage} {ms} ms" for stage, ms in self.timings().items())
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+_current = contextvars.ContextVar("lantern_trace", default=None)
+
+
+def record(stage, ms, trace=None):
+    """
+    Record a duration measured by hand (e.g. time to first token).
+    It goes to `trace` if given, else the current Trace (if any).
+    """
+    if not TRACING:
+        return
+    histogram = _histograms.get(stage)
+    if histogram is None:
+        with _histograms_lock:
+            histogram = _histograms.setdefault(stage, Histogram())
+    histogram.observe(ms)
+    if trace is None:
+        trace = _current.get()
+    if trace is not None:
+        trace.add(stage, ms)
+
+
+@contextmanager
+def span(stage):
+    """Time the block and record it under `stage`."""
+    if not TRACING:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, (time.perf_counter() - start) * 1000)
+
+
+def spanned(stage):
+    """Decorator: every call of the function is a span."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def start_trace(name="request"):
+    """
+    Make a new Trace current for this thread / async task and
+    return it. Call finish_trace() when the request is done.
+    """
+    trace = Trace(name)
+    _current.set(trace)
+    return trace
+
+
+def finish_trace(trace):
+    """Record the whole request's duration under trace.name."""
+    record(trace.name, trace.elapsed_ms(), trace)
+
+
+@contextmanager
+def traced(name="request"):
+    """start_trace / finish_trace around a block (synchronous callers)."""
+    trace = Trace(name)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+        record(name, trace.elapsed_ms())
+
+
+def current_trace():
+    return _current.get()
+
+
+def in_context(fn):
+    """
+    Bind fn to a copy of the caller's context, so spans recorded
+    in another thread land in the caller's Trace. Wrap at submit
+    time: executor.submit(in_context(fn), *args).
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+
+def histograms():
+    """{stage: histogram snapshot} for every stage seen so far."""
+    with _histograms_lock:
+        items = list(_histograms.items())
+    return {stage: h.snapshot() for stage, h in sorted(items)}
+
+
+def metrics_text():
+    """All histograms in Prometheus text exposition format."""
+    lines = [
+        f"# HELP {METRIC_NAME} Duration of each Lantern pipeline stage in milliseconds.",
+        f"# TYPE {METRIC_NAME} histogram"
+    ]
+    for stage, snap in histograms().items():
+        for bound, count in snap["buckets"].items():
+            lines.append(f'{METRIC_NAME}_bucket{{stage="{stage}",le="{bound}"}} {count}')
+        lines.append(f'{METRIC_NAME}_sum{{stage="{stage}"}} {snap["sum_ms"]}')
+        lines.append(f'{METRIC_NAME}_count{{stage="{stage}"}} {snap["count"]}')
+    return "\n".join(lines) + "\n"
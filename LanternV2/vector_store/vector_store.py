@@ -0,0 +1,326 @@
+# =============================================================
+# LANTERN INTELLIGENCE v2 — vector_store.py
+# Pluggable concept store: ChromaDB or in-process NumPy
+# =============================================================
+# WHAT THIS SCRIPT DOES:
+#   get_concepts() only needs "give me the top-K documents for
+#   this vector". This module puts that behind one small
+#   interface with two backends:
+#
+#   ChromaStore — the existing chromadb collection (HNSW +
+#                 SQLite under the hood)
+#   NumpyStore  — every normalized embedding in one contiguous
+#                 float32 matrix, memory-mapped from disk.
+#                 Exact cosine top-K is a single matmul.
+#
+#   For a knowledge base of a few dozen (or a few thousand)
+#   concept docs the NumPy store is exact, starts instantly and
+#   answers in microseconds.
+#
+#   Layout of a NumPy store directory:
+#     CURRENT       name of the version directory to read
+#     v<time>-xxxx/ one build:
+#       vectors.f32   raw float32 matrix, shape (count, dim)
+#       meta.json     {model, dim, count, ids, documents, metadatas}
+#
+#   build() writes a complete new version directory, then swaps
+#   CURRENT with a single os.replace — a reader always sees the
+#   vectors and metadata of the same build. The previous version
+#   is kept for readers that resolved CURRENT just before the
+#   swap; older ones are removed. A store without CURRENT (the
+#   original flat layout) is still read from store_dir itself.
+#
+#   An open NumpyStore stats CURRENT on every query and reopens
+#   itself when ingest.py has swapped in a new build, so a
+#   long-running app picks up re-ingested docs without a restart.
+# =============================================================
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+VECTORS_FILE = "vectors.f32"
+META_FILE    = "meta.json"
+CURRENT_FILE = "CURRENT"
+VERSION_PREFIX = "v"
+
+
+class VectorStore:
+    """Interface every concept store implements."""
+
+    def query(self, vector, top_k):
+        """
+        Nearest documents to a query embedding.
+
+        Args:
+            vector: 1D query embedding
+            top_k:  number of documents to return
+
+        Returns:
+            list of dicts: [{id, metric, text, score}] best first,
+            score = cosine similarity
+        """
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+    def sample(self, limit):
+        """
+        Up to `limit` indexed documents with their stored vectors
+        (used to check a new embedding backend against the index).
+
+        Returns:
+            (list of document texts, 2D array of vectors)
+        """
+        raise NotImplementedError
+
+
+class ChromaStore(VectorStore):
+    """Wraps an existing chromadb collection (cosine space)."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def query(self, vector, top_k):
+        results = self.collection.query(
+            query_embeddings=[np.asarray(vector, dtype=np.float32).tolist()],
+            n_results=top_k,
+            include=["documents", "metadatas", "distances"]
+        )
+        return [
+            {
+                "id": results["ids"][0][i],
+                "metric": results["metadatas"][0][i]["metric"],
+                "text": results["documents"][0][i],
+                # cosine distance is 1 - similarity
+                "score": round(1 - results["distances"][0][i], 4)
+            }
+            for i in range(len(results["ids"][0]))
+        ]
+
+    def count(self):
+        return self.collection.count()
+
+    def sample(self, limit):
+        data = self.collection.get(limit=limit, include=["documents", "embeddings"])
+        return data["documents"], np.asarray(data["embeddings"], dtype=np.float32)
+
+
+class NumpyStore(VectorStore):
+    """
+    Exact cosine search over a memory-mapped float32 matrix.
+
+    Args:
+        store_dir: directory written by NumpyStore.build()
+        model:     expected embedding model name (checked
+                   against meta.json when given)
+    """
+
+    def __init__(self, store_dir, model=None):
+        self.store_dir = store_dir
+        self.model = model
+        self._stamp = NumpyStore._current_stamp(store_dir)
+        self._state = self._load(NumpyStore.data_dir(store_dir))
+        self._reload_lock = threading.Lock()
+
+    def _load(self, data_dir):
+        """Read one build: metadata plus the mapped matrix."""
+        with open(os.path.join(data_dir, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if self.model and meta.get("model") and meta["model"] != self.model:
+            raise ValueError(
+                f"NumPy store {self.store_dir} was built with {meta['model']}, "
+                f"not {self.model}. Re-run ingest.py."
+            )
+
+        if meta["count"]:
+            # memory-mapped: pages are shared between processes
+            # and only read from disk when touched
+            matrix = np.memmap(
+                os.path.join(data_dir, VECTORS_FILE),
+                dtype=np.float32,
+                mode="r",
+                shape=(meta["count"], meta["dim"])
+            )
+        else:
+            matrix = np.zeros((0, meta["dim"]), dtype=np.float32)
+
+        return {
+            "data_dir": data_dir,
+            "ids": meta["ids"],
+            "documents": meta["documents"],
+            "metadatas": meta["metadatas"],
+            "dim": meta["dim"],
+            "matrix": matrix
+        }
+
+    def _current(self):
+        """
+        The loaded build, reopened first if ingest.py has swapped
+        CURRENT since it was read. Costs one stat() per call.
+
+        Returns:
+            dict: data_dir, ids, documents, metadatas, dim, matrix
+        """
+        stamp = NumpyStore._current_stamp(self.store_dir)
+        if stamp == self._stamp:
+            return self._state
+        with self._reload_lock:
+            if stamp != self._stamp:
+                try:
+                    self._state = self._load(NumpyStore.data_dir(self.store_dir))
+                except (OSError, ValueError, KeyError) as e:
+                    # keep answering from the build already open
+                    print(f"  WARNING: could not reopen NumPy store {self.store_dir}: {e}")
+                self._stamp = stamp
+            return self._state
+
+    def query(self, vector, top_k):
+        state = self._current()
+        if len(state["ids"]) == 0:
+            return []
+        query = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        scores = state["matrix"] @ query
+        top_k = min(top_k, len(scores))
+        # argpartition finds the top-K in O(n), then only those
+        # K get sorted
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+
+        return [
+            {
+                "id": state["ids"][i],
+                "metric": state["metadatas"][i]["metric"],
+                "text": state["documents"][i],
+                "score": round(float(scores[i]), 4)
+            }
+            for i in top
+        ]
+
+    def count(self):
+        return len(self._current()["ids"])
+
+    def sample(self, limit):
+        state = self._current()
+        return state["documents"][:limit], np.asarray(state["matrix"][:limit])
+
+    @staticmethod
+    def _current_stamp(store_dir):
+        """Identity of the CURRENT file (None for the flat layout)."""
+        try:
+            st = os.stat(os.path.join(store_dir, CURRENT_FILE))
+        except FileNotFoundError:
+            return None
+        # build() replaces CURRENT with a new file, so the inode
+        # changes even when two builds land in the same mtime tick
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    @staticmethod
+    def data_dir(store_dir):
+        """Directory holding the current build's files."""
+        try:
+            with open(os.path.join(store_dir, CURRENT_FILE), "r", encoding="utf-8") as f:
+                return os.path.join(store_dir, f.read().strip())
+        except FileNotFoundError:
+            return store_dir   # flat layout from before versioned builds
+
+    @staticmethod
+    def exists(store_dir):
+        """True if store_dir holds a complete store."""
+        return os.path.exists(os.path.join(NumpyStore.data_dir(store_dir), META_FILE))
+
+    @staticmethod
+    def build(store_dir, ids, documents, metadatas, embeddings, model=None):
+        """
+        Write a NumPy store. Embeddings are L2-normalized so the
+        dot product is the cosine similarity.
+
+        Args:
+            store_dir:  output directory
+            ids, documents, metadatas: parallel lists
+            embeddings: 2D array-like (count, dim)
+            model:      embedding model name, recorded in meta.json
+        """
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim != 2:
+            matrix = matrix.reshape(len(ids), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix = np.ascontiguousarray(matrix / norms, dtype=np.float32)
+
+        os.makedirs(store_dir, exist_ok=True)
+        # the whole build goes into a fresh version directory;
+        # nothing a reader can see changes until CURRENT is swapped
+        version_dir = tempfile.mkdtemp(prefix=time.strftime(VERSION_PREFIX + "%Y%m%d%H%M%S-"), dir=store_dir)
+        matrix.tofile(os.path.join(version_dir, VECTORS_FILE))
+        with open(os.path.join(version_dir, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "model": model,
+                "dim": int(matrix.shape[1]) if matrix.size else 0,
+                "count": len(ids),
+                "ids": list(ids),
+                "documents": list(documents),
+                "metadatas": list(metadatas)
+            }, f)
+
+        previous = os.path.basename(NumpyStore.data_dir(store_dir))
+        fd, current_tmp = tempfile.mkstemp(prefix=CURRENT_FILE + ".", dir=store_dir)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(os.path.basename(version_dir))
+        os.replace(current_tmp, os.path.join(store_dir, CURRENT_FILE))
+        NumpyStore._prune(store_dir, keep={os.path.basename(version_dir), previous})
+
+    @staticmethod
+    def _prune(store_dir, keep):
+        """Remove old version directories and flat-layout files."""
+        for name in os.listdir(store_dir):
+            path = os.path.join(store_dir, name)
+            if name in (VECTORS_FILE, META_FILE):
+                os.remove(path)
+            elif name.startswith(VERSION_PREFIX) and name not in keep and os.path.isdir(path):
+                # a process still mapping these keeps its pages;
+                # where the OS refuses (Windows) try again next build
+                shutil.rmtree(path, ignore_errors=True)
+
+    @staticmethod
+    def build_from_chroma(store_dir, collection, model=None):
+        """Export every document of a chromadb collection to a NumPy store."""
+        data = collection.get(include=["documents", "metadatas", "embeddings"])
+        NumpyStore.build(
+            store_dir,
+            ids=data["ids"],
+            documents=data["documents"],
+            metadatas=data["metadatas"],
+            embeddings=data["embeddings"],
+            model=model
+        )
+        return len(data["ids"])
+
+
+def open_store(backend, chroma_dir=None, collection_name=None, numpy_dir=None, model=None):
+    """
+    Open the configured concept store.
+
+    Args:
+        backend: "chroma" or "numpy"
+
+    Returns:
+        VectorStore
+    """
+    if backend == "chroma":
+        import chromadb
+        client = chromadb.PersistentClient(path=chroma_dir)
+        return ChromaStore(client.get_collection(name=collection_name))
+    if backend == "numpy":
+        return NumpyStore(numpy_dir, model=model)
+    raise ValueError(f"Unknown vector backend: {backend}. choose from: ['chroma', 'numpy']")